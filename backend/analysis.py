@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import List, Optional
+from cache import PersistentCache
+from config import data_path, env_int
+from metrics import parse_failures
+from models import ProductWeakness
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt template or response parsing changes; old cache entries stop matching
+PROMPT_VERSION = "1"
+
+# Characters of scraped content sent to the model
+MAX_CONTENT_CHARS = 10000
+
+# How many weaknesses to ask for per chunk in chunked mode, and how many to keep after merging
+CHUNK_WEAKNESS_COUNT = "3-6"
+MAX_MERGED_WEAKNESSES = 12
+
+SEVERITY_RANK = {"high": 3, "medium": 2, "low": 1}
+
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s")
+_RULE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"the", "and", "for", "with", "are", "not", "lack", "limited", "poor", "issues", "its", "their"}
+
+
+class ResponseParseError(Exception):
+    """The model answered, but the answer couldn't be turned into weaknesses"""
+
+    def __init__(self, message: str, no_json: bool = False):
+        super().__init__(message)
+        self.no_json = no_json
+
+
+def build_prompt(competitor_name: str, content: str, weakness_count: str = "8-12") -> str:
+    """Build the weakness-analysis prompt for one competitor page (or one chunk of it)"""
+    return f"""
+            You are an expert competitive analyst. Analyze the following content from {competitor_name}'s website
+            and identify their main product weaknesses or areas for improvement.
+
+            Focus on:
+            - Product features and functionality gaps
+            - Pricing issues or concerns
+            - Customer support problems
+            - User experience issues
+            - Technical limitations
+            - Market positioning weaknesses
+
+            Content to analyze:
+            {content[:MAX_CONTENT_CHARS]}  # Limit content length for API
+
+            Please provide {weakness_count} specific weaknesses in the following JSON format:
+            {{
+                "weaknesses": [
+                    {{
+                        "title": "Brief title of weakness",
+                        "description": "Detailed explanation of the weakness and why it's a problem",
+                        "severity": "high|medium|low",
+                        "category": "feature|pricing|support|usability|technical|other"
+                    }}
+                ]
+            }}
+
+            Be specific, actionable, and focus on genuine weaknesses that competitors could exploit.
+            """
+
+
+def parse_weaknesses(ai_response: str) -> Optional[List[ProductWeakness]]:
+    """
+    Extract the weaknesses list from a model response
+
+    Returns None when the response contains no JSON object; raises if the
+    JSON is malformed or the weaknesses don't match the schema.
+    """
+    json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+    if not json_match:
+        return None
+    weaknesses_data = json.loads(json_match.group())
+    return [ProductWeakness(**w) for w in weaknesses_data.get("weaknesses", [])]
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Split a block that alone exceeds max_chars on paragraph, then line, then hard boundaries"""
+    pieces: List[str] = []
+    for separator in ("\n\n", "\n"):
+        if separator in block:
+            current = ""
+            for part in block.split(separator):
+                candidate = f"{current}{separator}{part}" if current else part
+                if len(candidate) <= max_chars:
+                    current = candidate
+                    continue
+                if current:
+                    pieces.append(current)
+                if len(part) > max_chars:
+                    pieces.extend(_split_oversized(part, max_chars))
+                    current = ""
+                else:
+                    current = part
+            if current:
+                pieces.append(current)
+            return pieces
+    return [block[i:i + max_chars] for i in range(0, len(block), max_chars)]
+
+
+def split_sections(content: str) -> List[str]:
+    """Split markdown into sections starting at headings and horizontal rules (review sites separate reviews with them)"""
+    sections: List[str] = []
+    current: List[str] = []
+    for line in content.splitlines():
+        if (_HEADING.match(line) or _RULE.match(line)) and current:
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip())
+    return [section for section in sections if section]
+
+
+def section_hash(section: str) -> str:
+    """Case- and whitespace-insensitive hash of one section, used to diff page snapshots"""
+    return hashlib.sha256(" ".join(section.lower().split()).encode("utf-8")).hexdigest()
+
+
+def split_markdown(content: str, max_chars: int = MAX_CONTENT_CHARS) -> List[str]:
+    """
+    Split scraped markdown into chunks of at most max_chars
+
+    Sections (see split_sections) are packed greedily into chunks so related
+    reviews stay together, and oversized sections are split on paragraphs.
+    """
+    chunks: List[str] = []
+    chunk = ""
+    for section in split_sections(content):
+        if len(section) > max_chars:
+            if chunk:
+                chunks.append(chunk)
+                chunk = ""
+            chunks.extend(_split_oversized(section, max_chars))
+            continue
+        candidate = f"{chunk}\n\n{section}" if chunk else section
+        if len(candidate) > max_chars:
+            chunks.append(chunk)
+            chunk = section
+        else:
+            chunk = candidate
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _title_terms(title: str) -> set:
+    terms = {word for word in _WORD.findall(title.lower()) if len(word) > 2 and word not in _STOPWORDS}
+    # Very short titles have no significant terms; compare them verbatim instead
+    return terms or {title.strip().lower()}
+
+
+class WeaknessClusters:
+    """
+    Running reduce state for weaknesses reported by several chunks or pages
+
+    Weaknesses whose titles share most of their terms (Jaccard >= 0.5) are
+    treated as one; the most severe wording is kept. `ranked` orders them by
+    how many reports each got, then by severity. Keep one instance across
+    all groups: support counts only add up within it.
+    """
+
+    def __init__(self):
+        self._clusters = []  # [terms, best weakness, support]
+
+    def add(self, weaknesses: List[ProductWeakness]) -> None:
+        for weakness in weaknesses:
+            terms = _title_terms(weakness.title)
+            for cluster in self._clusters:
+                union = terms | cluster[0]
+                if union and len(terms & cluster[0]) / len(union) >= 0.5:
+                    cluster[2] += 1
+                    best = cluster[1]
+                    if (SEVERITY_RANK.get(weakness.severity, 0), len(weakness.description)) > (
+                        SEVERITY_RANK.get(best.severity, 0), len(best.description)
+                    ):
+                        cluster[1] = weakness
+                    cluster[0] = cluster[0] | terms
+                    break
+            else:
+                self._clusters.append([terms, weakness, 1])
+
+    def ranked(self, limit: int = MAX_MERGED_WEAKNESSES) -> List[ProductWeakness]:
+        ranked = sorted(
+            enumerate(self._clusters),
+            key=lambda item: (-item[1][2], -SEVERITY_RANK.get(item[1][1].severity, 0), item[0]),
+        )
+        return [cluster[1] for _, cluster in ranked[:limit]]
+
+
+def merge_weaknesses(groups: List[List[ProductWeakness]], limit: int = MAX_MERGED_WEAKNESSES) -> List[ProductWeakness]:
+    """Reduce step for chunked analysis: deduplicate and rank per-chunk weaknesses (see WeaknessClusters)"""
+    clusters = WeaknessClusters()
+    for group in groups:
+        clusters.add(group)
+    return clusters.ranked(limit)
+
+
+class WeaknessStreamParser:
+    """
+    Pulls complete weakness objects out of a partially generated JSON response
+
+    Feed it text chunks as the model streams them; each call returns the
+    weaknesses whose JSON object closed within the new text. The full response
+    should still go through parse_weaknesses once generation finishes.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start: Optional[int] = None
+        self._finished = False
+
+    def feed(self, text: str) -> List[ProductWeakness]:
+        self._buffer += text
+        completed = []
+        if self._finished:
+            return completed
+
+        if self._pos is None:
+            array_match = re.search(r'"weaknesses"\s*:\s*\[', self._buffer)
+            if not array_match:
+                return completed
+            self._pos = array_match.end()
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    try:
+                        completed.append(ProductWeakness(**json.loads(buffer[self._object_start:self._pos + 1])))
+                    except Exception as e:
+                        parse_failures.inc(kind="stream_item")
+                        logger.warning("Skipping malformed streamed weakness: %s", e)
+                    self._object_start = None
+            elif ch == "]" and self._depth == 0:
+                self._finished = True
+                break
+            self._pos += 1
+        return completed
+
+
+class AnalysisCache:
+    """
+    Memoizes parsed analysis results by (prompt version, model id, prompt text)
+
+    The prompt already embeds the competitor name and the truncated content, so
+    hashing it covers every input the model sees.
+    """
+
+    def __init__(self):
+        self.cache = PersistentCache(
+            name="analysis",
+            path=os.getenv("ANALYSIS_CACHE_PATH") or data_path("analysis_cache.sqlite3"),
+            ttl_seconds=env_int("ANALYSIS_CACHE_TTL", 7 * 24 * 60 * 60),
+            max_memory_entries=env_int("ANALYSIS_CACHE_MEMORY_ENTRIES", 256),
+            max_disk_entries=env_int("ANALYSIS_CACHE_MAX_ENTRIES", 10000),
+        )
+
+    @staticmethod
+    def key(model_id: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (PROMPT_VERSION, model_id, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, model_id: str, prompt: str) -> Optional[List[ProductWeakness]]:
+        entry = self.cache.get(self.key(model_id, prompt))
+        if entry is None:
+            return None
+        return [ProductWeakness(**w) for w in json.loads(entry.value)]
+
+    def set(self, model_id: str, prompt: str, weaknesses: List[ProductWeakness]) -> None:
+        value = json.dumps([w.model_dump() for w in weaknesses])
+        self.cache.set(self.key(model_id, prompt), value)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+analysis_cache = AnalysisCache()
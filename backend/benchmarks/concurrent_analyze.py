@@ -0,0 +1,85 @@
+"""
+Load test: fire N concurrent POST /analyze calls at a running backend and check
+that they overlap instead of being served one after another.
+
+While the analyses are in flight the script also polls the `/` health check,
+which must keep answering quickly if the event loop is not blocked.
+
+Usage (from backend/, with the API running on port 8000):
+
+    python benchmarks/concurrent_analyze.py -n 8 --url https://www.trustpilot.com/review/example.com
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+
+
+async def _analyze(client: httpx.AsyncClient, url: str, index: int, model: str | None) -> Tuple[float, float, int]:
+    payload = {"target_url": url, "competitor_name": f"Load Test {index}"}
+    if model:
+        payload["model"] = model
+    started = time.perf_counter()
+    response = await client.post("/analyze", json=payload)
+    return started, time.perf_counter(), response.status_code
+
+
+async def _poll_health(client: httpx.AsyncClient, stop: asyncio.Event) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.1)
+    return latencies
+
+
+async def run(base_url: str, target_url: str, concurrency: int, model: str | None) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        stop = asyncio.Event()
+        health_task = asyncio.create_task(_poll_health(client, stop))
+
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_analyze(client, target_url, i, model) for i in range(concurrency))
+        )
+        wall = time.perf_counter() - wall_start
+
+        stop.set()
+        health = await health_task
+
+    durations = [end - start for start, end, _ in results]
+    serial_estimate = sum(durations)
+    # Fraction of the serial time saved by running requests concurrently
+    overlap = 1 - wall / serial_estimate if serial_estimate else 0.0
+
+    print(f"requests:            {concurrency}")
+    print(f"status codes:        {sorted({status for _, _, status in results})}")
+    print(f"wall clock:          {wall:.2f}s")
+    print(f"sum of latencies:    {serial_estimate:.2f}s")
+    print(f"mean latency:        {statistics.mean(durations):.2f}s")
+    print(f"overlap:             {overlap:.0%}")
+    if health:
+        print(f"health check max:    {max(health) * 1000:.1f}ms over {len(health)} polls")
+
+    if concurrency > 1 and wall >= serial_estimate * 0.9:
+        print("❌ Requests ran (almost) sequentially - the event loop is being blocked")
+    else:
+        print("✅ Requests overlapped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--url", required=True, help="Target URL to analyze")
+    parser.add_argument("-n", "--concurrency", type=int, default=8, help="Number of concurrent /analyze calls")
+    parser.add_argument("--model", default=None, help="Optional model id to request")
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.url, args.concurrency, args.model))
+
+
+if __name__ == "__main__":
+    main()
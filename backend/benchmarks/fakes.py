@@ -0,0 +1,538 @@
+"""
+Local stand-ins for Firecrawl, Gemini and Supabase, for offline benchmarks.
+
+Each fake sleeps for a configurable latency on the calling thread, exactly
+where the real SDK would block, and returns payloads of a configurable size,
+so the API's executors, caches, parsing and write paths all run as in
+production. Nothing here talks to the network.
+
+    FakeScraper               ContentScraper whose Firecrawl fetch returns generated markdown
+    FakeGenerativeModel       generate_content (plain and streamed) with JSON weaknesses and usage_metadata
+    FakeSupabaseClient        in-memory tables behind the PostgREST query builder calls and
+                              RPCs that SupabaseRepository uses
+
+install_fakes imports `main` with all three in place of the real clients.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Latency:
+    """Sleep for `seconds`, spread uniformly by ±jitter (a fraction of seconds)"""
+    seconds: float = 0.0
+    jitter: float = 0.0
+
+    def sleep(self) -> None:
+        if self.seconds <= 0:
+            return
+        spread = self.seconds * self.jitter
+        time.sleep(max(0.0, random.uniform(self.seconds - spread, self.seconds + spread)))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- Firecrawl -----------------------------------------------------------------
+
+def generate_page(url: str, chars: int) -> str:
+    """Deterministic review-style markdown of about `chars` characters for a URL, linking to three child pages"""
+    seed = _digest(url)[:8]
+    sections = []
+    size = 0
+    index = 0
+    while size < chars:
+        section = (
+            f"## Reviews {index} ({seed})\n\n"
+            f"Customer {index} says the product from {url} is useful, but pricing tier {index % 7} is confusing "
+            f"and support took {index % 5 + 1} days to answer. The export feature fails on large files. "
+            f"Onboarding step {index % 3} is unclear and the mobile app crashes on login.\n\n"
+        )
+        sections.append(section)
+        size += len(section)
+        index += 1
+    # A few links to child pages so crawls have somewhere to go
+    links = "".join(f"- [More reviews {link}]({url.rstrip('/')}/{link})\n" for link in range(1, 4))
+    return "".join(sections)[:chars] + "\n## Related\n\n" + links
+
+
+def make_fake_scraper(latency: Latency, page_chars: int):
+    """ContentScraper subclass whose Firecrawl fetch is replaced by a sleep and a generated page"""
+    from scraper import ContentScraper
+
+    class FakeScraper(ContentScraper):
+        def _fetch(self, url: str) -> Optional[str]:
+            latency.sleep()
+            return generate_page(url, page_chars)
+
+    return FakeScraper()
+
+
+# --- Gemini --------------------------------------------------------------------
+
+@dataclass
+class FakeUsage:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage: Optional[FakeUsage] = None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeGenerativeModel:
+    """
+    generate_content compatible with google.generativeai.GenerativeModel
+
+    Answers with `weakness_count` weaknesses derived from the prompt, so
+    different pages get different titles while repeats match. A streamed
+    call spreads the latency over chunks of `chunk_chars`.
+    """
+
+    def __init__(self, model_id: str, latency: Latency, weakness_count: int = 8, description_chars: int = 160, chunk_chars: int = 64):
+        self.model_name = f"models/{model_id}"
+        self.latency = latency
+        self.weakness_count = weakness_count
+        self.description_chars = description_chars
+        self.chunk_chars = chunk_chars
+
+    def _answer(self, prompt: str) -> str:
+        seed = _digest(prompt)[:6]
+        categories = ["pricing", "support", "feature", "usability", "performance"]
+        severities = ["high", "medium", "low"]
+        weaknesses = [
+            {
+                "title": f"Weakness {index} {seed}",
+                "description": (f"Reviewers repeatedly report problem {index} ({seed}). " * 8)[: self.description_chars],
+                "severity": severities[index % len(severities)],
+                "category": categories[index % len(categories)],
+            }
+            for index in range(self.weakness_count)
+        ]
+        return json.dumps({"weaknesses": weaknesses}, indent=2)
+
+    def _usage(self, prompt: str, text: str) -> FakeUsage:
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+        return FakeUsage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        text = self._answer(prompt)
+        if not stream:
+            self.latency.sleep()
+            return FakeResponse(text, self._usage(prompt, text))
+        return self._stream(prompt, text)
+
+    def _stream(self, prompt: str, text: str) -> Iterator[FakeResponse]:
+        chunks = [text[start:start + self.chunk_chars] for start in range(0, len(text), self.chunk_chars)]
+        per_chunk = Latency(self.latency.seconds / len(chunks), self.latency.jitter)
+        for index, chunk in enumerate(chunks):
+            per_chunk.sleep()
+            yield FakeResponse(chunk, self._usage(prompt, text) if index == len(chunks) - 1 else None)
+
+
+# --- Supabase ------------------------------------------------------------------
+
+class FakeResult:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+# Columns the database fills in on insert (see database_schema.sql)
+_DEFAULTS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "competitors": lambda: {"created_at": _now(), "updated_at": _now()},
+    "insights": lambda: {"created_at": _now(), "occurrences": 1, "last_seen_at": _now(), "fingerprint": None, "simhash": None},
+    "content_snapshots": lambda: {"captured_at": _now()},
+}
+
+
+class FakeQuery:
+    """The subset of the postgrest-py request builder SupabaseRepository uses"""
+
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.payload: Any = None
+        self.on_conflict = ""
+        self.columns = "*"
+        self.count: Optional[str] = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.ordering: List[tuple] = []
+        self.bounds: Optional[tuple] = None
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        self.columns, self.count = columns, count
+        return self
+
+    def insert(self, rows) -> "FakeQuery":
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "") -> "FakeQuery":
+        self.operation, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "FakeQuery":
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.operation = "delete"
+        return self
+
+    def _filter(self, predicate: Callable[[Dict[str, Any]], bool]) -> "FakeQuery":
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) != value)
+
+    def gt(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lt(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column: str, value) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def in_(self, column: str, values) -> "FakeQuery":
+        allowed = set(values)
+        return self._filter(lambda row: row.get(column) in allowed)
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.bounds = (0, count)
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.bounds = (start, end - start + 1)
+        return self
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self.columns.strip() == "*":
+            return dict(row)
+        return {column.strip(): row.get(column.strip()) for column in self.columns.split(",")}
+
+    def execute(self) -> FakeResult:
+        self.client.latency.sleep()
+        with self.client.lock:
+            rows = self.client.tables.setdefault(self.table, [])
+            if self.operation in ("insert", "upsert"):
+                return FakeResult(self.client.write(self.table, self.payload, self.on_conflict.split(",") if self.on_conflict else []))
+
+            matched = [row for row in rows if all(predicate(row) for predicate in self.filters)]
+            if self.operation == "update":
+                for row in matched:
+                    before = dict(row)
+                    row.update(self.payload)
+                    self.client.track(self.table, before, row)
+                return FakeResult([dict(row) for row in matched])
+            if self.operation == "delete":
+                self.client.delete(self.table, matched)
+                return FakeResult([dict(row) for row in matched])
+
+            total = len(matched)
+            for column, desc in reversed(self.ordering):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if self.bounds:
+                start, size = self.bounds
+                matched = matched[start:start + size]
+            if self.client.max_rows is not None:
+                matched = matched[:self.client.max_rows]
+            return FakeResult([self._project(row) for row in matched], total if self.count else None)
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabaseClient", name: str, params: Dict[str, Any]):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self) -> FakeResult:
+        self.client.latency.sleep()
+        function = self.client.functions.get(self.name)
+        if function is None:
+            raise Exception(f"Could not find the function public.{self.name}")
+        with self.client.lock:
+            return FakeResult(function(self.client, **self.params))
+
+
+def _list_competitors(client: "FakeSupabaseClient", p_limit: int, p_cursor_created_at=None, p_cursor_id=None):
+    counts: Dict[str, int] = {}
+    for insight in client.tables.get("insights", []):
+        counts[insight["competitor_id"]] = counts.get(insight["competitor_id"], 0) + 1
+    competitors = sorted(client.tables.get("competitors", []), key=lambda row: (row["created_at"], row["id"]), reverse=True)
+    if p_cursor_created_at is not None:
+        competitors = [row for row in competitors if (row["created_at"], row["id"]) < (p_cursor_created_at, p_cursor_id)]
+    return [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "target_url": row["target_url"],
+            "created_at": row["created_at"],
+            "analyses_count": counts.get(row["id"], 0),
+        }
+        for row in competitors[:p_limit]
+    ]
+
+
+def _upsert_insights(client: "FakeSupabaseClient", p_rows: List[Dict[str, Any]]):
+    saved = []
+    index = client.index("insights", ["competitor_id", "fingerprint"])
+    for row in p_rows:
+        existing = index.get((row["competitor_id"], row["fingerprint"]))
+        if existing is None:
+            saved.extend(client.write("insights", [row], []))
+            continue
+        before = dict(existing)
+        existing.update(
+            weakness_description=row["weakness_description"],
+            severity=row["severity"],
+            category=row["category"],
+            simhash=row["simhash"],
+            occurrences=existing["occurrences"] + row["occurrences"],
+            last_seen_at=_now(),
+        )
+        client.track("insights", before, existing)
+        saved.append(dict(existing))
+    return saved
+
+
+def _merge_insights(client: "FakeSupabaseClient", p_keeper_id: str, p_duplicate_ids: List[str], p_changes: Dict[str, Any]):
+    # Runs under the client lock, so the delete and the update land together like the SQL function
+    doomed = set(p_duplicate_ids)
+    client.delete("insights", [row for row in client.tables.get("insights", []) if row["id"] in doomed])
+    for row in client.tables.get("insights", []):
+        if row["id"] == p_keeper_id:
+            before = dict(row)
+            row.update(p_changes)
+            client.track("insights", before, row)
+    return []
+
+
+def _search_insights(
+    client: "FakeSupabaseClient", p_query: str, p_competitor_id=None, p_severity=None, p_category=None,
+    p_limit: int = 20, p_cursor_rank=None, p_cursor_id=None,
+):
+    # Every query word must appear; title hits count double, roughly like the weighted tsvector
+    words = [word for word in re.findall(r"\w+", p_query.lower()) if word != "or"]
+    names = {row["id"]: row["name"] for row in client.tables.get("competitors", [])}
+    matches = []
+    for row in client.tables.get("insights", []):
+        if any(value and row[column] != value for column, value in (
+            ("competitor_id", p_competitor_id), ("severity", p_severity), ("category", p_category),
+        )):
+            continue
+        title, description = row["weakness_title"].lower(), row["weakness_description"].lower()
+        if not words or not all(word in title or word in description for word in words):
+            continue
+        rank = float(sum(2 * title.count(word) + description.count(word) for word in words))
+        if p_cursor_rank is not None and (rank, row["id"]) >= (p_cursor_rank, p_cursor_id):
+            continue
+        matches.append((rank, row))
+    matches.sort(key=lambda match: (match[0], match[1]["id"]), reverse=True)
+    columns = (
+        "id", "competitor_id", "weakness_title", "weakness_description",
+        "severity", "category", "occurrences", "last_seen_at",
+    )
+    return [
+        {**{column: row.get(column) for column in columns}, "competitor_name": names.get(row["competitor_id"]), "rank": rank}
+        for rank, row in matches[:p_limit]
+    ]
+
+
+def _export(rows: List[Dict[str, Any]], changed_at: str, p_since, p_limit: int, p_cursor_at, p_cursor_id):
+    if p_since is not None:
+        rows = [row for row in rows if row[changed_at] >= p_since]
+    if p_cursor_at is not None:
+        rows = [row for row in rows if (row[changed_at], row["id"]) > (p_cursor_at, p_cursor_id)]
+    return sorted(rows, key=lambda row: (row[changed_at], row["id"]))[:p_limit]
+
+
+def _export_competitors(client: "FakeSupabaseClient", p_limit: int, p_since=None, p_cursor_at=None, p_cursor_id=None):
+    columns = ("id", "name", "target_url", "created_at", "updated_at")
+    page = _export(client.tables.get("competitors", []), "updated_at", p_since, p_limit, p_cursor_at, p_cursor_id)
+    return [{column: row[column] for column in columns} for row in page]
+
+
+def _export_insights(client: "FakeSupabaseClient", p_limit: int, p_since=None, p_cursor_at=None, p_cursor_id=None):
+    columns = (
+        "id", "competitor_id", "weakness_title", "weakness_description",
+        "severity", "category", "occurrences", "created_at", "last_seen_at",
+    )
+    names = {row["id"]: row["name"] for row in client.tables.get("competitors", [])}
+    page = _export(client.tables.get("insights", []), "last_seen_at", p_since, p_limit, p_cursor_at, p_cursor_id)
+    return [
+        {**{column: row[column] for column in columns}, "competitor_name": names.get(row["competitor_id"])}
+        for row in page
+    ]
+
+
+class FakeSupabaseClient:
+    """
+    In-memory stand-in for supabase.Client
+
+    Every execute() sleeps for the configured latency on the calling thread
+    (the database executor), like an HTTP round trip to PostgREST, then runs
+    against dict rows. Unique keys, cascades, the insight rollup trigger and
+    the RPCs in `functions` mirror database_schema.sql closely enough for the
+    API's queries.
+    """
+
+    def __init__(self, latency: Latency = Latency(), max_rows: Optional[int] = None):
+        self.latency = latency
+        # PostgREST's db-max-rows: selects return at most this many rows whatever the range
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.functions: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+            "list_competitors": _list_competitors,
+            "upsert_insights": _upsert_insights,
+            "merge_insights": _merge_insights,
+            "search_insights": _search_insights,
+            "export_competitors": _export_competitors,
+            "export_insights": _export_insights,
+        }
+        # Rollup rows by (table, key), also listed in self.tables
+        self._rollups: Dict[tuple, Dict[str, Any]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    def index(self, table: str, columns: List[str]) -> Dict[tuple, Dict[str, Any]]:
+        return {tuple(row.get(column) for column in columns): row for row in self.tables.setdefault(table, [])}
+
+    def write(self, table: str, payload, conflict_columns: List[str]) -> List[Dict[str, Any]]:
+        """Insert rows, or update the row with the same conflict columns (called with the lock held)"""
+        rows = self.tables.setdefault(table, [])
+        existing = self.index(table, conflict_columns) if conflict_columns else {}
+        written = []
+        for values in payload if isinstance(payload, list) else [payload]:
+            key = tuple(values.get(column) for column in conflict_columns)
+            row = existing.get(key) if conflict_columns else None
+            if row is not None:
+                before = dict(row)
+                row.update(values)
+                if "updated_at" in row:
+                    row["updated_at"] = _now()
+                self.track(table, before, row)
+            else:
+                row = {"id": str(uuid.uuid4()), **_DEFAULTS.get(table, dict)(), **values}
+                rows.append(row)
+                if conflict_columns:
+                    existing[key] = row
+                self.track(table, None, row)
+            written.append(dict(row))
+        return written
+
+    def delete(self, table: str, matched: List[Dict[str, Any]]) -> None:
+        """Delete rows, cascading from competitors to their insights and snapshots (called with the lock held)"""
+        doomed = {id(row) for row in matched}
+        self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in doomed]
+        for row in matched:
+            self.track(table, row, None)
+        if table == "competitors":
+            ids = {row["id"] for row in matched}
+            for child in ("insights", "content_snapshots"):
+                self.delete(child, [row for row in self.tables.get(child, []) if row["competitor_id"] in ids])
+
+    def track(self, table: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """The track_insight_rollups trigger: move an insight's counts between rollup cells (called with the lock held)"""
+        if table != "insights":
+            return
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            cells = (
+                ("insight_rollups", (row["competitor_id"], row["severity"], row["category"]), ("competitor_id", "severity", "category")),
+                ("insight_rollup_totals", (row["severity"], row["category"]), ("severity", "category")),
+            )
+            for rollup, key, columns in cells:
+                cell = self._rollups.get((rollup, key))
+                if cell is None:
+                    cell = {**dict(zip(columns, key)), "insight_count": 0, "occurrence_count": 0}
+                    self._rollups[(rollup, key)] = cell
+                    self.tables.setdefault(rollup, []).append(cell)
+                cell["insight_count"] += sign
+                cell["occurrence_count"] += sign * (row.get("occurrences") or 1)
+                if cell["insight_count"] <= 0:
+                    del self._rollups[(rollup, key)]
+                    self.tables[rollup].remove(cell)
+
+    def seed(self, competitors: int, insights_per_competitor: int) -> None:
+        """Pre-populate competitors and insights, e.g. so /competitors pages have something to list"""
+        with self.lock:
+            for index in range(competitors):
+                competitor = self.write("competitors", {"name": f"Seeded Competitor {index}", "target_url": f"https://seed.example/{index}"}, ["name"])[0]
+                self.write("insights", [
+                    {
+                        "competitor_id": competitor["id"],
+                        "weakness_title": f"Seeded weakness {number}",
+                        "weakness_description": "Seeded for benchmarks",
+                        "severity": "medium",
+                        "category": "feature",
+                        "fingerprint": f"seed-{index}-{number}",
+                    }
+                    for number in range(insights_per_competitor)
+                ], [])
+
+
+def install_fakes(
+    scrape_latency: Latency,
+    llm_latency: Latency,
+    db_latency: Latency,
+    page_chars: int = 20000,
+    weakness_count: int = 8,
+    seed_competitors: int = 0,
+):
+    """
+    Import the API with Firecrawl, Gemini and Supabase replaced by the fakes
+
+    Must run before anything else imports `main` or `database`. Sets dummy
+    credentials so the readiness checks pass. Returns (main module, fake client).
+    """
+    os.environ["DATABASE_BACKEND"] = "supabase"
+    for name in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "FIRECRAWL_API_KEY", "GOOGLE_AI_API_KEY"):
+        os.environ[name] = "offline-benchmark"
+
+    import database
+    from database import SupabaseRepository
+
+    client = FakeSupabaseClient(db_latency)
+    client.seed(seed_competitors, insights_per_competitor=5)
+    # main binds the repository (and the insight writer to it) at import time
+    database.db_manager = SupabaseRepository(client=client)
+
+    import main
+    main.scraper = make_fake_scraper(scrape_latency, page_chars)
+    main.model_registry.model_factory = lambda model_id: FakeGenerativeModel(model_id, llm_latency, weakness_count)
+    return main, client
@@ -0,0 +1,373 @@
+"""
+Offline load test: run the API against local stand-ins for Firecrawl, Gemini
+and Supabase (benchmarks/fakes.py) and measure every endpoint under load.
+
+Starts the backend in a subprocess on a free port with the fakes installed,
+then drives each scenario with --concurrency clients until --requests calls
+have completed, and reports requests per second and p50/p95/p99 latency.
+Results are saved as JSON (by default under backend/.data/benchmarks/) so a
+later run can be compared against them with --compare.
+
+Scenarios: analyze, analyze_stream, batch, crawl, jobs, competitors, insight_stats, insight_search, export_insights, ready, metrics, health
+
+Usage (from backend/):
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --scenarios analyze competitors -c 32 -n 500 --llm-latency 2.0
+    python benchmarks/load_test.py --compare latest
+
+Caches are disabled by default so every analysis reaches all three fakes;
+pass --cache to measure with them on, and --pages N to make requests reuse N
+distinct pages. --base-url drives an already running backend (real clients)
+instead of starting one.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import data_path  # noqa: E402
+
+
+def _analyze_payload(args: argparse.Namespace, run_id: str, index: int) -> Dict[str, str]:
+    page = index % args.pages if args.pages else index
+    return {
+        "target_url": f"https://bench.example/{run_id}/page/{page}",
+        "competitor_name": f"Benchmark {run_id} {page % args.competitors}",
+    }
+
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} returned {response.status_code}")
+
+
+async def _analyze(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    _check(await client.post("/analyze", json=_analyze_payload(args, run_id, index)))
+
+
+async def _analyze_stream(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    async with client.stream("POST", "/analyze/stream", json=_analyze_payload(args, run_id, index)) as response:
+        _check(response)
+        body = "".join([chunk async for chunk in response.aiter_text()])
+    if "event: result" not in body:
+        raise RuntimeError("stream ended without a result event")
+
+
+async def _batch(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    items = [_analyze_payload(args, run_id, index * args.batch_size + offset) for offset in range(args.batch_size)]
+    response = await client.post("/analyze/batch", json={"items": items})
+    _check(response)
+    summary = json.loads(response.text.strip().splitlines()[-1])
+    if summary.get("failed"):
+        raise RuntimeError(f"{summary['failed']} batch items failed")
+
+
+async def _crawl(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    payload = dict(_analyze_payload(args, run_id, index), max_depth=2, max_pages=args.crawl_pages)
+    response = await client.post("/crawl", json=payload)
+    _check(response)
+    summary = json.loads(response.text.strip().splitlines()[-1])
+    if summary.get("pages_failed"):
+        raise RuntimeError(f"{summary['pages_failed']} crawled pages failed")
+
+
+async def _jobs(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    response = await client.post("/jobs", json=_analyze_payload(args, run_id, index))
+    _check(response)
+    job_id = response.json()["job_id"]
+    while True:
+        status = await client.get(f"/jobs/{job_id}")
+        _check(status)
+        state = status.json()["status"]
+        if state == "succeeded":
+            return
+        if state == "failed":
+            raise RuntimeError(status.json().get("error") or "job failed")
+        await asyncio.sleep(0.02)
+
+
+async def _competitors(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    _check(await client.get("/competitors", params={"limit": 50}))
+
+
+async def _insight_search(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    params = {"q": f"weakness {index % 5}", "limit": 20}
+    _check(await client.get("/insights/search", params=params))
+
+
+async def _export_insights(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+    async with client.stream("GET", "/export/insights", params={"gzip": "true"}) as response:
+        _check(response)
+        async for _ in response.aiter_bytes():
+            pass
+
+
+def _get(path: str) -> Callable[..., Awaitable[None]]:
+    async def call(client: httpx.AsyncClient, args, run_id: str, index: int) -> None:
+        _check(await client.get(path))
+    return call
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[None]]] = {
+    "analyze": _analyze,
+    "analyze_stream": _analyze_stream,
+    "batch": _batch,
+    "crawl": _crawl,
+    "jobs": _jobs,
+    "competitors": _competitors,
+    "insight_stats": _get("/insights/stats"),
+    "insight_search": _insight_search,
+    "export_insights": _export_insights,
+    "ready": _get("/ready"),
+    "metrics": _get("/metrics"),
+    "health": _get("/"),
+}
+DEFAULT_SCENARIOS = ["analyze", "analyze_stream", "batch", "jobs", "competitors", "health"]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+async def run_scenario(client: httpx.AsyncClient, args, name: str, run_id: str) -> Dict[str, float]:
+    """Closed loop: `concurrency` workers issue requests back to back until `requests` have been made"""
+    call = SCENARIOS[name]
+    latencies: List[float] = []
+    errors: List[str] = []
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < args.requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                await call(client, args, run_id, index)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e))
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    ordered = sorted(latencies)
+    if errors:
+        print(f"  {name}: {len(errors)} errors, first: {errors[0]}")
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "seconds": wall,
+        "rps": len(latencies) / wall if wall else 0.0,
+        "mean": statistics.mean(ordered) if ordered else 0.0,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["DATA_DIR"] = tempfile.mkdtemp(prefix="load_test_")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["CRAWL_DOMAIN_DELAY"] = str(args.crawl_delay)
+    if not args.cache:
+        env["SCRAPE_CACHE_TTL"] = "0"
+        env["ANALYSIS_CACHE_TTL"] = "0"
+    command = [
+        sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port),
+        "--scrape-latency", str(args.scrape_latency), "--llm-latency", str(args.llm_latency),
+        "--db-latency", str(args.db_latency), "--jitter", str(args.jitter),
+        "--page-chars", str(args.page_chars), "--weaknesses", str(args.weaknesses),
+        "--seed-competitors", str(args.seed_competitors),
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not become ready")
+
+
+async def drive(args: argparse.Namespace, base_url: str, server: Optional[subprocess.Popen]) -> Dict:
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await _wait_ready(client, server)
+        results = {}
+        for name in args.scenarios:
+            print(f"▶ {name}: {args.requests} requests, {args.concurrency} concurrent")
+            results[name] = await run_scenario(client, args, name, run_id)
+        stage_stats = (await client.get("/stage-stats")).json()
+    return {"scenarios": results, "stage_stats": stage_stats}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n  {'scenario':16} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, result in results.items():
+        print(
+            f"  {name:16} {result['requests']:6d} {result['errors']:6d} {result['rps']:8.1f} "
+            f"{result['p50'] * 1000:9.1f} {result['p95'] * 1000:9.1f} {result['p99'] * 1000:9.1f} {result['max'] * 1000:9.1f}"
+        )
+
+
+def _results_dir() -> str:
+    path = data_path("benchmarks")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _load_baseline(reference: str, exclude: str) -> Optional[Dict]:
+    if reference == "latest":
+        saved = sorted(path for path in glob.glob(os.path.join(_results_dir(), "load-*.json")) if path != exclude)
+        if not saved:
+            print("\nNo earlier results to compare against")
+            return None
+        reference = saved[-1]
+    with open(reference) as f:
+        baseline = json.load(f)
+    baseline["path"] = reference
+    return baseline
+
+
+def _compare(current: Dict[str, Dict[str, float]], baseline: Dict) -> None:
+    print(f"\nCompared with {baseline['path']} ({baseline.get('git_commit') or 'unknown commit'}, {baseline['started_at']})")
+    print(f"  {'scenario':16} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in current.items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+
+        def delta(key: str) -> str:
+            return f"{(result[key] / before[key] - 1) * 100:+8.1f}%" if before[key] else "      n/a"
+
+        print(f"  {name:16} {delta('rps')} {delta('p50')} {delta('p95')} {delta('p99')}")
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the API with the fakes installed (the subprocess side of the load test)"""
+    from fakes import Latency, install_fakes
+
+    main_module, _ = install_fakes(
+        scrape_latency=Latency(args.scrape_latency, args.jitter),
+        llm_latency=Latency(args.llm_latency, args.jitter),
+        db_latency=Latency(args.db_latency, args.jitter),
+        page_chars=args.page_chars,
+        weakness_count=args.weaknesses,
+        seed_competitors=args.seed_competitors,
+    )
+    import uvicorn
+    uvicorn.run(main_module.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS, choices=list(SCENARIOS))
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Concurrent clients per scenario")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--pages", type=int, default=0, help="Distinct pages to cycle through (0: a new page per request)")
+    parser.add_argument("--competitors", type=int, default=20, help="Distinct competitor names the pages belong to")
+    parser.add_argument("--batch-size", type=int, default=5, help="Items per /analyze/batch request")
+    parser.add_argument("--crawl-pages", type=int, default=10, help="max_pages per /crawl request")
+    parser.add_argument("--crawl-delay", type=float, default=0.1, help="Seconds between requests to one host in crawls")
+    parser.add_argument("--cache", action="store_true", help="Keep the scrape and analysis caches on")
+    parser.add_argument("--scrape-latency", type=float, default=0.8, help="Seconds per fake Firecrawl scrape")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Seconds per fake Gemini generation")
+    parser.add_argument("--db-latency", type=float, default=0.03, help="Seconds per fake Supabase round trip")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency spread as a fraction of the latency")
+    parser.add_argument("--page-chars", type=int, default=20000, help="Characters of markdown per scraped page")
+    parser.add_argument("--weaknesses", type=int, default=8, help="Weaknesses per fake Gemini answer")
+    parser.add_argument("--seed-competitors", type=int, default=200, help="Competitors in the fake database before the run")
+    parser.add_argument("--base-url", help="Drive this running backend instead of starting one with the fakes")
+    parser.add_argument("--output", help="Where to save the results (default: backend/.data/benchmarks/load-<time>.json)")
+    parser.add_argument("--compare", help="Results file to compare against, or 'latest'")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        port = _free_port()
+        server = _start_server(args, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    started_at = datetime.now(timezone.utc)
+    try:
+        run = asyncio.run(drive(args, base_url, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    _report(run["scenarios"])
+
+    config = {key: value for key, value in vars(args).items() if key not in ("serve", "port", "output", "compare")}
+    output = args.output or os.path.join(_results_dir(), f"load-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "started_at": started_at.isoformat(),
+            "git_commit": _git_commit(),
+            "config": config,
+            **run,
+        }, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        baseline = _load_baseline(args.compare, exclude=output)
+        if baseline:
+            _compare(run["scenarios"], baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Worker startup time: how long a fresh process takes to import the API and
+run its startup hook, i.e. how long a new container waits before serving.
+
+Each run is a new Python process that measures three phases:
+
+    import   `import main` (module-level work, SDK imports)
+    startup  the FastAPI lifespan hook up to the point the app serves requests
+    warm     until the background Firecrawl/Gemini client warm-up finishes
+
+One extra run under `python -X importtime` lists the slowest imports, down to
+the modules that main and the warm-up import directly.
+Runs use the sqlite backend in a temporary DATA_DIR by default, so no network
+or credentials are needed; pass --backend to measure another one.
+
+Usage (from backend/):
+
+    python benchmarks/startup_time.py -n 10
+    python benchmarks/startup_time.py -n 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Runs inside the child process; prints one JSON line with the phase durations
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        await main.app.state.client_warm_up
+        warm = time.perf_counter()
+    return ready, warm
+
+ready, warm = asyncio.run(boot())
+print("STARTUP " + json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "warm": warm - imported,
+}))
+"""
+
+PHASES = ("import", "startup", "warm")
+
+
+def _env(backend: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["DATABASE_BACKEND"] = backend
+    env.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="startup_benchmark_"))
+    return env
+
+
+def _run_once(env: Dict[str, str], importtime: bool = False) -> Tuple[Dict[str, float], str]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):]), result.stderr
+    raise RuntimeError(f"Startup run failed:\n{result.stdout}\n{result.stderr}")
+
+
+def _slowest_imports(importtime_log: str, count: int) -> List[Tuple[str, float]]:
+    """Modules at the top two import levels by cumulative time, from `-X importtime` output"""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level under the module that pulled them in
+        if not name.startswith("    "):
+            imports.append((name.strip(), int(cumulative) / 1_000_000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Fresh processes to time")
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "postgres", "supabase"])
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    env = _env(args.backend)
+    runs = [_run_once(env)[0] for _ in range(args.runs)]
+    _, importtime_log = _run_once(env, importtime=True)
+
+    summary = {}
+    print(f"Startup time over {args.runs} runs ({args.backend} backend)")
+    print(f"  {'phase':10} {'p50 ms':>8} {'max ms':>8}")
+    for phase in PHASES:
+        durations = [run[phase] for run in runs]
+        summary[phase] = {"p50": statistics.median(durations), "max": max(durations)}
+        print(f"  {phase:10} {summary[phase]['p50'] * 1000:8.1f} {summary[phase]['max'] * 1000:8.1f}")
+
+    slowest = _slowest_imports(importtime_log, args.top)
+    print("\nSlowest imports (cumulative, one run)")
+    for name, seconds in slowest:
+        print(f"  {name:40} {seconds * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": args.backend, "runs": runs, "summary": summary, "slowest_imports": slowest}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-query latency of the storage backends (supabase, postgres, sqlite).
+
+Runs each repository operation the API uses against every requested backend
+and prints p50/p95/mean latency per operation. The run creates one throwaway
+competitor ("Storage Benchmark <random>") and deletes it, with its insights
+and snapshot, at the end.
+
+Usage (from backend/, with the credentials for each backend in .env):
+
+    python benchmarks/storage_latency.py --backends sqlite postgres supabase -n 50
+
+The sqlite backend writes to a temporary file unless SQLITE_DATABASE_PATH is set.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import load_environment  # noqa: E402
+
+load_environment()
+
+from executor import shutdown_stages  # noqa: E402
+from models import ProductWeakness  # noqa: E402
+from repository import Repository, create_repository  # noqa: E402
+
+
+def _weaknesses(round_index: int) -> List[ProductWeakness]:
+    return [
+        ProductWeakness(
+            title=f"Benchmark weakness {round_index % 5} {kind}",
+            description=f"Synthetic {kind} weakness written by the storage benchmark, round {round_index}.",
+            severity="medium",
+            category=kind,
+        )
+        for kind in ("pricing", "support", "feature")
+    ]
+
+
+async def _time(samples: Dict[str, List[float]], name: str, call: Callable[[], Awaitable]) -> None:
+    started = time.perf_counter()
+    await call()
+    samples.setdefault(name, []).append(time.perf_counter() - started)
+
+
+async def bench(repository: Repository, iterations: int) -> Dict[str, List[float]]:
+    name = f"Storage Benchmark {uuid.uuid4().hex[:8]}"
+    url = "https://example.com/storage-benchmark"
+    samples: Dict[str, List[float]] = {}
+
+    await repository.connect()
+    competitor = await repository.create_competitor(name, url)
+    try:
+        for round_index in range(iterations):
+            await _time(samples, "create_competitor (existing)", lambda: repository.create_competitor(name, url))
+            await _time(samples, "get_competitor_by_name", lambda: repository.get_competitor_by_name(name))
+            await _time(samples, "list_competitors (20)", lambda: repository.list_competitors(20))
+            await _time(samples, "save_insights (3)", lambda: repository.save_insights(competitor.id, _weaknesses(round_index)))
+            await _time(samples, "get_insights", lambda: repository.get_insights(competitor.id))
+            await _time(samples, "save_snapshot", lambda: repository.save_snapshot(competitor.id, url, [uuid.uuid4().hex] * 20))
+            await _time(samples, "get_snapshot", lambda: repository.get_snapshot(competitor.id, url))
+    finally:
+        await repository.delete_competitor(competitor.id)
+        await repository.close()
+    return samples
+
+
+def _report(backend: str, samples: Dict[str, List[float]]) -> None:
+    print(f"\n{backend}")
+    print(f"  {'operation':32} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for operation, latencies in samples.items():
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(
+            f"  {operation:32} {statistics.median(ordered) * 1000:8.2f} "
+            f"{p95 * 1000:8.2f} {statistics.mean(ordered) * 1000:8.2f}"
+        )
+
+
+async def run(backends: List[str], iterations: int) -> None:
+    for backend in backends:
+        try:
+            repository = create_repository(backend)
+        except Exception as e:
+            print(f"\n{backend}: skipped ({e})")
+            continue
+        _report(backend, await bench(repository, iterations))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "postgres", "supabase"],
+                        choices=["sqlite", "postgres", "supabase"])
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="Rounds of every operation per backend")
+    args = parser.parse_args()
+
+    if "sqlite" in args.backends and not os.getenv("SQLITE_DATABASE_PATH"):
+        os.environ["SQLITE_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "storage_benchmark.sqlite3")
+    try:
+        asyncio.run(run(args.backends, args.iterations))
+    finally:
+        shutdown_stages()
+
+
+if __name__ == "__main__":
+    main()
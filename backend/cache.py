@@ -0,0 +1,221 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from metrics import cache_lookups
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+
+@dataclass
+class CacheEntry:
+    """A cached value together with its content hash and when it was stored"""
+    value: str
+    content_hash: str
+    stored_at: float
+
+
+def content_hash(value: str) -> str:
+    """SHA-256 of the cached content, stored with every entry"""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings share a cache key
+
+    Lowercases scheme and host, drops the fragment, default ports, tracking
+    parameters and trailing slashes, and sorts the remaining query parameters.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class PersistentCache:
+    """
+    Two-tier string cache: an in-memory LRU in front of a SQLite table.
+
+    Entries expire after `ttl_seconds`. The memory tier holds at most
+    `max_memory_entries`; the disk tier holds at most `max_disk_entries` and
+    evicts the least recently used rows beyond that. Safe to use from the
+    stage executor threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        ttl_seconds: int,
+        max_memory_entries: int = 128,
+        max_disk_entries: int = 5000,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries(accessed_at)"
+        )
+        self._conn.commit()
+
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.stored_at < self.ttl_seconds
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return a fresh entry for the key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry, now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    cache_lookups.inc(cache=self.name, result="memory_hit")
+                    return entry
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, content_hash, stored_at FROM cache_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                cache_lookups.inc(cache=self.name, result="miss")
+                return None
+
+            entry = CacheEntry(value=row[0], content_hash=row[1], stored_at=row[2])
+            if not self._is_fresh(entry, now):
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                cache_lookups.inc(cache=self.name, result="miss")
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._remember(key, entry)
+            self._counters["disk_hits"] += 1
+            cache_lookups.inc(cache=self.name, result="disk_hit")
+            return entry
+
+    def set(self, key: str, value: str) -> CacheEntry:
+        """Store a value in both tiers, evicting the oldest disk rows past the size cap"""
+        now = time.time()
+        entry = CacheEntry(value=value, content_hash=content_hash(value), stored_at=now)
+        if not self.enabled:
+            return entry
+
+        with self._lock:
+            self._remember(key, entry)
+            self._conn.execute(
+                """
+                INSERT INTO cache_entries (key, value, content_hash, stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    content_hash = excluded.content_hash,
+                    stored_at = excluded.stored_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, entry.value, entry.content_hash, entry.stored_at, now),
+            )
+            self._counters["writes"] += 1
+
+            overflow = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_disk_entries
+            if overflow > 0:
+                self._conn.execute(
+                    """
+                    DELETE FROM cache_entries WHERE key IN (
+                        SELECT key FROM cache_entries ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (overflow,),
+                )
+                self._counters["evictions"] += overflow
+            self._conn.commit()
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current sizes, for tuning the TTL"""
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            counters = dict(self._counters)
+
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
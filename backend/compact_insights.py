@@ -0,0 +1,111 @@
+"""
+One-off compaction: fingerprint existing insights and merge duplicates.
+
+Rows saved before fingerprinting have no fingerprint and may repeat the same
+weakness many times. For each competitor this groups its insights the same
+way new writes are matched (exact fingerprint or SimHash near duplicate),
+keeps the oldest row of each group with the summed occurrences, the latest
+description and the latest last_seen_at, and deletes the rest.
+
+Usage (from backend/, after adding the new columns from database_schema.sql):
+
+    python compact_insights.py --dry-run
+    python compact_insights.py
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from config import configure_logging, load_environment
+
+load_environment()
+configure_logging()
+
+from database import db_manager  # noqa: E402
+from fingerprints import FingerprintIndex, insight_fingerprint, insight_simhash  # noqa: E402
+from models import InsightRecord, ProductWeakness  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def _weakness(insight: InsightRecord) -> ProductWeakness:
+    return ProductWeakness(
+        title=insight.weakness_title,
+        description=insight.weakness_description,
+        severity=insight.severity,
+        category=insight.category,
+    )
+
+
+def _seen_at(insight: InsightRecord) -> datetime:
+    return insight.last_seen_at or insight.created_at
+
+
+async def compact_competitor(competitor_id: str, dry_run: bool) -> Dict[str, int]:
+    insights = await db_manager.get_insight_records(competitor_id)
+
+    index = FingerprintIndex()
+    groups: Dict[str, List[InsightRecord]] = {}
+    for insight in insights:
+        weakness = _weakness(insight)
+        fingerprint = index.canonical(insight_fingerprint(weakness), insight_simhash(weakness))
+        groups.setdefault(fingerprint, []).append(insight)
+
+    removed = updated = 0
+    for fingerprint, group in groups.items():
+        keeper, duplicates = group[0], group[1:]
+        if not duplicates and keeper.fingerprint == fingerprint:
+            continue
+        latest = max(group, key=_seen_at)
+        removed += len(duplicates)
+        updated += 1
+        if dry_run:
+            continue
+        await db_manager.merge_insights(
+            keeper.id,
+            [insight.id for insight in duplicates],
+            {
+                "fingerprint": fingerprint,
+                "simhash": insight_simhash(_weakness(latest)),
+                "weakness_description": latest.weakness_description,
+                "severity": latest.severity,
+                "occurrences": sum(insight.occurrences for insight in group),
+                "last_seen_at": _seen_at(latest),
+            },
+        )
+
+    return {"scanned": len(insights), "removed": removed, "updated": updated}
+
+
+async def run(dry_run: bool) -> None:
+    totals = {"competitors": 0, "scanned": 0, "removed": 0, "updated": 0}
+    await db_manager.connect()
+    try:
+        for competitor_id in await db_manager.list_competitor_ids():
+            counts = await compact_competitor(competitor_id, dry_run)
+            totals["competitors"] += 1
+            for key, value in counts.items():
+                totals[key] += value
+            if counts["removed"]:
+                logger.info("%s: %d duplicate insights of %d", competitor_id, counts["removed"], counts["scanned"])
+    finally:
+        await db_manager.close()
+
+    verb = "Would remove" if dry_run else "Removed"
+    logger.info(
+        "%s %d of %d insights across %d competitors; %d rows fingerprinted or merged",
+        verb, totals["removed"], totals["scanned"], totals["competitors"], totals["updated"],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    asyncio.run(run(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Rough chars-per-token ratio for Gemini on English markdown; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_REF_LINK = re.compile(r"^\s*\[[^\]]+\]:\s*\S+.*$", re.MULTILINE)
+_BARE_URL = re.compile(r"<?https?://\S+>?")
+_HTML_TAG = re.compile(r"<[^>\n]+>")
+_EMPHASIS = re.compile(r"(\*\*|__)(.*?)\1")
+_INLINE_SPACE = re.compile(r"[ \t ]+")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+# List items that are nothing but a link are navigation menus
+_NAV_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\[[^\]]*\]\([^)]*\)\s*$")
+_WORD = re.compile(r"\w+")
+MAX_BOILERPLATE_CHARS = 200
+
+# Lines that carry no review content: navigation, consent banners, rating widgets
+_BOILERPLATE = re.compile(
+    r"""^(
+        (accept|reject|allow|manage)(\s+all)?(\s+(cookies|cookie\s+settings|preferences))?
+      | .*\b(cookie|cookies)\b.*\b(use|consent|accept|policy|settings)\b.*
+      | (sign\s*(in|up)|log\s*(in|out)|register|subscribe|menu|search|skip\s+to\s+(main\s+)?content)
+      | (privacy\s+policy|terms(\s+(of\s+(use|service)|and\s+conditions))?|legal|sitemap|contact\s+us|about\s+us)
+      | (write\s+a\s+review|see\s+all\s+reviews|read\s+more|show\s+more|load\s+more|see\s+more|view\s+more)
+      | (helpful|not\s+helpful|share|report|reply|useful|flag)(\s*\(\d+\))?
+      | (was\s+this\s+(review\s+)?helpful\??)
+      | (verified(\s+(user|reviewer|purchase))?|unprompted\s+review|invited)
+      | rated\s+\d(\.\d)?\s+out\s+of\s+\d(\s+stars?)?
+      | \d(\.\d)?\s*(/|out\s+of)\s*5(\s+stars?)?
+      | [★☆⭐✩✪\s]+
+      | (©|copyright).*
+      | (previous|next|page\s+\d+(\s+of\s+\d+)?|\d+|«|»|‹|›|…)
+    )\s*[.:!]?$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+@dataclass
+class CompactionResult:
+    """Compacted text plus before/after sizes"""
+    text: str
+    chars_before: int
+    chars_after: int
+
+    @property
+    def tokens_before(self) -> int:
+        return estimate_tokens_from_chars(self.chars_before)
+
+    @property
+    def tokens_after(self) -> int:
+        return estimate_tokens_from_chars(self.chars_after)
+
+
+def estimate_tokens_from_chars(chars: int) -> int:
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _clean_line(line: str) -> str:
+    line = _IMAGE.sub("", line)
+    line = _LINK.sub(r"\1", line)
+    line = _BARE_URL.sub("", line)
+    line = _HTML_TAG.sub("", line)
+    line = _EMPHASIS.sub(r"\2", line)
+    return _INLINE_SPACE.sub(" ", line).strip()
+
+
+def _is_boilerplate(line: str) -> bool:
+    body = _LIST_MARKER.sub("", line).strip("#>|-*_ ").strip()
+    if not body:
+        return True
+    # Lines with no letters or digits are leftover punctuation/table rules
+    if not any(ch.isalnum() for ch in body):
+        return True
+    # Long lines are review text even if they mention cookies or ratings
+    return len(body) <= MAX_BOILERPLATE_CHARS and bool(_BOILERPLATE.match(body))
+
+
+def _shingles(words: List[str], size: int = 3) -> set:
+    return {hash(tuple(words[i:i + size])) for i in range(max(len(words) - size + 1, 1))}
+
+
+def compact_markdown(
+    content: str,
+    token_budget: Optional[int] = None,
+    near_duplicate_threshold: float = 0.8,
+    window: int = 200,
+) -> CompactionResult:
+    """
+    Shrink scraped markdown before it goes into a prompt
+
+    Strips images, links (keeping their text), bare URLs and HTML tags, drops
+    boilerplate lines (navigation, cookie banners, rating widgets, "helpful"
+    buttons) and exact or near-duplicate paragraphs, collapses whitespace, and
+    finally cuts the text at a paragraph boundary to fit token_budget.
+
+    A paragraph is a near duplicate when most of its word 3-shingles appear in
+    one of the last `window` kept paragraphs; of the two, the longer one is
+    kept, so a truncated review snippet gives way to the full review.
+    """
+    chars_before = len(content)
+    content = _REF_LINK.sub("", content)
+
+    paragraphs: List[str] = []
+    for block in re.split(r"\n\s*\n", content):
+        lines = [_clean_line(line) for line in block.splitlines() if not _NAV_ITEM.match(line)]
+        kept = [line for line in lines if line and not _is_boilerplate(line)]
+        if kept:
+            paragraphs.append("\n".join(kept))
+
+    seen_exact = set()
+    recent: List[Tuple[int, set]] = []
+    unique: List[str] = []
+    for paragraph in paragraphs:
+        words = _WORD.findall(paragraph.lower())
+        key = " ".join(words)
+        if key in seen_exact:
+            continue
+        seen_exact.add(key)
+
+        if len(words) >= 8:
+            shingles = _shingles(words)
+            duplicate_of = None
+            for position, (index, other) in enumerate(recent):
+                overlap = len(shingles & other) / min(len(shingles), len(other))
+                if overlap >= near_duplicate_threshold:
+                    duplicate_of = position
+                    break
+            if duplicate_of is not None:
+                index, other = recent[duplicate_of]
+                if len(paragraph) > len(unique[index]):
+                    unique[index] = paragraph
+                    recent[duplicate_of] = (index, shingles)
+                continue
+            recent.append((len(unique), shingles))
+            if len(recent) > window:
+                recent.pop(0)
+        unique.append(paragraph)
+
+    if token_budget:
+        max_chars = token_budget * CHARS_PER_TOKEN
+        fitted: List[str] = []
+        used = 0
+        for paragraph in unique:
+            cost = len(paragraph) + (2 if fitted else 0)
+            if used + cost > max_chars:
+                if not fitted:
+                    fitted.append(paragraph[:max_chars])
+                break
+            fitted.append(paragraph)
+            used += cost
+        unique = fitted
+
+    text = "\n\n".join(unique)
+    return CompactionResult(text=text, chars_before=chars_before, chars_after=len(text))
+
+
+class CompactionStats:
+    """Running totals of prompt content before and after compaction"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.analyses = 0
+        self.chars_before = 0
+        self.chars_after = 0
+
+    def record(self, result: CompactionResult) -> None:
+        with self._lock:
+            self.analyses += 1
+            self.chars_before += result.chars_before
+            self.chars_after += result.chars_after
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "analyses": self.analyses,
+                "chars_before": self.chars_before,
+                "chars_after": self.chars_after,
+                "estimated_tokens_before": estimate_tokens_from_chars(self.chars_before),
+                "estimated_tokens_after": estimate_tokens_from_chars(self.chars_after),
+                "reduction": round(1 - self.chars_after / self.chars_before, 4) if self.chars_before else 0.0,
+            }
+
+
+compaction_stats = CompactionStats()
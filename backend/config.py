@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to the default"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using default %s", name, value, default)
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, falling back to the default"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Invalid value for %s: %r, using default %s", name, value, default)
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on) from the environment"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def data_path(name: str) -> str:
+    """Path for a local data file (caches, job store), under DATA_DIR or backend/.data"""
+    base = os.getenv("DATA_DIR") or os.path.join(os.path.dirname(__file__), ".data")
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, name)
+
+
+def load_environment() -> None:
+    """
+    Load settings from .env into the environment, once, before other modules read them
+
+    Reads backend/.env, or the project root .env when there is none, and never
+    overrides variables that are already set. The legacy `Untitled` KEY=VALUE
+    file in the project root is read only when FIRECRAWL_API_KEY is still
+    missing afterwards.
+    """
+    from dotenv import load_dotenv
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    for env_path in (os.path.join(backend_dir, ".env"), os.path.join(backend_dir, "..", ".env")):
+        if os.path.exists(env_path):
+            load_dotenv(dotenv_path=env_path)
+            break
+    if os.getenv("FIRECRAWL_API_KEY"):
+        return
+
+    untitled_path = os.path.join(backend_dir, "..", "Untitled")
+    if not os.path.exists(untitled_path):
+        return
+    with open(untitled_path, "r") as f:
+        for line in f:
+            if "=" in line:
+                key, value = line.strip().split("=", 1)
+                os.environ.setdefault(key, value)
+    logger.info("Loaded environment variables from Untitled file")
+
+
+# Attributes every LogRecord has; anything else was passed through `extra` and is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """`time LEVEL logger: message key=value ...` for terminals and plain log files"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = " ".join(f"{key}={value}" for key, value in _fields(record).items())
+        return f"{line} {fields}" if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the `extra` fields as top-level keys, for log collectors"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """
+    Send log records to stderr at LOG_LEVEL (default INFO)
+
+    LOG_FORMAT=json writes one JSON object per line; the default is text.
+    Per-request details log at DEBUG, so production can run at INFO or
+    WARNING without paying for them. Does nothing if the root logger was
+    already configured by the host process.
+    """
+    level = logging.getLevelName((os.getenv("LOG_LEVEL") or "INFO").upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if (os.getenv("LOG_FORMAT") or "").lower() == "json" else TextFormatter())
+    logging.basicConfig(level=level, handlers=[handler])
+    # httpx (used by the Supabase client) logs every HTTP request at INFO
+    logging.getLogger("httpx").setLevel(max(level, logging.WARNING))
@@ -0,0 +1,348 @@
+import asyncio
+import io
+import ipaddress
+import logging
+import re
+import socket
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+from analysis import section_hash
+from cache import normalize_url
+from config import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+FetchFn = Callable[[str], Awaitable[Optional[str]]]
+
+# Markdown links and autolinks; the target may be relative to the page
+LINK_PATTERN = re.compile(r"\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)|<(https?://[^>\s]+)>")
+
+# Links to these are files, not pages worth analyzing
+SKIPPED_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip", ".gz",
+    ".mp4", ".mp3", ".webm", ".css", ".js", ".json", ".xml", ".rss", ".woff", ".woff2",
+)
+
+# Nested sitemaps fetched at most per crawl, so a huge sitemap index can't stall it
+MAX_SITEMAPS = 10
+# Redirects followed per sitemap download; each target is checked like the original URL
+MAX_SITEMAP_REDIRECTS = 5
+
+
+@dataclass
+class CrawledPage:
+    """One page of a crawl, handed to the consumer exactly once per distinct content"""
+    url: str
+    depth: int
+    content: str
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    failed: int = 0
+    duplicate_urls: int = 0
+    duplicate_content: int = 0
+    emitted: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def same_site(host: str, seed_host: str) -> bool:
+    """The seed's host or one of its subdomains; www. is ignored on both sides"""
+    host, seed_host = host.removeprefix("www."), seed_host.removeprefix("www.")
+    return host == seed_host or host.endswith("." + seed_host)
+
+
+def extract_links(page_url: str, markdown: str) -> List[str]:
+    """Absolute http(s) page links in the scraped markdown, in document order"""
+    links = []
+    for match in LINK_PATTERN.finditer(markdown):
+        target = match.group(1) or match.group(2)
+        if target.startswith(("#", "mailto:", "tel:", "javascript:", "data:")):
+            continue
+        url = urljoin(page_url, target)
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+            continue
+        links.append(url)
+    return links
+
+
+class _DomainGate:
+    """Per-host politeness: at most `concurrency` requests in flight, started at least `delay` apart"""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            async with self.lock:
+                loop = asyncio.get_running_loop()
+                wait = self.next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.next_start = loop.time() + self.delay
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class Crawler:
+    """
+    Bounded breadth-first crawl of a competitor site.
+
+    Fetch workers take URLs from a frontier, wait for their host's politeness
+    gate, and hand each page to the consumer through a small bounded queue, so
+    at most a few pages are held in memory whatever the crawl size: a slow
+    consumer pauses the fetchers instead of letting pages pile up. URLs are
+    deduplicated by canonical form (normalize_url) before fetching and pages by
+    a hash of their normalized text after, so mirrors such as `?page=1` are
+    analyzed once. Fetches are reserved against max_pages before they start,
+    which keeps the crawl from paying for pages it would drop.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchFn,
+        max_pages: int,
+        max_depth: int,
+        same_domain: bool = True,
+        concurrency: Optional[int] = None,
+        domain_concurrency: Optional[int] = None,
+        domain_delay: Optional[float] = None,
+    ):
+        self.fetch = fetch
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.same_domain = same_domain
+        self.concurrency = concurrency or env_int("CRAWL_CONCURRENCY", 4)
+        self.domain_concurrency = domain_concurrency or env_int("CRAWL_DOMAIN_CONCURRENCY", 2)
+        self.domain_delay = env_float("CRAWL_DOMAIN_DELAY", 1.0) if domain_delay is None else domain_delay
+        # Links beyond this many known URLs are ignored; enough slack for failed and duplicate pages
+        self.max_urls = max_pages * 3
+        self.stats = CrawlStats()
+
+    async def crawl(self, seeds: List[str]) -> AsyncIterator[CrawledPage]:
+        """Yield each distinct page once, in fetch completion order"""
+        frontier: asyncio.Queue = asyncio.Queue()
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        seen_urls: Set[str] = set()
+        seen_content: Set[str] = set()
+        gates: Dict[str, _DomainGate] = {}
+        seed_hosts = {host_of(normalize_url(seed)) for seed in seeds}
+        slots = asyncio.Condition()
+        fetching = 0
+        done = object()
+
+        def enqueue(url: str, depth: int) -> None:
+            canonical = normalize_url(url)
+            if self.same_domain and not any(same_site(host_of(canonical), seed) for seed in seed_hosts):
+                return
+            if canonical in seen_urls:
+                self.stats.duplicate_urls += 1
+                return
+            if len(seen_urls) >= self.max_urls:
+                return
+            seen_urls.add(canonical)
+            frontier.put_nowait((url, depth))
+
+        async def reserve() -> bool:
+            """Wait until a fetch could still produce a wanted page; False once max_pages are in"""
+            nonlocal fetching
+            async with slots:
+                await slots.wait_for(lambda: self.stats.emitted + fetching < self.max_pages or fetching == 0)
+                if self.stats.emitted >= self.max_pages:
+                    return False
+                fetching += 1
+                return True
+
+        async def release() -> None:
+            nonlocal fetching
+            async with slots:
+                fetching -= 1
+                slots.notify_all()
+
+        async def visit(url: str, depth: int) -> None:
+            # www. and the bare host are the same server, so they share a gate
+            host = host_of(url).removeprefix("www.")
+            gate = gates.get(host)
+            if gate is None:
+                gate = gates[host] = _DomainGate(self.domain_concurrency, self.domain_delay)
+            async with gate:
+                content = await self.fetch(url)
+            if not content:
+                self.stats.failed += 1
+                return
+            self.stats.fetched += 1
+
+            digest = section_hash(content)
+            if digest in seen_content:
+                self.stats.duplicate_content += 1
+                logger.debug("Skipping page with already crawled content", extra={"url": url})
+                return
+            seen_content.add(digest)
+
+            if depth < self.max_depth:
+                for link in extract_links(url, content):
+                    enqueue(link, depth + 1)
+            self.stats.emitted += 1
+            await pages.put(CrawledPage(url=url, depth=depth, content=content))
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    if await reserve():
+                        try:
+                            await visit(url, depth)
+                        except Exception as e:
+                            self.stats.failed += 1
+                            logger.warning("Crawl fetch failed: %s", e, extra={"url": url})
+                        finally:
+                            await release()
+                finally:
+                    frontier.task_done()
+
+        async def finish():
+            await frontier.join()
+            await pages.put(done)
+
+        for seed in seeds:
+            enqueue(seed, 0)
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        workers.append(asyncio.create_task(finish()))
+
+        try:
+            while True:
+                page = await pages.get()
+                if page is done:
+                    break
+                yield page
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def sitemap_urls(sitemap_url: str, limit: int, transport=None) -> List[str]:
+    """
+    Page URLs listed in a sitemap, following sitemap indexes, up to limit
+
+    Accepts plain and gzipped XML sitemaps. Sitemaps are fetched directly
+    rather than through Firecrawl since they aren't pages, so every URL,
+    including nested sitemaps and redirect targets, must be http(s) on a
+    public address (see _check_public_url). A sitemap larger than
+    CRAWL_SITEMAP_MAX_BYTES, downloaded or decompressed, is rejected.
+    transport replaces the HTTP transport (the tests use httpx.MockTransport).
+    """
+    import httpx
+
+    max_bytes = env_int("CRAWL_SITEMAP_MAX_BYTES", 50 * 1024 * 1024)
+    urls: List[str] = []
+    pending = [sitemap_url]
+    fetched = 0
+    async with httpx.AsyncClient(
+        timeout=env_float("CRAWL_SITEMAP_TIMEOUT", 15.0),
+        headers={"Accept-Encoding": "identity"},
+        transport=transport,
+    ) as client:
+        while pending and len(urls) < limit and fetched < MAX_SITEMAPS:
+            url = pending.pop(0)
+            fetched += 1
+            body = await _download_sitemap(client, url, max_bytes)
+            body = await asyncio.to_thread(_gunzip_sitemap, body, max_bytes)
+            nested, pages = await asyncio.to_thread(_parse_sitemap, body, limit - len(urls))
+            pending.extend(nested)
+            urls.extend(pages)
+    return urls
+
+
+async def _check_public_url(url: str) -> None:
+    """Raise ValueError unless url is http(s) and its host resolves only to public addresses"""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Sitemap URL must be http or https: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"Cannot resolve sitemap host {parts.hostname}: {e}")
+    for info in infos:
+        # Loopback, private, link-local and reserved ranges are all not global
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not address.is_global:
+            raise ValueError(f"Sitemap host {parts.hostname} resolves to a non-public address")
+
+
+async def _download_sitemap(client, url: str, max_bytes: int) -> bytes:
+    """Body of one sitemap, following redirects by hand so each hop is checked, read up to max_bytes"""
+    for _ in range(MAX_SITEMAP_REDIRECTS + 1):
+        await _check_public_url(url)
+        async with client.stream("GET", url) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers["location"])
+                continue
+            response.raise_for_status()
+            encoding = response.headers.get("content-encoding", "identity").lower()
+            if encoding not in ("identity", "gzip"):
+                raise ValueError(f"Unsupported sitemap content encoding: {encoding}")
+            # Raw bytes: httpx would decompress a gzip Content-Encoding without a size limit.
+            # Gzipped bodies are recognized by their magic bytes and decompressed by _gunzip_sitemap
+            chunks: List[bytes] = []
+            size = 0
+            async for chunk in response.aiter_raw():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Sitemap is larger than {max_bytes} bytes")
+                chunks.append(chunk)
+            return b"".join(chunks)
+    raise ValueError(f"Sitemap redirected more than {MAX_SITEMAP_REDIRECTS} times")
+
+
+def _gunzip_sitemap(body: bytes, max_bytes: int) -> bytes:
+    """Decompress a gzipped sitemap (twice if served gzipped with a gzip Content-Encoding), up to max_bytes"""
+    for _ in range(2):
+        if body[:2] != b"\x1f\x8b":
+            break
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(body, max_bytes + 1)
+        if len(body) > max_bytes:
+            raise ValueError(f"Sitemap is larger than {max_bytes} bytes uncompressed")
+    return body
+
+
+def _parse_sitemap(body: bytes, limit: int) -> Tuple[List[str], List[str]]:
+    """(nested sitemap URLs, page URLs) from one sitemap or sitemap index document"""
+    nested: List[str] = []
+    pages: List[str] = []
+    entry = None
+    # Entries are cleared once read so a large sitemap isn't held as a tree
+    for event, element in ET.iterparse(io.BytesIO(body), events=("start", "end")):
+        tag = element.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            if tag in ("url", "sitemap"):
+                entry = tag
+            continue
+        if tag == "loc" and element.text:
+            (nested if entry == "sitemap" else pages).append(element.text.strip())
+            if len(pages) >= limit:
+                break
+        elif tag in ("url", "sitemap"):
+            element.clear()
+    return nested, pages
@@ -1,55 +1,116 @@
-from supabase import create_client, Client
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+import logging
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from executor import db_stage
 from models import CompetitorRecord, InsightRecord, ProductWeakness, AnalysisResponse
+from repository import KnownFingerprints, Repository, create_repository, decode_cursor, encode_cursor
 
+logger = logging.getLogger(__name__)
 
-class DatabaseManager:
-    def __init__(self):
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-        if not supabase_url or not supabase_key:
+def insight_record(record: Dict[str, Any]) -> InsightRecord:
+    """InsightRecord from an insights row as returned by PostgREST"""
+    last_seen_at = record.get("last_seen_at")
+    return InsightRecord(
+        id=record["id"],
+        competitor_id=record["competitor_id"],
+        weakness_title=record["weakness_title"],
+        weakness_description=record["weakness_description"],
+        severity=record["severity"],
+        category=record["category"],
+        created_at=datetime.fromisoformat(record["created_at"]),
+        occurrences=record.get("occurrences") or 1,
+        last_seen_at=datetime.fromisoformat(last_seen_at) if last_seen_at else None,
+        fingerprint=record.get("fingerprint"),
+    )
+
+
+def competitor_record(record: Dict[str, Any]) -> CompetitorRecord:
+    """CompetitorRecord from a competitors row as returned by PostgREST"""
+    return CompetitorRecord(
+        id=record["id"],
+        name=record["name"],
+        target_url=record["target_url"],
+        created_at=datetime.fromisoformat(record["created_at"]),
+        updated_at=datetime.fromisoformat(record["updated_at"]),
+    )
+
+
+class SupabaseRepository(Repository):
+    """Repository over the Supabase (PostgREST) HTTP API"""
+
+    name = "supabase"
+    # Rows per request when reading a whole result; matches PostgREST's default max-rows
+    page_size = 1000
+
+    def __init__(self, client=None):
+        # client: a ready Supabase client, or a stand-in such as benchmarks/fakes.py; built on first use otherwise
+        self.supabase_url = os.getenv("SUPABASE_URL")
+        self.supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+        if client is None and (not self.supabase_url or not self.supabase_key):
             raise ValueError("❌ SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
 
-        try:
-            self.supabase: Client = create_client(
-                supabase_url=supabase_url,
-                supabase_key=supabase_key
-            )
-            print("✅ Supabase connection established")
-            # Test the connection
-            self.supabase.table("competitors").select("id").limit(1).execute()
-            print("✅ Database tables accessible")
-        except Exception as e:
-            raise ValueError(f"❌ Failed to connect to Supabase: {e}")
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def supabase(self):
+        """Supabase client, created on first use; creating it does no network I/O"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(supabase_url=self.supabase_url, supabase_key=self.supabase_key)
+                    logger.info("Supabase client created")
+        return self._client
+
+    async def connect(self) -> None:
+        # Import the SDK and build the client on the database executor, not the event loop
+        await db_stage.run(lambda: self.supabase)
+
+    async def ping(self) -> None:
+        await self.execute(self.supabase.table("competitors").select("id").limit(1))
+
+    async def execute(self, query):
+        """Execute a Supabase query builder on the bounded database executor"""
+        return await db_stage.run(query.execute)
+
+    async def select_all(self, build_query) -> List[Dict[str, Any]]:
+        """
+        Every row of a select, read in pages
+
+        PostgREST caps each response (1000 rows by default), so build_query is
+        called once per page and must return a fresh, totally ordered query.
+        """
+        rows: List[Dict[str, Any]] = []
+        while True:
+            result = await self.execute(build_query().range(len(rows), len(rows) + self.page_size - 1))
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
 
     async def create_competitor(self, name: str, target_url: str) -> CompetitorRecord:
-        """Create or get existing competitor record"""
-        # First check if competitor already exists
-        existing = await self.get_competitor_by_name(name)
-        if existing:
-            return existing
+        """
+        Create or get existing competitor record
 
-        # Create new competitor record
+        A single upsert on the unique name: one round trip, and concurrent
+        analyses of a new competitor can't race each other. An existing record
+        gets the latest target_url and a fresh updated_at.
+        """
         data = {
             "name": name,
             "target_url": target_url,
         }
 
         try:
-            result = self.supabase.table("competitors").insert(data).execute()
+            result = await self.execute(self.supabase.table("competitors").upsert(data, on_conflict="name"))
 
             if result.data and len(result.data) > 0:
-                record = result.data[0]
-                return CompetitorRecord(
-                    id=record["id"],
-                    name=record["name"],
-                    target_url=record["target_url"],
-                    created_at=datetime.fromisoformat(record["created_at"]),
-                    updated_at=datetime.fromisoformat(record["updated_at"])
-                )
+                return competitor_record(result.data[0])
             else:
                 raise Exception("No data returned from competitor creation")
         except Exception as e:
@@ -58,57 +119,293 @@ class DatabaseManager:
     async def get_competitor_by_name(self, name: str) -> Optional[CompetitorRecord]:
         """Get competitor by name"""
         try:
-            result = self.supabase.table("competitors").select("*").eq("name", name).execute()
+            result = await self.execute(self.supabase.table("competitors").select("*").eq("name", name))
 
             if result.data and len(result.data) > 0:
-                record = result.data[0]
-                return CompetitorRecord(
-                    id=record["id"],
-                    name=record["name"],
-                    target_url=record["target_url"],
-                    created_at=datetime.fromisoformat(record["created_at"]),
-                    updated_at=datetime.fromisoformat(record["updated_at"])
-                )
+                return competitor_record(result.data[0])
             return None
         except Exception as e:
             raise Exception(f"Failed to query competitor: {e}")
 
-    async def save_insights(self, competitor_id: str, weaknesses: List[ProductWeakness]) -> List[InsightRecord]:
-        """Save analysis insights to database"""
-        if not weaknesses:
-            return []
+    async def delete_competitor(self, competitor_id: str) -> None:
+        try:
+            await self.execute(self.supabase.table("competitors").delete().eq("id", competitor_id))
+        except Exception as e:
+            raise Exception(f"Failed to delete competitor: {e}")
+
+    async def count_competitors(self) -> int:
+        try:
+            result = await self.execute(self.supabase.table("competitors").select("id", count="exact").limit(1))
+        except Exception as e:
+            raise Exception(f"Failed to count competitors: {e}")
+        return getattr(result, "count", 0) or 0
+
+    async def list_competitor_ids(self) -> List[str]:
+        page_size = 1000
+        ids: List[str] = []
+        while True:
+            try:
+                result = await self.execute(
+                    self.supabase.table("competitors").select("id").order("id").range(len(ids), len(ids) + page_size - 1)
+                )
+            except Exception as e:
+                raise Exception(f"Failed to list competitor ids: {e}")
+            rows = result.data or []
+            ids.extend(row["id"] for row in rows)
+            if len(rows) < page_size:
+                return ids
+
+    async def list_due_competitors(self, updated_before: datetime, limit: int) -> List[CompetitorRecord]:
+        try:
+            result = await self.execute(
+                self.supabase.table("competitors")
+                .select("*")
+                .lt("updated_at", updated_before.astimezone(timezone.utc).isoformat())
+                .order("updated_at")
+                .limit(limit)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to list due competitors: {e}")
+        return [competitor_record(record) for record in result.data or []]
+
+    async def touch_competitor(self, competitor_id: str) -> None:
+        try:
+            await self.execute(
+                self.supabase.table("competitors")
+                .update({"updated_at": datetime.now(timezone.utc).isoformat()})
+                .eq("id", competitor_id)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to update competitor: {e}")
+
+    async def list_competitors(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of competitors with their insight counts, newest first
+
+        Uses the list_competitors RPC (database_schema.sql), so the whole page is
+        a single round trip. Returns the rows and the cursor for the next page.
+        """
+        params = {"p_limit": limit + 1}
+        if cursor:
+            params["p_cursor_created_at"], params["p_cursor_id"] = decode_cursor(cursor)
+
+        try:
+            result = await self.execute(self.supabase.rpc("list_competitors", params))
+        except Exception as e:
+            raise Exception(f"Failed to list competitors: {e}")
+
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def get_insights(self, competitor_id: str) -> List[ProductWeakness]:
+        """Stored weaknesses for a competitor, oldest first"""
+        try:
+            records = await self.select_all(
+                lambda: self.supabase.table("insights")
+                .select("weakness_title, weakness_description, severity, category")
+                .eq("competitor_id", competitor_id)
+                .order("created_at")
+                .order("id")
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load insights: {e}")
+
+        return [
+            ProductWeakness(
+                title=record["weakness_title"],
+                description=record["weakness_description"],
+                severity=record["severity"],
+                category=record["category"],
+            )
+            for record in records
+        ]
+
+    async def get_snapshot(self, competitor_id: str, target_url: str) -> Optional[List[str]]:
+        """Section hashes of the last snapshot of a competitor page, or None if there is none"""
+        try:
+            result = await self.execute(
+                self.supabase.table("content_snapshots")
+                .select("section_hashes")
+                .eq("competitor_id", competitor_id)
+                .eq("target_url", target_url)
+                .limit(1)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load content snapshot: {e}")
+
+        if result.data:
+            return result.data[0]["section_hashes"]
+        return None
+
+    async def save_snapshot(self, competitor_id: str, target_url: str, section_hashes: List[str]) -> None:
+        """Replace the snapshot of a competitor page with the given section hashes"""
+        data = {
+            "competitor_id": competitor_id,
+            "target_url": target_url,
+            "section_hashes": section_hashes,
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            await self.execute(
+                self.supabase.table("content_snapshots").upsert(data, on_conflict="competitor_id,target_url")
+            )
+        except Exception as e:
+            raise Exception(f"Failed to save content snapshot: {e}")
+
+    async def get_fingerprints(self, competitor_ids: List[str]) -> KnownFingerprints:
+        try:
+            records = await self.select_all(
+                lambda: self.supabase.table("insights")
+                .select("competitor_id, fingerprint, simhash")
+                .in_("competitor_id", competitor_ids)
+                .order("id")
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load insight fingerprints: {e}")
 
-        insights_data = []
-        for weakness in weaknesses:
-            insights_data.append({
-                "competitor_id": competitor_id,
-                "weakness_title": weakness.title,
-                "weakness_description": weakness.description,
-                "severity": weakness.severity,
-                "category": weakness.category,
-            })
+        known: KnownFingerprints = {}
+        for record in records:
+            if record.get("fingerprint"):
+                known.setdefault(record["competitor_id"], []).append((record["fingerprint"], record.get("simhash")))
+        return known
 
+    async def upsert_insight_rows(self, rows: List[Dict[str, Any]]) -> List[InsightRecord]:
         try:
-            result = self.supabase.table("insights").insert(insights_data).execute()
+            result = await self.execute(self.supabase.rpc("upsert_insights", {"p_rows": rows}))
 
             if result.data and len(result.data) > 0:
-                return [
-                    InsightRecord(
-                        id=record["id"],
-                        competitor_id=record["competitor_id"],
-                        weakness_title=record["weakness_title"],
-                        weakness_description=record["weakness_description"],
-                        severity=record["severity"],
-                        category=record["category"],
-                        created_at=datetime.fromisoformat(record["created_at"])
-                    )
-                    for record in result.data
-                ]
+                return [insight_record(record) for record in result.data]
             else:
-                raise Exception("No data returned from insights insertion")
+                raise Exception("No data returned from insights upsert")
         except Exception as e:
             raise Exception(f"Failed to save insights: {e}")
 
+    async def get_insight_records(self, competitor_id: str) -> List[InsightRecord]:
+        try:
+            records = await self.select_all(
+                lambda: self.supabase.table("insights").select("*").eq("competitor_id", competitor_id).order("created_at").order("id")
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load insights: {e}")
+        return [insight_record(record) for record in records]
+
+    async def merge_insights(self, keeper_id: str, duplicate_ids: List[str], changes: Dict[str, Any]) -> None:
+        changes = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in changes.items()}
+        try:
+            # One RPC, so the delete and the update commit together (merge_insights in database_schema.sql)
+            await self.execute(self.supabase.rpc(
+                "merge_insights", {"p_keeper_id": keeper_id, "p_duplicate_ids": duplicate_ids, "p_changes": changes}
+            ))
+        except Exception as e:
+            raise Exception(f"Failed to merge insights: {e}")
+
+    async def get_insight_rollups(self, competitor_id: Optional[str] = None, per_competitor: bool = False) -> List[Dict[str, Any]]:
+        columns = "severity,category,insight_count,occurrence_count"
+        try:
+            if competitor_id:
+                result = await self.execute(
+                    self.supabase.table("insight_rollups").select(columns).eq("competitor_id", competitor_id)
+                )
+                return result.data or []
+            if not per_competitor:
+                result = await self.execute(self.supabase.table("insight_rollup_totals").select(columns))
+                return result.data or []
+
+            # PostgREST caps responses (1000 rows by default), so read every competitor's cells in pages
+            page_size = 1000
+            rows: List[Dict[str, Any]] = []
+            while True:
+                result = await self.execute(
+                    self.supabase.table("insight_rollups")
+                    .select(columns + ",competitor_id")
+                    .order("competitor_id")
+                    .order("severity")
+                    .order("category")
+                    .range(len(rows), len(rows) + page_size - 1)
+                )
+                page = result.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+        except Exception as e:
+            raise Exception(f"Failed to read insight rollups: {e}")
+
+    async def search_insights(
+        self,
+        query: str,
+        competitor_id: Optional[str] = None,
+        severity: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of search results from the search_insights RPC (database_schema.sql)"""
+        params = {
+            "p_query": query,
+            "p_competitor_id": competitor_id,
+            "p_severity": severity,
+            "p_category": category,
+            "p_limit": limit + 1,
+        }
+        if cursor:
+            rank, params["p_cursor_id"] = decode_cursor(cursor)
+            params["p_cursor_rank"] = float(rank)
+
+        try:
+            result = await self.execute(self.supabase.rpc("search_insights", params))
+        except Exception as e:
+            raise Exception(f"Failed to search insights: {e}")
+
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(repr(rows[-1]["rank"]), rows[-1]["id"])
+        return rows, next_cursor
+
+    async def _export_page(
+        self, function: str, changed_at: str, since: Optional[datetime], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page from an export RPC (database_schema.sql), keyed by (changed_at, id)"""
+        params = {"p_limit": limit + 1}
+        if since is not None:
+            params["p_since"] = since.isoformat()
+        if cursor:
+            params["p_cursor_at"], params["p_cursor_id"] = decode_cursor(cursor)
+
+        try:
+            result = await self.execute(self.supabase.rpc(function, params))
+        except Exception as e:
+            raise Exception(f"Failed to export rows: {e}")
+
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][changed_at], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def export_competitors(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._export_page("export_competitors", "updated_at", since, limit, cursor)
+
+    async def export_insights(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._export_page("export_insights", "last_seen_at", since, limit, cursor)
+
+    async def table_counts(self) -> Dict[str, int]:
+        counts = {}
+        for table in ("competitors", "insights"):
+            result = await self.execute(self.supabase.table(table).select("id", count="exact").limit(1))
+            counts[table] = getattr(result, "count", 0) or 0
+        return counts
+
 
 # Global database manager instance
-db_manager = DatabaseManager()
+db_manager = create_repository()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+from config import env_int
+from metrics import registry, stage_seconds, stage_wait_seconds
+
+T = TypeVar("T")
+
+
+class StageExecutor:
+    """
+    Bounded thread pool for running one blocking I/O stage off the event loop.
+
+    Firecrawl, google-generativeai and the Supabase client are all synchronous,
+    so every call into them goes through one of these executors. Each stage has
+    its own concurrency limit so a burst of slow scrapes cannot starve the
+    database writes (or the health checks) of worker threads.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        if max_concurrency < 1:
+            raise ValueError(f"Concurrency for stage '{name}' must be at least 1")
+
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix=f"{name}-stage",
+        )
+        self._pending = 0
+        self._completed = 0
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking callable in this stage's pool and await its result"""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+
+        def timed() -> T:
+            started = time.perf_counter()
+            stage_wait_seconds.observe(started - submitted, stage=self.name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_seconds.observe(time.perf_counter() - started, stage=self.name)
+
+        self._pending += 1
+        try:
+            return await loop.run_in_executor(self._pool, timed)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Current load for this stage (pending includes calls queued for a thread)"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "pending": self._pending,
+            "completed": self._completed,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Per-stage executors; limits are configurable through environment variables
+scrape_stage = StageExecutor("scrape", env_int("SCRAPE_CONCURRENCY", 8))
+llm_stage = StageExecutor("llm", env_int("LLM_CONCURRENCY", 4))
+db_stage = StageExecutor("db", env_int("DB_CONCURRENCY", 10))
+
+
+registry.gauge(
+    "competitor_analysis_stage_pending",
+    "Calls running or queued on each stage executor",
+    ["stage"],
+    collect=lambda: {(stage.name,): stage.stats()["pending"] for stage in (scrape_stage, llm_stage, db_stage)},
+)
+
+
+def stage_stats() -> Dict[str, Dict[str, int]]:
+    """Load figures for every I/O stage"""
+    return {stage.name: stage.stats() for stage in (scrape_stage, llm_stage, db_stage)}
+
+
+def shutdown_stages() -> None:
+    for stage in (scrape_stage, llm_stage, db_stage):
+        stage.shutdown()
@@ -0,0 +1,75 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+from config import env_int
+from models import ProductWeakness
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "with", "is", "are", "its", "their"}
+
+SIMHASH_BITS = 64
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercased alphanumeric words without stopwords"""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def insight_fingerprint(weakness: ProductWeakness) -> str:
+    """
+    Exact-match key for a weakness: its title terms, sorted
+
+    "Confusing pricing" and "Pricing is confusing!" get the same fingerprint.
+    """
+    terms = sorted(set(normalize_words(weakness.title))) or [weakness.title.strip().lower()]
+    return hashlib.sha256(" ".join(terms).encode("utf-8")).hexdigest()[:32]
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def insight_simhash(weakness: ProductWeakness) -> int:
+    """
+    64-bit SimHash over the words of title and description
+
+    Returned as a signed integer so it fits a Postgres BIGINT. Rewordings of
+    the same weakness land a few bits apart; unrelated texts differ in about
+    half of the bits. Single words rather than shingles keep short texts stable.
+    """
+    weights = [0] * SIMHASH_BITS
+    for feature in normalize_words(f"{weakness.title} {weakness.description}"):
+        value = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    simhash = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return simhash - (1 << SIMHASH_BITS) if simhash >= 1 << (SIMHASH_BITS - 1) else simhash
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+class FingerprintIndex:
+    """
+    Known insights of one competitor, used to map a new weakness onto an existing one
+
+    `canonical` returns the fingerprint a weakness should be stored under: the
+    fingerprint of an existing insight that matches exactly or whose SimHash is
+    within max_distance bits, otherwise its own (which is then remembered).
+    """
+
+    def __init__(self, known: Optional[List[Tuple[str, Optional[int]]]] = None, max_distance: Optional[int] = None):
+        self.max_distance = env_int("INSIGHT_SIMHASH_DISTANCE", 8) if max_distance is None else max_distance
+        self._simhashes: Dict[str, Optional[int]] = {}
+        for fingerprint, simhash in known or []:
+            self._simhashes.setdefault(fingerprint, simhash)
+
+    def canonical(self, fingerprint: str, simhash: int) -> str:
+        if fingerprint in self._simhashes:
+            return fingerprint
+        for known_fingerprint, known_simhash in self._simhashes.items():
+            if known_simhash is not None and hamming_distance(simhash, known_simhash) <= self.max_distance:
+                return known_fingerprint
+        self._simhashes[fingerprint] = simhash
+        return fingerprint
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+from config import env_bool, env_float, env_int
+from models import ProductWeakness
+
+logger = logging.getLogger(__name__)
+
+SaveBatchFn = Callable[[List[Tuple[str, List[ProductWeakness]]]], Awaitable[object]]
+
+
+class InsightWriter:
+    """
+    Write-behind buffer that coalesces insight writes from concurrent analyses
+
+    `save` queues a competitor's weaknesses; a background task writes
+    everything queued with one save_batch call every `interval` seconds, or
+    as soon as `max_rows` weaknesses are waiting. In write-behind mode (the
+    default) `save` returns straight away and failed writes are logged;
+    otherwise, or with wait=True, it returns once its rows are stored and
+    raises if they couldn't be. `stop` flushes whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        save_batch: SaveBatchFn,
+        max_rows: Optional[int] = None,
+        interval: Optional[float] = None,
+        write_behind: Optional[bool] = None,
+    ):
+        self.save_batch = save_batch
+        self.max_rows = max_rows or env_int("INSIGHT_WRITE_MAX_ROWS", 200)
+        self.interval = interval or env_float("INSIGHT_WRITE_INTERVAL", 0.25)
+        self.write_behind = env_bool("INSIGHT_WRITE_BEHIND", True) if write_behind is None else write_behind
+        self._pending: List[Tuple[str, List[ProductWeakness], Optional[asyncio.Future]]] = []
+        self._pending_rows = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flushes = 0
+        self._rows_written = 0
+        self._failures = 0
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write everything still buffered"""
+        if self._task is not None:
+            # Let the task finish its current flush rather than cancelling a write halfway
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def save(self, competitor_id: str, weaknesses: List[ProductWeakness], wait: Optional[bool] = None) -> None:
+        if not weaknesses:
+            return
+        if self._task is None:
+            # Not running (e.g. outside the API process): write straight through
+            await self.save_batch([(competitor_id, weaknesses)])
+            return
+
+        wait = not self.write_behind if wait is None else wait
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((competitor_id, weaknesses, future))
+        self._pending_rows += len(weaknesses)
+        if self._pending_rows >= self.max_rows:
+            self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        await self._write(pending)
+
+    async def _write(self, entries) -> None:
+        try:
+            await self.save_batch([(competitor_id, weaknesses) for competitor_id, weaknesses, _ in entries])
+        except Exception as e:
+            if len(entries) > 1:
+                # Retry one by one so a single bad analysis doesn't drop the whole group
+                for entry in entries:
+                    await self._write([entry])
+                return
+            competitor_id, weaknesses, future = entries[0]
+            self._failures += 1
+            logger.error("Failed to write %d insights: %s", len(weaknesses), e, extra={"competitor_id": competitor_id})
+            if future is not None and not future.done():
+                future.set_exception(e)
+            return
+
+        self._flushes += 1
+        for _, weaknesses, future in entries:
+            self._rows_written += len(weaknesses)
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    def stats(self):
+        return {
+            "write_behind": self.write_behind,
+            "max_rows": self.max_rows,
+            "interval": self.interval,
+            "pending_rows": self._pending_rows,
+            "flushes": self._flushes,
+            "rows_written": self._rows_written,
+            "failures": self._failures,
+        }
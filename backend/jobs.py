@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional
+from config import env_int
+from models import AnalysisResponse, AnalyzeRequest, JobStatusResponse
+from pipeline import error_message
+
+logger = logging.getLogger(__name__)
+
+AnalysisHandler = Callable[[AnalyzeRequest], Awaitable[AnalysisResponse]]
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another analysis"""
+
+
+class JobStore:
+    """SQLite-backed job state so queued work survives a restart"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+
+    def create(self, request: AnalyzeRequest) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, request.model_dump_json(), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[JobStatusResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return JobStatusResponse(
+            job_id=row[0],
+            status=row[1],
+            result=AnalysisResponse.model_validate_json(row[2]) if row[2] else None,
+            error=row[3],
+            created_at=row[4],
+            updated_at=row[5],
+        )
+
+    def get_request(self, job_id: str) -> AnalyzeRequest:
+        with self._lock:
+            row = self._conn.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return AnalyzeRequest.model_validate_json(row[0])
+
+    def recover(self) -> List[str]:
+        """Requeue jobs interrupted by a shutdown and return every queued id, oldest first"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+                (time.time(),),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_finished(self, older_than_seconds: int) -> int:
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (cutoff,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class JobQueue:
+    """
+    In-process background queue for analyses.
+
+    `submit` stores the request and returns a job id straight away; a pool of
+    worker tasks runs the handler and records the result or error. Once
+    `max_pending` jobs are queued or running, `submit` raises QueueFullError.
+    """
+
+    def __init__(self, handler: AnalysisHandler, store: JobStore, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.handler = handler
+        self.store = store
+        self.workers = workers or env_int("JOB_WORKERS", 2)
+        self.max_pending = max_pending or env_int("JOB_QUEUE_MAX", 100)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending = 0
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.store.purge_finished, env_int("JOB_RETENTION_SECONDS", 7 * 24 * 60 * 60))
+        queued_ids = await asyncio.to_thread(self.store.recover)
+
+        self._queue = asyncio.Queue()
+        for job_id in queued_ids:
+            self._queue.put_nowait(job_id)
+        self._pending = len(queued_ids)
+        if queued_ids:
+            logger.info("Resuming %d queued analysis jobs", len(queued_ids))
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; running jobs go back to 'queued' on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, request: AnalyzeRequest) -> str:
+        if self._queue is None:
+            raise RuntimeError("Job queue has not been started")
+        if self._pending >= self.max_pending:
+            raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+
+        self._pending += 1
+        try:
+            job_id = await asyncio.to_thread(self.store.create, request)
+        except Exception:
+            self._pending -= 1
+            raise
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[JobStatusResponse]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                request = await asyncio.to_thread(self.store.get_request, job_id)
+                await asyncio.to_thread(self.store.update, job_id, "running")
+                try:
+                    response = await self.handler(request)
+                except Exception as e:
+                    logger.warning("Job failed: %s", error_message(e), extra={"job_id": job_id})
+                    await asyncio.to_thread(self.store.update, job_id, "failed", None, error_message(e))
+                else:
+                    await asyncio.to_thread(self.store.update, job_id, "succeeded", response.model_dump_json())
+            except Exception:
+                logger.exception("Job could not be processed", extra={"job_id": job_id})
+            finally:
+                self._pending -= 1
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import env_float, env_int
+from metrics import model_fallbacks
+
+logger = logging.getLogger(__name__)
+
+# Supported models metadata (frontend will fetch this list).
+# rpm/rpd are the per-minute and per-day request limits enforced locally; 0 means unlimited.
+SUPPORTED_MODELS = [
+    {"id": "gemini-2.5-flash", "name": "Gemini 2.5 Flash", "daily": "20", "note": "Severely limited", "rpm": 10, "rpd": 20},
+    {"id": "gemini-2.5-flash-lite", "name": "Gemini 2.5 Flash-Lite", "daily": "1,500", "note": "Recommended for Free Tier", "rpm": 15, "rpd": 1500},
+    {"id": "gemini-2.5-pro", "name": "Gemini 2.5 Pro", "daily": "0 - 5", "note": "Often removed or restricted", "rpm": 5, "rpd": 5},
+]
+
+# Server default used when a request doesn't pick a model
+DEFAULT_MODEL_ID = os.getenv("DEFAULT_MODEL", "gemini-flash-latest")
+
+
+class QuotaExhaustedError(Exception):
+    """Raised when no model has request quota left within the allowed wait"""
+
+
+class ModelUnavailableError(Exception):
+    """Raised when none of the candidate models could be created"""
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously over `period` seconds"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period if capacity else 0.0
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> bool:
+        if not self.capacity:
+            return True
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_available(self) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def remaining(self) -> Optional[int]:
+        if not self.capacity:
+            return None
+        self._refill(time.monotonic())
+        return int(self.tokens)
+
+
+class DailyQuota:
+    """Requests-per-day counter that resets at UTC midnight"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.day = self._today()
+        self.exhausted = False
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+            self.exhausted = False
+
+    def available(self) -> bool:
+        self._roll()
+        if self.exhausted:
+            return False
+        return not self.limit or self.used < self.limit
+
+    def consume(self) -> None:
+        self._roll()
+        self.used += 1
+
+    def release(self) -> None:
+        """Give back one request consumed today that didn't reach the API"""
+        self._roll()
+        self.used = max(self.used - 1, 0)
+
+    def mark_exhausted(self) -> None:
+        self._roll()
+        self.exhausted = True
+
+    def remaining(self) -> Optional[int]:
+        self._roll()
+        if self.exhausted:
+            return 0
+        if not self.limit:
+            return None
+        return max(self.limit - self.used, 0)
+
+
+class ModelRegistry:
+    """
+    Creates each Gemini model once and rations requests to it.
+
+    Every model has a per-minute token bucket and a per-day counter. `acquire`
+    hands out the preferred model while it has quota, otherwise falls back to
+    the next supported model with quota, and only when every model is
+    rate-limited waits (up to LLM_QUEUE_MAX_WAIT seconds) for a token.
+    """
+
+    def __init__(self, default_model_id: str, supported: List[Dict[str, Any]]):
+        self.default_model_id = default_model_id
+        self.supported_ids = [m["id"] for m in supported]
+        self.max_wait = env_float("LLM_QUEUE_MAX_WAIT", 30.0)
+
+        limits = {m["id"]: (m.get("rpm", 0), m.get("rpd", 0)) for m in supported}
+        limits.setdefault(default_model_id, (env_int("DEFAULT_MODEL_RPM", 0), env_int("DEFAULT_MODEL_RPD", 0)))
+
+        # Guards quota state and the instance map; never held while the SDK loads
+        self._lock = threading.Lock()
+        self._sdk_lock = threading.Lock()
+        self._genai = None
+        # Builds a model instance from its id; None means google.generativeai.GenerativeModel.
+        # The offline benchmarks swap in a stand-in (benchmarks/fakes.py)
+        self.model_factory: Optional[Callable[[str], Any]] = None
+        self._instances: Dict[str, Any] = {}
+        self._minute = {model_id: TokenBucket(rpm, 60.0) for model_id, (rpm, _) in limits.items()}
+        self._daily = {model_id: DailyQuota(rpd) for model_id, (_, rpd) in limits.items()}
+        # Models the API rate limited (429) are skipped until this monotonic time
+        self._cooldown_until: Dict[str, float] = {}
+        self._fallbacks = 0
+
+    def _sdk(self):
+        # google.generativeai takes most of a second to import, so it is loaded
+        # and configured on first use (or by warm) instead of at import time
+        if self._genai is None:
+            with self._sdk_lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.getenv("GOOGLE_AI_API_KEY"))
+                    self._genai = genai
+        return self._genai
+
+    def warm(self) -> None:
+        """Import the SDK and create the default model ahead of the first request"""
+        self.get(self.default_model_id)
+
+    def get(self, model_id: str):
+        """
+        Shared GenerativeModel instance for a model id, created on first use
+
+        The first call may import the SDK, so it blocks; call it off the event
+        loop. The instance is built outside the lock, so acquire and the quota
+        reports never wait for an import; when two threads race, the first
+        instance stored wins.
+        """
+        with self._lock:
+            instance = self._instances.get(model_id)
+        if instance is not None:
+            return instance
+
+        created = (self.model_factory or self._sdk().GenerativeModel)(model_id)
+        with self._lock:
+            instance = self._instances.setdefault(model_id, created)
+        if instance is created:
+            logger.info("Created Google AI model %s", model_id)
+        return instance
+
+    async def _instance(self, model_id: str):
+        """get from the event loop: a model that still has to be created is built in a worker thread"""
+        with self._lock:
+            instance = self._instances.get(model_id)
+        if instance is None:
+            instance = await asyncio.to_thread(self.get, model_id)
+        return instance
+
+    def _candidates(self, preferred: Optional[str]) -> List[str]:
+        first = preferred or self.default_model_id
+        order = [first, self.default_model_id] + self.supported_ids
+        return list(dict.fromkeys(order))
+
+    def _try_acquire(self, model_id: str) -> bool:
+        with self._lock:
+            daily = self._daily[model_id]
+            if self._cooldown_until.get(model_id, 0.0) > time.monotonic():
+                return False
+            if not daily.available() or not self._minute[model_id].try_acquire():
+                return False
+            daily.consume()
+            return True
+
+    async def acquire(self, preferred: Optional[str] = None) -> Tuple[str, Any]:
+        """
+        Reserve one request and return (model_id, model instance)
+
+        Raises QuotaExhaustedError when every model is out of daily quota, or
+        when no per-minute token frees up within the maximum wait, and
+        ModelUnavailableError when no model can be created at all.
+        """
+        deadline = time.monotonic() + self.max_wait
+        candidates = self._candidates(preferred)
+        while True:
+            for model_id in list(candidates):
+                try:
+                    instance = await self._instance(model_id)
+                except Exception as e:
+                    logger.warning("Model %s not available: %s", model_id, e)
+                    candidates.remove(model_id)
+                    continue
+                if not self._try_acquire(model_id):
+                    continue
+                if model_id != (preferred or self.default_model_id):
+                    self._fallbacks += 1
+                    requested = preferred or self.default_model_id
+                    model_fallbacks.inc(requested=requested, used=model_id)
+                    logger.info("%s is unavailable or over its limit, falling back to %s", requested, model_id)
+                return model_id, instance
+
+            if not candidates:
+                raise ModelUnavailableError("No Gemini models available")
+
+            with self._lock:
+                now = time.monotonic()
+                waits = [
+                    max(
+                        self._minute[model_id].seconds_until_available(),
+                        self._cooldown_until.get(model_id, 0.0) - now,
+                    )
+                    for model_id in candidates
+                    if self._daily[model_id].available()
+                ]
+            if not waits:
+                raise QuotaExhaustedError("Daily request quota exhausted for every model")
+            wait = max(min(waits), 0.05)
+            if time.monotonic() + wait > deadline:
+                raise QuotaExhaustedError("All models are rate limited; try again in a minute")
+            await asyncio.sleep(wait)
+
+    def report_rate_limited(self, model_id: str, daily: bool = False) -> None:
+        """Record a 429 from the API so acquire skips this model for a minute (or the rest of the day)"""
+        with self._lock:
+            if daily:
+                self._daily[model_id].mark_exhausted()
+            else:
+                self._cooldown_until[model_id] = time.monotonic() + 60.0
+
+    def remaining(self, model_id: str) -> Dict[str, Optional[int]]:
+        """Requests left this minute and today (None when unlimited)"""
+        with self._lock:
+            return {
+                "remaining_this_minute": self._minute[model_id].remaining(),
+                "remaining_today": self._daily[model_id].remaining(),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default_model": self.default_model_id,
+            "fallbacks": self._fallbacks,
+            "models": {model_id: self.remaining(model_id) for model_id in self._minute},
+        }
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for 429/ResourceExhausted errors from the Gemini API"""
+    return error.__class__.__name__ in ("ResourceExhausted", "TooManyRequests") or "429" in str(error)
+
+
+def is_daily_quota_error(error: Exception) -> bool:
+    """True when the 429 refers to the per-day quota (e.g. GenerateRequestsPerDayPerProjectPerModel)"""
+    message = str(error).lower().replace(" ", "")
+    return is_rate_limit_error(error) and "perday" in message
+
+
+model_registry = ModelRegistry(DEFAULT_MODEL_ID, SUPPORTED_MODELS)
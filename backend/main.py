@@ -1,71 +1,117 @@
-# Load environment variables FIRST, before any imports that depend on them
+# Load environment variables FIRST, before any imports that read them
+import logging
 import os
-from dotenv import load_dotenv
+from config import configure_logging, load_environment
 
-# Load environment variables from .env file in project root
-print("🔧 Loading environment variables...")
+load_environment()
+configure_logging()
+logger = logging.getLogger(__name__)
 
-try:
-    # Try loading from current directory first
-    result1 = load_dotenv()
-    print(f"📁 Tried loading .env from current directory: {result1}")
+# Now import the modules that depend on environment variables
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Callable, List, Literal, Optional, Tuple
+from models import (
+    AnalyzeRequest,
+    AnalysisResponse,
+    BatchAnalyzeRequest,
+    CompetitorRecord,
+    CrawlPageResult,
+    CrawlRequest,
+    JobStatusResponse,
+    JobSubmitResponse,
+    ProductWeakness,
+)
+from executor import llm_stage, scrape_stage, stage_stats, shutdown_stages
+from analysis import (
+    CHUNK_WEAKNESS_COUNT,
+    MAX_CONTENT_CHARS,
+    ResponseParseError,
+    WeaknessClusters,
+    WeaknessStreamParser,
+    analysis_cache,
+    build_prompt,
+    merge_weaknesses,
+    parse_weaknesses,
+    section_hash,
+    split_markdown,
+    split_sections,
+)
+from llm import (
+    SUPPORTED_MODELS,
+    ModelUnavailableError,
+    QuotaExhaustedError,
+    is_daily_quota_error,
+    is_rate_limit_error,
+    model_registry,
+)
+from pipeline import BatchPipeline, error_message
+from crawler import Crawler, sitemap_urls
+from export import COMPETITOR_COLUMNS, EXPORT_PAGE_SIZE, INSIGHT_COLUMNS, MEDIA_TYPES, export_stream
+from scheduler import RefreshScheduler
+from jobs import JobQueue, JobStore, QueueFullError
+from insight_writer import InsightWriter
+from singleflight import SingleFlight
+from config import data_path, env_bool, env_float, env_int
+from compaction import compact_markdown, compaction_stats
+from cache import normalize_url
+from metrics import (
+    analysis_fallbacks,
+    analysis_seconds,
+    llm_requests,
+    llm_tokens,
+    parse_failures,
+    parse_seconds,
+    registry,
+)
 
-    # If that doesn't work, try loading from parent directory
-    if not os.getenv("FIRECRAWL_API_KEY"):
-        env_path = os.path.join(os.path.dirname(__file__), "..", ".env")
-        print(f"📁 Trying to load .env from: {env_path}")
-        result2 = load_dotenv(dotenv_path=env_path)
-        print(f"📁 Loaded .env from parent directory: {result2}")
+# Repositories and the scraper only read their configuration here; clients are
+# created in the lifespan hook or on first use, so importing this module does no
+# network I/O and doesn't load the Supabase, Firecrawl or Gemini SDKs
+from database import db_manager
+from scraper import ContentScraper
+scraper = ContentScraper()
 
-except Exception as e:
-    print(f"⚠️ Could not load .env file: {e}")
 
-# Additional fallback: Load from Untitled file if environment variables not set
-if not os.getenv("FIRECRAWL_API_KEY"):
+async def warm_clients() -> None:
+    """Create the Firecrawl and Gemini clients off the event loop so the first analysis doesn't import the SDKs"""
     try:
-        untitled_path = os.path.join(os.path.dirname(__file__), "..", "Untitled")
-        print(f"📄 Loading from Untitled file: {untitled_path}")
-        with open(untitled_path, "r") as f:
-            for line in f:
-                if "=" in line:
-                    key, value = line.strip().split("=", 1)
-                    os.environ[key] = value
-                    print(f"✅ Set {key} from Untitled file")
-        print("✅ Loaded environment variables from Untitled file")
-    except FileNotFoundError:
-        print("❌ No Untitled file found")
+        await asyncio.gather(
+            scrape_stage.run(lambda: scraper.firecrawl),
+            llm_stage.run(model_registry.warm),
+        )
     except Exception as e:
-        print(f"❌ Error loading from Untitled file: {e}")
+        logger.warning("Client warm-up failed: %s", e)
 
-# Check final status
-firecrawl_key = os.getenv("FIRECRAWL_API_KEY")
-if firecrawl_key:
-    print(f"✅ FIRECRAWL_API_KEY loaded: {firecrawl_key[:10]}...")
-else:
-    print("❌ FIRECRAWL_API_KEY not found!")
 
-# Now import the modules that depend on environment variables
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-import google.generativeai as genai
-from datetime import datetime
-from typing import List
-from models import AnalyzeRequest, AnalysisResponse, ProductWeakness
-
-# Initialize database manager (will raise exception if connection fails)
-try:
-    from database import db_manager
-    print("✅ Database manager initialized")
-except Exception as e:
-    print(f"❌ Database initialization failed: {e}")
-    print("🔧 Please check your Supabase credentials and database schema")
-    raise
-
-# Initialize scraper AFTER environment variables are loaded
-from scraper import ContentScraper
-scraper = ContentScraper()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    await db_manager.connect()
+    await insight_writer.start()
+    await job_queue.start()
+    # Not awaited: the worker serves requests while the SDKs load
+    app.state.client_warm_up = asyncio.create_task(warm_clients())
+    if env_bool("REFRESH_SCHEDULER", False):
+        await start_refresh_scheduler()
+    yield
+    await app.state.client_warm_up
+    await refresh_scheduler.stop()
+    await job_queue.stop()
+    # Flush buffered insight writes while the database executor is still up
+    await insight_writer.stop()
+    await db_manager.close()
+    # Release the per-stage worker threads
+    shutdown_stages()
+
 
-app = FastAPI(title="Competitor Analysis API", version="1.0.0")
+app = FastAPI(title="Competitor Analysis API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -76,38 +122,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Google AI
-genai.configure(api_key=os.getenv("GOOGLE_AI_API_KEY"))
-try:
-    model = genai.GenerativeModel('gemini-flash-latest')
-    print("✅ Using Google AI model: gemini-flash-latest")
-except Exception as e:
-    print(f"⚠️ gemini-flash-latest not available: {e}")
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        print("✅ Using Google AI model: gemini-2.5-flash")
-    except Exception as e2:
-        print(f"❌ No Gemini models available: {e2}")
-        model = None
-
-# Supported models metadata (frontend will fetch this list)
-SUPPORTED_MODELS = [
-    {"id": "gemini-2.5-flash", "name": "Gemini 2.5 Flash", "daily": "20", "note": "Severely limited"},
-    {"id": "gemini-2.5-flash-lite", "name": "Gemini 2.5 Flash-Lite", "daily": "1,500", "note": "Recommended for Free Tier"},
-    {"id": "gemini-2.5-pro", "name": "Gemini 2.5 Pro", "daily": "0 - 5", "note": "Often removed or restricted"},
-]
-
-
 @app.get("/models")
 async def list_models():
-    """Return supported model ids and descriptive metadata for the frontend."""
-    return {"models": SUPPORTED_MODELS}
+    """Return supported model ids, descriptive metadata and remaining request quota for the frontend."""
+    return {
+        "models": [
+            {**m, **model_registry.remaining(m["id"])}
+            for m in SUPPORTED_MODELS
+        ],
+        "default_model": model_registry.default_model_id,
+    }
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "Competitor Analysis API is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 when the database answers and the API keys are set, 503 otherwise
+
+    `/` stays a liveness check with no dependencies; this one makes a round
+    trip to the database, bounded by READY_TIMEOUT seconds.
+    """
+    checks = {
+        "scraper": "ok" if scraper.api_key else "FIRECRAWL_API_KEY not set",
+        "llm": "ok" if os.getenv("GOOGLE_AI_API_KEY") else "GOOGLE_AI_API_KEY not set",
+    }
+    try:
+        await asyncio.wait_for(db_manager.ping(), timeout=env_float("READY_TIMEOUT", 5.0))
+        checks["database"] = "ok"
+    except asyncio.TimeoutError:
+        checks["database"] = "timed out"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    is_ready = all(status == "ok" for status in checks.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "backend": db_manager.name, "checks": checks},
+    )
+
 @app.get("/env-check")
 async def env_check():
     """Check environment variable status"""
@@ -118,20 +174,43 @@ async def env_check():
         "firecrawl_key_prefix": os.getenv("FIRECRAWL_API_KEY")[:10] + "..." if os.getenv("FIRECRAWL_API_KEY") else None
     }
 
+@app.get("/stage-stats")
+async def get_stage_stats():
+    """Report concurrency limits and current load of the scrape, LLM and database stages"""
+    return {
+        "stages": stage_stats(),
+        "jobs": job_queue.stats(),
+        "insight_writes": insight_writer.stats(),
+        "coalescing": analysis_flights.stats(),
+        "refresh": refresh_scheduler.stats(),
+        "llm": model_registry.stats(),
+        "compaction": compaction_stats.snapshot(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, cache hits, fallbacks,
+    parse failures and LLM token usage (see metrics.py)
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Report hit/miss counters for the scrape and analysis caches"""
+    return {"scrape": scraper.cache.stats(), "analysis": analysis_cache.stats()}
+
 @app.get("/db-check")
 async def db_check():
     """Check database connection and table structure"""
     try:
-        # Test competitors table
-        competitors_result = db_manager.supabase.table("competitors").select("id", count="exact").limit(1).execute()
-        competitor_count = getattr(competitors_result, 'count', 0)
-
-        # Test insights table
-        insights_result = db_manager.supabase.table("insights").select("id", count="exact").limit(1).execute()
-        insights_count = getattr(insights_result, 'count', 0)
+        counts = await db_manager.table_counts()
+        competitor_count = counts["competitors"]
+        insights_count = counts["insights"]
 
         return {
             "status": "connected",
+            "backend": db_manager.name,
             "database_url": "Configured ✅",
             "competitors_table": f"✅ ({competitor_count} records)",
             "insights_table": f"✅ ({insights_count} records)",
@@ -148,209 +227,1020 @@ async def db_check():
             ]
         }
 
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_competitor(request: AnalyzeRequest):
-    """
-    Analyze a competitor's website for product weaknesses
+def validate_model(request: AnalyzeRequest) -> None:
+    """Validate request.model against SUPPORTED_MODELS to prevent arbitrary ids"""
+    requested_model_id = getattr(request, 'model', None)
+    if requested_model_id:
+        allowed_ids = [m['id'] for m in SUPPORTED_MODELS]
+        if requested_model_id not in allowed_ids:
+            raise HTTPException(status_code=400, detail=f"Requested model '{requested_model_id}' is not supported. Allowed: {allowed_ids}")
 
-    Args:
-        request: Analysis request containing target URL and competitor name
 
-    Returns:
-        Analysis results with identified weaknesses
+async def scrape_for(request: AnalyzeRequest) -> str:
+    """Stage 1: scrape the target URL, raising a 400 if nothing comes back"""
+    logger.debug("Scraping content", extra={"url": request.target_url})
+    scraped_content = await scraper.scrape_url_async(request.target_url, force_refresh=request.force_refresh)
+
+    if not scraped_content:
+        raise HTTPException(
+            status_code=400,
+            detail="Failed to scrape content from the provided URL"
+        )
+
+    logger.debug("Scraped content", extra={"url": request.target_url, "chars": len(scraped_content)})
+    return scraped_content
+
+
+def record_token_usage(model_id: str, usage) -> None:
+    """Count the prompt and completion tokens Gemini reports for one generation"""
+    if usage is None:
+        return
+    llm_tokens.inc(getattr(usage, "prompt_token_count", 0) or 0, model=model_id, kind="prompt")
+    llm_tokens.inc(getattr(usage, "candidates_token_count", 0) or 0, model=model_id, kind="completion")
+
+
+async def generate_text(
+    model_id: str,
+    selected_model,
+    prompt: str,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> str:
     """
-    try:
-        # Step 1: Scrape the target URL
-        print(f"🔍 Scraping content from {request.target_url}")
-        print(f"🔍 Scraper instance: {scraper}")
-        print(f"🔍 Scraper firecrawl: {scraper.firecrawl}")
-        scraped_content = scraper.scrape_url(request.target_url)
-
-        if not scraped_content:
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to scrape content from the provided URL"
-            )
+    Run one generation on the LLM executor and return the full response text
 
-        print(f"✅ Scraped {len(scraped_content)} characters of content")
+    With on_text, the model streams its answer and on_text is called on the
+    event loop with each chunk as it arrives.
+    """
+    if on_text is None:
+        response = await llm_stage.run(selected_model.generate_content, prompt)
+        record_token_usage(model_id, getattr(response, "usage_metadata", None))
+        return response.text
 
-        # Step 2: Create or get competitor record
-        competitor = await db_manager.create_competitor(
-            name=request.competitor_name,
-            target_url=request.target_url
-        )
+    loop = asyncio.get_running_loop()
 
-        # Step 3: Analyze content with AI
-        print("🤖 Analyzing content with AI...")
-
-        # Determine which model instance to use for this request.
-        # Validate request.model against our SUPPORTED_MODELS list to prevent arbitrary ids.
-        selected_model = None
-        requested_model_id = getattr(request, 'model', None)
-        if requested_model_id:
-            allowed_ids = [m['id'] for m in SUPPORTED_MODELS]
-            if requested_model_id not in allowed_ids:
-                raise HTTPException(status_code=400, detail=f"Requested model '{requested_model_id}' is not supported. Allowed: {allowed_ids}")
+    def consume_stream() -> str:
+        parts = []
+        usage = None
+        for chunk in selected_model.generate_content(prompt, stream=True):
+            # Usage is reported on the chunks, complete on the last one
+            usage = getattr(chunk, "usage_metadata", None) or usage
             try:
-                print(f"🔁 Request requested model: {requested_model_id}")
-                selected_model = genai.GenerativeModel(requested_model_id)
-                print(f"✅ Using requested model instance: {requested_model_id}")
-            except Exception as e:
-                print(f"⚠️ Requested model '{requested_model_id}' not available: {e}")
-                # we'll fall back to server default below
-
-        if not selected_model:
-            selected_model = model
-
-        if not selected_model:
-            # Fallback: create mock weaknesses if AI is not available
-            weaknesses = [
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata) carry nothing to parse
+                continue
+            parts.append(text)
+            loop.call_soon_threadsafe(on_text, text)
+        record_token_usage(model_id, usage)
+        return "".join(parts)
+
+    return await llm_stage.run(consume_stream)
+
+
+def prompt_token_budget(budgeted: bool = True) -> Optional[int]:
+    return env_int("PROMPT_TOKEN_BUDGET", 2500) if budgeted else None
+
+
+async def compact_for_prompt(scraped_content: str, budgeted: bool = True) -> str:
+    """
+    Strip links, boilerplate and duplicate paragraphs from scraped markdown
+
+    With budgeted, the result is also cut to PROMPT_TOKEN_BUDGET tokens
+    (chunked mode keeps the whole page). PROMPT_COMPACTION=0 turns this off.
+    """
+    if not env_bool("PROMPT_COMPACTION", True):
+        return scraped_content
+
+    result = await asyncio.to_thread(compact_markdown, scraped_content, prompt_token_budget(budgeted))
+    compaction_stats.record(result)
+    logger.debug(
+        "Compacted content",
+        extra={"chars_before": result.chars_before, "chars_after": result.chars_after, "tokens_after": result.tokens_after},
+    )
+    return result.text
+
+
+# Titles of the placeholder weaknesses below; they mark an analysis that didn't reach the model
+FALLBACK_TITLES = {
+    "AI Analysis Unavailable",
+    "Manual Review Required",
+    "AI Quota Exhausted",
+    "AI Response Parsing Issue",
+    "Analysis parsing error",
+    "AI Service Error",
+}
+
+
+def is_fallback(weaknesses: List[ProductWeakness]) -> bool:
+    return any(weakness.title in FALLBACK_TITLES for weakness in weaknesses)
+
+
+def fallback_reason(error: Exception) -> str:
+    """Label for the analysis fallback counter"""
+    if isinstance(error, ModelUnavailableError):
+        return "model_unavailable"
+    if isinstance(error, QuotaExhaustedError):
+        return "quota_exhausted"
+    if isinstance(error, ResponseParseError):
+        return "parse_error"
+    return "service_error"
+
+
+def fallback_weaknesses(request: AnalyzeRequest, error: Exception) -> List[ProductWeakness]:
+    """Placeholder weaknesses saved when the AI step fails, so the scrape isn't wasted"""
+    if isinstance(error, ModelUnavailableError):
+        # Fallback: create mock weaknesses if AI is not available
+        return [
+            ProductWeakness(
+                title="AI Analysis Unavailable",
+                description="Google AI service is currently unavailable. This appears to be a temporary API issue.",
+                severity="medium",
+                category="technical"
+            ),
+            ProductWeakness(
+                title="Manual Review Required",
+                description=f"Content was successfully scraped from {request.target_url} but AI analysis failed. Manual review recommended.",
+                severity="low",
+                category="technical"
+            )
+        ]
+    if isinstance(error, QuotaExhaustedError):
+        return [
+            ProductWeakness(
+                title="AI Quota Exhausted",
+                description=f"{error}. Content scraping was successful; retry the analysis later.",
+                severity="medium",
+                category="technical"
+            )
+        ]
+    if isinstance(error, ResponseParseError):
+        if error.no_json:
+            return [
                 ProductWeakness(
-                    title="AI Analysis Unavailable",
-                    description="Google AI service is currently unavailable. This appears to be a temporary API issue.",
+                    title="AI Response Parsing Issue",
+                    description="AI provided a response but it couldn't be parsed as JSON",
                     severity="medium",
                     category="technical"
-                ),
-                ProductWeakness(
-                    title="Manual Review Required",
-                    description=f"Content was successfully scraped from {request.target_url} but AI analysis failed. Manual review recommended.",
-                    severity="low",
-                    category="technical"
                 )
             ]
+        return [
+            ProductWeakness(
+                title="Analysis parsing error",
+                description=f"Failed to parse AI analysis: {str(error)}",
+                severity="medium",
+                category="technical"
+            )
+        ]
+    return [
+        ProductWeakness(
+            title="AI Service Error",
+            description=f"Google AI analysis failed: {str(error)}. Content scraping was successful.",
+            severity="medium",
+            category="technical"
+        )
+    ]
+
+
+async def run_prompt(
+    request: AnalyzeRequest,
+    prompt: str,
+    on_weakness: Optional[Callable[[ProductWeakness], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> List[ProductWeakness]:
+    """
+    Get parsed weaknesses for one prompt from the cache or the model
+
+    Raises ModelUnavailableError, QuotaExhaustedError, ResponseParseError, or
+    the API error itself; callers decide how to fall back. on_reset is called
+    when a streamed attempt fails and another model starts over.
+    """
+    # Identical prompt inputs on the same model reuse the stored result
+    preferred_model_id = request.model or model_registry.default_model_id
+    cached_weaknesses = await asyncio.to_thread(analysis_cache.get, preferred_model_id, prompt)
+    if cached_weaknesses is not None:
+        logger.debug("Analysis cache hit", extra={"model": preferred_model_id})
+        if on_weakness:
+            for weakness in cached_weaknesses:
+                on_weakness(weakness)
+        return cached_weaknesses
+
+    # The registry hands out the requested (or default) model while it has quota and
+    # falls back to the next supported model otherwise; a 429 from the API moves on too
+    max_attempts = len(SUPPORTED_MODELS) + 1
+    for attempt in range(max_attempts):
+        model_id, selected_model = await model_registry.acquire(request.model)
+
+        stream_parser = WeaknessStreamParser()
+
+        def stream_text(text: str) -> None:
+            for weakness in stream_parser.feed(text):
+                on_weakness(weakness)
+
+        on_text = stream_text if on_weakness else None
+        try:
+            ai_response = await generate_text(model_id, selected_model, prompt, on_text)
+            llm_requests.inc(model=model_id, outcome="ok")
+            break
+        except Exception as ai_error:
+            if is_rate_limit_error(ai_error):
+                llm_requests.inc(model=model_id, outcome="rate_limited")
+                if attempt < max_attempts - 1:
+                    logger.warning("Model %s was rate limited by the API, trying another model", model_id)
+                    model_registry.report_rate_limited(model_id, daily=is_daily_quota_error(ai_error))
+                    # The next attempt streams its weaknesses from the start
+                    if on_reset:
+                        on_reset()
+                    continue
+            else:
+                llm_requests.inc(model=model_id, outcome="error")
+            logger.error("AI analysis failed using model %s: %s", model_id, ai_error)
+            raise
+
+    # Parse AI response
+    try:
+        with parse_seconds.time():
+            weaknesses = parse_weaknesses(ai_response) if ai_response else None
+    except Exception as e:
+        parse_failures.inc(kind="invalid")
+        logger.warning("Error parsing AI response: %s", e, extra={"model": model_id})
+        raise ResponseParseError(str(e))
+    if weaknesses is None:
+        parse_failures.inc(kind="no_json")
+        raise ResponseParseError("AI provided a response but it couldn't be parsed as JSON", no_json=True)
+
+    # Stored under the model that answered only: a fallback's output must not be
+    # served to later requests for the preferred model once its quota recovers
+    await asyncio.to_thread(analysis_cache.set, model_id, prompt, weaknesses)
+    return weaknesses
+
+
+async def analyze_chunks(request: AnalyzeRequest, scraped_content: str) -> List[ProductWeakness]:
+    """
+    Map-reduce analysis for long pages
+
+    Splits the markdown on heading and review boundaries, analyzes the chunks in
+    parallel (at most CHUNK_CONCURRENCY at once) and merges the per-chunk
+    weaknesses into one deduplicated, ranked list.
+    """
+    chunks = split_markdown(scraped_content, MAX_CONTENT_CHARS)
+    max_chunks = env_int("CHUNK_MAX_COUNT", 16)
+    if len(chunks) > max_chunks:
+        logger.warning("Page split into %d chunks, analyzing the first %d", len(chunks), max_chunks, extra={"url": request.target_url})
+        chunks = chunks[:max_chunks]
+    logger.debug("Analyzing chunks", extra={"url": request.target_url, "chunks": len(chunks)})
+
+    semaphore = asyncio.Semaphore(env_int("CHUNK_CONCURRENCY", 4))
+
+    async def map_chunk(chunk: str) -> List[ProductWeakness]:
+        async with semaphore:
+            return await run_prompt(request, build_prompt(request.competitor_name, chunk, CHUNK_WEAKNESS_COUNT))
+
+    results = await asyncio.gather(*(map_chunk(chunk) for chunk in chunks), return_exceptions=True)
+    groups = [result for result in results if not isinstance(result, BaseException)]
+    if not groups:
+        raise next(result for result in results if isinstance(result, BaseException))
+    if len(groups) < len(results):
+        logger.warning("%d of %d chunks failed analysis", len(results) - len(groups), len(results), extra={"url": request.target_url})
+    return merge_weaknesses(groups)
+
+
+async def analyze_page(
+    request: AnalyzeRequest,
+    scraped_content: str,
+    on_weakness: Optional[Callable[[ProductWeakness], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> List[ProductWeakness]:
+    """
+    Analyze the given content in one prompt (or map-reduce in chunked mode)
+
+    When on_weakness is given the model response is streamed and each weakness
+    is reported as soon as its JSON object is complete; on_reset discards the
+    ones reported by an attempt that was retried. The returned list is always
+    parsed from the full response, exactly as without streaming.
+    In chunked mode the merged weaknesses are reported once the reduce step is done.
+    """
+    chunked = request.analysis_mode == "chunked"
+    content = await compact_for_prompt(scraped_content, budgeted=not chunked)
+
+    try:
+        if chunked and len(content) > MAX_CONTENT_CHARS:
+            weaknesses = await analyze_chunks(request, content)
+            if on_weakness:
+                for weakness in weaknesses:
+                    on_weakness(weakness)
+            return weaknesses
+
+        prompt = build_prompt(request.competitor_name, content)
+        return await run_prompt(request, prompt, on_weakness, on_reset)
+    except Exception as e:
+        analysis_fallbacks.inc(reason=fallback_reason(e))
+        return fallback_weaknesses(request, e)
+
+
+def snapshot_sections(scraped_content: str) -> List[Tuple[str, str]]:
+    """(hash, text) for each section of the compacted page, so link and whitespace churn isn't a change"""
+    sections = split_sections(compact_markdown(scraped_content).text)
+    return [(section_hash(section), section) for section in sections]
+
+
+async def analyze_incrementally(
+    request: AnalyzeRequest,
+    scraped_content: str,
+    on_weakness: Optional[Callable[[ProductWeakness], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> List[ProductWeakness]:
+    """
+    Incremental mode: only send sections that changed since the last snapshot to the model
+
+    The new weaknesses are merged with the competitor's stored insights. An
+    unchanged page returns the stored insights without an LLM call; a page
+    without a snapshot is analyzed in full. The snapshot itself is written by
+    the persist stage once the insights are saved.
+    """
+    competitor = await db_manager.get_competitor_by_name(request.competitor_name)
+    known_hashes = None
+    if competitor:
+        known_hashes = await db_manager.get_snapshot(competitor.id, normalize_url(request.target_url))
+    if known_hashes is None:
+        logger.debug("No snapshot of this page yet, analyzing all of it", extra={"url": request.target_url})
+        return await analyze_page(request, scraped_content, on_weakness, on_reset)
+
+    sections = await asyncio.to_thread(snapshot_sections, scraped_content)
+    known = set(known_hashes)
+    changed = [section for digest, section in sections if digest not in known]
+    existing = await db_manager.get_insights(competitor.id)
+
+    if changed:
+        logger.debug("Sections changed since the last snapshot", extra={"url": request.target_url, "changed": len(changed), "sections": len(sections)})
+        new_weaknesses = await analyze_page(request, "\n\n".join(changed))
+        if is_fallback(new_weaknesses):
+            weaknesses = new_weaknesses
         else:
-            prompt = f"""
-            You are an expert competitive analyst. Analyze the following content from {request.competitor_name}'s website
-            and identify their main product weaknesses or areas for improvement.
-
-            Focus on:
-            - Product features and functionality gaps
-            - Pricing issues or concerns
-            - Customer support problems
-            - User experience issues
-            - Technical limitations
-            - Market positioning weaknesses
-
-            Content to analyze:
-            {scraped_content[:10000]}  # Limit content length for API
-
-            Please provide 8-12 specific weaknesses in the following JSON format:
-            {{
-                "weaknesses": [
-                    {{
-                        "title": "Brief title of weakness",
-                        "description": "Detailed explanation of the weakness and why it's a problem",
-                        "severity": "high|medium|low",
-                        "category": "feature|pricing|support|usability|technical|other"
-                    }}
-                ]
-            }}
-
-            Be specific, actionable, and focus on genuine weaknesses that competitors could exploit.
-            """
+            weaknesses = merge_weaknesses([new_weaknesses, existing])
+    else:
+        logger.debug("Page unchanged since the last snapshot, reusing stored insights", extra={"url": request.target_url})
+        weaknesses = merge_weaknesses([existing])
 
-            try:
-                response = selected_model.generate_content(prompt)
-                ai_response = response.text
-            except Exception as ai_error:
-                print(f"❌ AI analysis failed using model {getattr(selected_model, 'name', 'unknown')}: {ai_error}")
-                # Fallback to mock weaknesses
-                weaknesses = [
-                    ProductWeakness(
-                        title="AI Service Error",
-                        description=f"Google AI analysis failed: {str(ai_error)}. Content scraping was successful.",
-                        severity="medium",
-                        category="technical"
-                    )
-                ]
-
-        # Parse AI response (only if AI was successful)
-        if 'ai_response' in locals() and ai_response:
-            try:
-                # Extract JSON from the response
-                import json
-                import re
-
-                # Find JSON in the response
-                json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-                if json_match:
-                    weaknesses_data = json.loads(json_match.group())
-                    weaknesses = [
-                        ProductWeakness(**w) for w in weaknesses_data.get("weaknesses", [])
-                    ]
-                else:
-                    # Fallback: create mock weaknesses if parsing fails
-                    weaknesses = [
-                        ProductWeakness(
-                            title="AI Response Parsing Issue",
-                            description="AI provided a response but it couldn't be parsed as JSON",
-                            severity="medium",
-                            category="technical"
-                        )
-                    ]
-            except Exception as e:
-                print(f"Error parsing AI response: {e}")
-                weaknesses = [
-                    ProductWeakness(
-                        title="Analysis parsing error",
-                        description=f"Failed to parse AI analysis: {str(e)}",
-                        severity="medium",
-                        category="technical"
-                    )
-                ]
-
-        # Step 4: Save insights to database
-        await db_manager.save_insights(competitor.id, weaknesses)
-
-        # Step 5: Return analysis results
-        return AnalysisResponse(
-            competitor_name=request.competitor_name,
-            target_url=request.target_url,
-            weaknesses=weaknesses,
-            analyzed_at=datetime.utcnow(),
-            raw_content_length=len(scraped_content)
+    if on_weakness:
+        for weakness in weaknesses:
+            on_weakness(weakness)
+    return weaknesses
+
+
+async def analyze_content(
+    request: AnalyzeRequest,
+    scraped_content: str,
+    on_weakness: Optional[Callable[[ProductWeakness], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> List[ProductWeakness]:
+    """Stage 2: turn scraped content into weaknesses, falling back to placeholder items on AI errors"""
+    validate_model(request)
+    if request.incremental:
+        return await analyze_incrementally(request, scraped_content, on_weakness, on_reset)
+    return await analyze_page(request, scraped_content, on_weakness, on_reset)
+
+
+async def unsaved_weaknesses(competitor_id: str, weaknesses: List[ProductWeakness]) -> List[ProductWeakness]:
+    """Drop weaknesses an incremental analysis carried over from the competitor's stored insights"""
+    stored = {weakness.title.strip().lower() for weakness in await db_manager.get_insights(competitor_id)}
+    return [weakness for weakness in weaknesses if weakness.title.strip().lower() not in stored]
+
+
+def analyzed_section_hashes(request: AnalyzeRequest, scraped_content: str, known_hashes: Optional[List[str]]) -> List[str]:
+    """
+    Hashes of the page's sections the model has seen, as analyze_incrementally prompted it
+
+    Sections already in the snapshot were seen by an earlier run. Of the rest,
+    only those that made it whole into the prompt count: a budgeted prompt cuts
+    the page (or its changed sections) short, and whatever fell past the
+    budget must stay out of the snapshot so the next run sends it.
+    """
+    sections = snapshot_sections(scraped_content)
+    known = set(known_hashes or ())
+    budgeted = request.analysis_mode != "chunked"
+    if not budgeted or not env_bool("PROMPT_COMPACTION", True):
+        # Chunked mode and uncompacted prompts send everything
+        return [digest for digest, _ in sections]
+
+    prompted = scraped_content if known_hashes is None else "\n\n".join(
+        section for digest, section in sections if digest not in known
+    )
+    prompt = compact_markdown(prompted, prompt_token_budget(budgeted)).text
+    in_prompt = {section_hash(section) for section in split_sections(prompt)}
+    return [digest for digest, _ in sections if digest in known or digest in in_prompt]
+
+
+async def save_page_snapshot(competitor_id: str, request: AnalyzeRequest, weaknesses: List[ProductWeakness], scraped_content: str) -> None:
+    """Record the analyzed sections; skipped after an AI failure so the next run retries them"""
+    if is_fallback(weaknesses):
+        return
+    page_url = normalize_url(request.target_url)
+    known_hashes = await db_manager.get_snapshot(competitor_id, page_url)
+    hashes = await asyncio.to_thread(analyzed_section_hashes, request, scraped_content, known_hashes)
+    await db_manager.save_snapshot(competitor_id, page_url, hashes)
+
+
+async def persist_analysis(
+    request: AnalyzeRequest,
+    weaknesses: List[ProductWeakness],
+    scraped_content: str,
+    wait: Optional[bool] = None,
+) -> None:
+    """Stage 3: create or get the competitor record and save its insights"""
+    competitor = await db_manager.create_competitor(
+        name=request.competitor_name,
+        target_url=request.target_url
+    )
+    await save_analysis(competitor.id, request, weaknesses, scraped_content, wait)
+
+
+async def save_analysis(
+    competitor_id: str,
+    request: AnalyzeRequest,
+    weaknesses: List[ProductWeakness],
+    scraped_content: str,
+    wait: Optional[bool] = None,
+) -> None:
+    """
+    Save the insights of one analyzed page for an existing competitor
+
+    wait=True returns only once the insights are stored, even in write-behind
+    mode (see InsightWriter); None leaves it to INSIGHT_WRITE_BEHIND.
+    """
+    if not request.incremental:
+        await insight_writer.save(competitor_id, weaknesses, wait=wait)
+        return
+
+    # The snapshot may only be written once the insights it stands for are stored
+    await insight_writer.save(competitor_id, await unsaved_weaknesses(competitor_id, weaknesses), wait=True)
+    await save_page_snapshot(competitor_id, request, weaknesses, scraped_content)
+
+
+async def persist_analyses(items: List[Tuple[AnalyzeRequest, List[ProductWeakness], str]]) -> None:
+    """Stage 3 for a group of analyses: resolve competitors, then write all insights in one insert"""
+    # One create/get per distinct name so duplicates in a group don't race each other
+    first_by_name = {}
+    for request, _, _ in items:
+        first_by_name.setdefault(request.competitor_name, request)
+    competitors = await asyncio.gather(*(
+        db_manager.create_competitor(name=request.competitor_name, target_url=request.target_url)
+        for request in first_by_name.values()
+    ))
+    competitor_ids = {competitor.name: competitor.id for competitor in competitors}
+
+    async def to_save(request: AnalyzeRequest, weaknesses: List[ProductWeakness]) -> List[ProductWeakness]:
+        if request.incremental:
+            return await unsaved_weaknesses(competitor_ids[request.competitor_name], weaknesses)
+        return weaknesses
+
+    to_insert = await asyncio.gather(*(to_save(request, weaknesses) for request, weaknesses, _ in items))
+    await db_manager.save_insights_batch([
+        (competitor_ids[request.competitor_name], weaknesses)
+        for (request, _, _), weaknesses in zip(items, to_insert)
+    ])
+    await asyncio.gather(*(
+        save_page_snapshot(competitor_ids[request.competitor_name], request, weaknesses, content)
+        for request, weaknesses, content in items
+        if request.incremental
+    ))
+
+
+def build_response(request: AnalyzeRequest, weaknesses: List[ProductWeakness], scraped_content: str) -> AnalysisResponse:
+    return AnalysisResponse(
+        competitor_name=request.competitor_name,
+        target_url=request.target_url,
+        weaknesses=weaknesses,
+        analyzed_at=datetime.utcnow(),
+        raw_content_length=len(scraped_content)
+    )
+
+
+async def run_analysis(request: AnalyzeRequest) -> AnalysisResponse:
+    """Run all stages for a single analysis"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        # Step 1: Scrape the target URL
+        scraped_content = await scrape_for(request)
+
+        # Step 2: Analyze content with AI
+        weaknesses = await analyze_content(request, scraped_content)
+
+        # Step 3: Create or get competitor record and save insights
+        await persist_analysis(request, weaknesses, scraped_content)
+        outcome = "ok"
+
+        # Step 4: Return analysis results
+        return build_response(request, weaknesses, scraped_content)
+    finally:
+        analysis_seconds.observe(time.perf_counter() - started, outcome=outcome)
+
+
+# Identical analyses already in flight are joined instead of started again
+analysis_flights = SingleFlight()
+
+
+def analysis_key(request: AnalyzeRequest) -> Tuple:
+    """Requests with the same key produce the same analysis; force_refresh is left out since in-flight work is fresh"""
+    return (
+        normalize_url(request.target_url),
+        request.competitor_name,
+        request.model or model_registry.default_model_id,
+        request.analysis_mode,
+        request.incremental,
+    )
+
+
+async def run_analysis_once(request: AnalyzeRequest) -> AnalysisResponse:
+    """run_analysis, sharing the result with concurrent identical requests"""
+    return await analysis_flights.run(analysis_key(request), lambda: run_analysis(request))
+
+
+# Coalesces insight writes from concurrent analyses into one bulk upsert per flush
+insight_writer = InsightWriter(db_manager.save_insights_batch)
+
+# Background analyses; job state lives in SQLite so queued work survives a restart
+job_queue = JobQueue(
+    handler=run_analysis_once,
+    store=JobStore(os.getenv("JOB_STORE_PATH") or data_path("jobs.sqlite3")),
+)
+
+
+async def refresh_competitor(competitor: CompetitorRecord) -> str:
+    """
+    Scheduled re-analysis of a competitor's page
+
+    The page is scraped fresh and compared with its snapshot: an unchanged page
+    stops there, without an LLM call. Otherwise only the changed sections are
+    analyzed (incremental mode) and merged with the stored insights.
+    """
+    request = AnalyzeRequest(
+        target_url=competitor.target_url,
+        competitor_name=competitor.name,
+        force_refresh=True,
+        incremental=True,
+    )
+    scraped_content = await scrape_for(request)
+    known_hashes = await db_manager.get_snapshot(competitor.id, normalize_url(request.target_url))
+    if known_hashes is not None:
+        known = set(known_hashes)
+        sections = await asyncio.to_thread(snapshot_sections, scraped_content)
+        if all(digest in known for digest, _ in sections):
+            return "unchanged"
+
+    weaknesses = await analyze_content(request, scraped_content)
+    await persist_analysis(request, weaknesses, scraped_content)
+    return "fallback" if is_fallback(weaknesses) else "analyzed"
+
+
+def refresh_quota_left() -> bool:
+    """
+    Whether the default model has more daily quota left than is reserved for interactive analyses
+
+    A model without a daily limit (the default model unless DEFAULT_MODEL_RPD
+    is set) always has quota left, so the reserve only applies once it has one.
+    """
+    remaining = model_registry.remaining(model_registry.default_model_id)["remaining_today"]
+    return remaining is None or remaining > env_int("REFRESH_MODEL_RESERVE", 20)
+
+
+async def start_refresh_scheduler() -> None:
+    """Start the refresh scheduler, warning when the interactive reserve can't take effect"""
+    if model_registry.remaining(model_registry.default_model_id)["remaining_today"] is None:
+        logger.warning(
+            "%s has no daily limit, so REFRESH_MODEL_RESERVE keeps nothing back; set DEFAULT_MODEL_RPD",
+            model_registry.default_model_id,
         )
+    await refresh_scheduler.start()
+
 
+# Re-analyzes competitors in the background when REFRESH_SCHEDULER=1 (or via `python scheduler.py`)
+refresh_scheduler = RefreshScheduler(db_manager, refresh_competitor, has_quota=refresh_quota_left)
+
+
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze_competitor(request: AnalyzeRequest):
+    """
+    Analyze a competitor's website for product weaknesses
+
+    Args:
+        request: Analysis request containing target URL and competitor name
+
+    Returns:
+        Analysis results with identified weaknesses
+    """
+    try:
+        return await run_analysis_once(request)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error during analysis: {str(e)}")
+        logger.error("Analysis failed: %s", e, extra={"url": request.target_url})
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
 
+
+@app.post("/analyze/batch")
+async def analyze_batch(batch: BatchAnalyzeRequest):
+    """
+    Analyze many competitors through a staged scrape → LLM → persist pipeline
+
+    Streams one NDJSON line per item as soon as it finishes (in completion
+    order), followed by a summary line. A failing item is reported with its
+    error and does not abort the rest of the batch.
+    """
+    pipeline = BatchPipeline(
+        scrape=scrape_for,
+        analyze=analyze_content,
+        persist_many=persist_analyses,
+        build_result=build_response,
+    )
+
+    async def stream():
+        succeeded = failed = 0
+        async for item in pipeline.run(batch.items):
+            if item.status == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield item.model_dump_json() + "\n"
+        yield json.dumps({"status": "done", "total": len(batch.items), "succeeded": succeeded, "failed": failed}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalyzeRequest):
+    """
+    Analyze a competitor and stream progress as Server-Sent Events
+
+    Events: `stage` (scrape/analyze/persist started and done), `weakness` (one
+    per weakness as soon as the model has produced it), then either `result`
+    with the full AnalysisResponse, identical to what /analyze returns and
+    saves, or `error`. A `reset` event means the weaknesses streamed so far are
+    void: a model attempt failed and was retried, or the final list differs
+    from what was streamed (a parse fallback, say). The `weakness` events after
+    it start again at index 0 and always end up matching the result.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: Optional[str], data=None) -> None:
+        events.put_nowait((event, data))
+
+    async def run():
+        try:
+            emit("stage", {"stage": "scrape", "status": "started"})
+            scraped_content = await scrape_for(request)
+            emit("stage", {"stage": "scrape", "status": "done", "content_length": len(scraped_content)})
+
+            emit("stage", {"stage": "analyze", "status": "started"})
+            streamed: List[ProductWeakness] = []
+
+            def on_weakness(weakness: ProductWeakness) -> None:
+                emit("weakness", {"index": len(streamed), "weakness": weakness.model_dump()})
+                streamed.append(weakness)
+
+            def on_reset() -> None:
+                if streamed:
+                    streamed.clear()
+                    emit("reset", {})
+
+            weaknesses = await analyze_content(request, scraped_content, on_weakness=on_weakness, on_reset=on_reset)
+            if weaknesses != streamed:
+                on_reset()
+                for weakness in weaknesses:
+                    on_weakness(weakness)
+            emit("stage", {"stage": "analyze", "status": "done", "weaknesses": len(weaknesses)})
+
+            emit("stage", {"stage": "persist", "status": "started"})
+            # Waits for the write even in write-behind mode, so "done" means stored
+            await persist_analysis(request, weaknesses, scraped_content, wait=True)
+            emit("stage", {"stage": "persist", "status": "done"})
+
+            emit("result", build_response(request, weaknesses, scraped_content).model_dump(mode="json"))
+        except Exception as e:
+            logger.warning("Streamed analysis failed: %s", error_message(e), extra={"url": request.target_url})
+            emit("error", {"detail": error_message(e)})
+        finally:
+            emit(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, data = await events.get()
+                if event is None:
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Client went away: stop the analysis instead of finishing it unseen
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/crawl")
+async def crawl_competitor(request: CrawlRequest):
+    """
+    Crawl a competitor site from a seed page (or sitemap) and analyze every page
+
+    Pages are analyzed and saved as they arrive from the crawler and dropped
+    afterwards; only one entry per distinct weakness is kept for the summary,
+    so memory doesn't grow with the number of pages.
+    Streams one NDJSON line per analyzed page (in completion order), then a
+    summary line with the crawl counts and the weaknesses merged across all
+    pages. A page whose AI step fails is reported as an error and not saved.
+    """
+    validate_model(request)
+    seeds = [request.target_url]
+    if request.sitemap_url:
+        try:
+            seeds += await sitemap_urls(request.sitemap_url, request.max_pages)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read sitemap: {error_message(e)}")
+
+    try:
+        competitor = await db_manager.create_competitor(name=request.competitor_name, target_url=request.target_url)
+    except Exception as e:
+        logger.error("Crawl failed: %s", error_message(e), extra={"url": request.target_url})
+        raise HTTPException(status_code=500, detail=f"Failed to save competitor: {error_message(e)}")
+    crawler = Crawler(
+        fetch=lambda url: scraper.scrape_url_async(url, force_refresh=request.force_refresh),
+        max_pages=request.max_pages,
+        max_depth=request.max_depth,
+        same_domain=request.same_domain,
+    )
+    analysis_concurrency = env_int("CRAWL_ANALYSIS_CONCURRENCY", 2)
+
+    async def analyze(page) -> CrawlPageResult:
+        page_request = request.model_copy(update={"target_url": page.url})
+        result = CrawlPageResult(url=page.url, depth=page.depth, status="error", content_length=len(page.content))
+        try:
+            weaknesses = await analyze_content(page_request, page.content)
+            if is_fallback(weaknesses):
+                result.error = weaknesses[0].title
+                return result
+            await save_analysis(competitor.id, page_request, weaknesses, page.content)
+        except Exception as e:
+            logger.warning("Crawled page failed: %s", error_message(e), extra={"url": page.url})
+            result.error = error_message(e)
+            return result
+        result.status = "ok"
+        result.weaknesses = weaknesses
+        return result
+
+    async def stream():
+        pages: asyncio.Queue = asyncio.Queue(maxsize=analysis_concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def feed():
+            try:
+                async for page in crawler.crawl(seeds):
+                    await pages.put(page)
+            finally:
+                for _ in range(analysis_concurrency):
+                    await pages.put(None)
+
+        async def analysis_worker():
+            while True:
+                page = await pages.get()
+                if page is None:
+                    await results.put(None)
+                    return
+                await results.put(await analyze(page))
+
+        tasks = [asyncio.create_task(feed())]
+        tasks += [asyncio.create_task(analysis_worker()) for _ in range(analysis_concurrency)]
+        # Only the merged clusters are kept, never the per-page results; one instance
+        # for the whole crawl so a weakness reported by many pages ranks accordingly
+        merged = WeaknessClusters()
+        analyzed = failed = 0
+        try:
+            finished_workers = 0
+            while finished_workers < analysis_concurrency:
+                result = await results.get()
+                if result is None:
+                    finished_workers += 1
+                    continue
+                if result.status == "ok":
+                    analyzed += 1
+                    merged.add(result.weaknesses)
+                else:
+                    failed += 1
+                yield result.model_dump_json() + "\n"
+            yield json.dumps({
+                "status": "done",
+                "competitor_name": request.competitor_name,
+                "pages_analyzed": analyzed,
+                "pages_failed": failed,
+                "crawl": crawler.stats.as_dict(),
+                "weaknesses": [weakness.model_dump() for weakness in merged.ranked()],
+            }) + "\n"
+        finally:
+            # Client went away (or the crawl is done): stop fetching and analyzing
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_job(request: AnalyzeRequest):
+    """
+    Queue an analysis and return its job id immediately
+
+    Poll GET /jobs/{job_id} for the result. Returns 503 when the queue is full.
+    """
+    try:
+        job_id = await job_queue.submit(request)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return JobSubmitResponse(job_id=job_id, status="queued")
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Return the status of a queued analysis, including the result once it has succeeded"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
 @app.get("/competitors")
-async def get_competitors():
-    """Get all analyzed competitors"""
+async def get_competitors(
+    limit: int = Query(50, ge=1, le=200, description="Competitors per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """Get analyzed competitors with their insight counts, newest first, one page at a time"""
     try:
-        # Get all competitors with their analysis count
-        competitors = db_manager.supabase.table("competitors").select("id, name, target_url, created_at").execute()
-
-        if competitors.data:
-            # Get insights count for each competitor
-            result = []
-            for comp in competitors.data:
-                insights_count = db_manager.supabase.table("insights").select("id", count="exact").eq("competitor_id", comp["id"]).execute()
-                count = getattr(insights_count, 'count', 0)
-
-                result.append({
-                    "id": comp["id"],
-                    "name": comp["name"],
-                    "url": comp["target_url"],
-                    "analyses_count": count,
-                    "created_at": comp["created_at"]
-                })
-
-            return {
-                "total_competitors": len(result),
-                "competitors": result
-            }
-        else:
-            return {"total_competitors": 0, "competitors": []}
+        (rows, next_cursor), total = await asyncio.gather(
+            db_manager.list_competitors(limit=limit, cursor=cursor),
+            db_manager.count_competitors(),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch competitors: {e}")
 
+    competitors = [
+        {
+            "id": comp["id"],
+            "name": comp["name"],
+            "url": comp["target_url"],
+            "analyses_count": comp["analyses_count"],
+            "created_at": comp["created_at"]
+        }
+        for comp in rows
+    ]
+    return {
+        "total_competitors": total,
+        "competitors": competitors,
+        "next_cursor": next_cursor
+    }
+
+
+def summarize_rollups(cells) -> dict:
+    """Totals and per-severity / per-category counts from insight rollup cells"""
+    by_severity: dict = {}
+    by_category: dict = {}
+    for cell in cells:
+        by_severity[cell["severity"]] = by_severity.get(cell["severity"], 0) + cell["insight_count"]
+        by_category[cell["category"]] = by_category.get(cell["category"], 0) + cell["insight_count"]
+    return {
+        "insights": sum(cell["insight_count"] for cell in cells),
+        "occurrences": sum(cell["occurrence_count"] for cell in cells),
+        "by_severity": by_severity,
+        "by_category": by_category,
+        "cells": [
+            {
+                "severity": cell["severity"],
+                "category": cell["category"],
+                "insights": cell["insight_count"],
+                "occurrences": cell["occurrence_count"],
+            }
+            for cell in sorted(cells, key=lambda cell: (cell["severity"], cell["category"]))
+        ],
+    }
+
+
+@app.get("/insights/stats")
+async def get_insight_stats(
+    competitor_id: Optional[str] = Query(None, description="Only count this competitor's insights"),
+    per_competitor: bool = Query(False, description="Also break the counts down for every competitor"),
+):
+    """
+    Weakness counts by severity and category, across all competitors or for one
+
+    Served from the insight_rollups tables, which triggers keep current on
+    every insight write, so the cost doesn't grow with the number of insights.
+    `insights` counts distinct weaknesses; `occurrences` counts how often
+    analyses reported them.
+    """
+    try:
+        cells = await db_manager.get_insight_rollups(competitor_id=competitor_id)
+        stats = {"competitor_id": competitor_id, **summarize_rollups(cells)}
+        if per_competitor and not competitor_id:
+            grouped: dict = {}
+            for cell in await db_manager.get_insight_rollups(per_competitor=True):
+                grouped.setdefault(cell["competitor_id"], []).append(cell)
+            stats["competitors"] = [
+                {"competitor_id": key, **summarize_rollups(group)} for key, group in grouped.items()
+            ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch insight stats: {e}")
+    return stats
+
+
+@app.get("/insights/search")
+async def search_insights(
+    q: str = Query(..., min_length=1, max_length=200, description='Words, "quoted phrases", or, and -excluded words'),
+    competitor_id: Optional[str] = Query(None, description="Only search this competitor's insights"),
+    severity: Optional[str] = Query(None, pattern="^(high|medium|low)$"),
+    category: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """
+    Stored insights matching a full-text query, best match first, one page at a time
+
+    Served by the full-text index on insight titles and descriptions (a GIN
+    index on Postgres, FTS5 on SQLite), so only matching rows are read and
+    ranked. Title matches rank above description matches.
+    """
+    try:
+        rows, next_cursor = await db_manager.search_insights(
+            q, competitor_id=competitor_id, severity=severity, category=category, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search insights: {e}")
+    return {"query": q, "results": rows, "next_cursor": next_cursor}
+
+
+async def export_response(name: str, export_page, columns, format: str, since: Optional[datetime], gzip: bool):
+    """
+    Stream every row of an export as NDJSON or CSV
+
+    The first page is read before responding, so a database error is still a
+    500; later pages are read while earlier ones are sent.
+    """
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    async def fetch(cursor: Optional[str]):
+        return await export_page(since, EXPORT_PAGE_SIZE, cursor)
+
+    try:
+        first = await fetch(None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to export {name}: {e}")
+
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(name, first, fetch, columns, format, gzip=gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@app.get("/export/competitors")
+async def export_competitors(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="Only competitors updated at or after this time (ISO 8601, UTC if no offset)"),
+    gzip: bool = Query(False, description="Compress the response with Content-Encoding: gzip"),
+):
+    """Every competitor, oldest change first, streamed as NDJSON or CSV"""
+    return await export_response("competitors", db_manager.export_competitors, COMPETITOR_COLUMNS, format, since, gzip)
+
+
+@app.get("/export/insights")
+async def export_insights(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="Only insights last seen at or after this time (ISO 8601, UTC if no offset)"),
+    gzip: bool = Query(False, description="Compress the response with Content-Encoding: gzip"),
+):
+    """
+    Every stored insight with its competitor's name, oldest first, streamed as NDJSON or CSV
+
+    Rows are ordered by last_seen_at, so an incremental pull passes the
+    largest last_seen_at it has seen as `since` and gets new and re-reported
+    insights. Upsert by id on the receiving side: a boundary row can come
+    back again, and an insight re-reported during an export can appear twice.
+    """
+    return await export_response("insights", db_manager.export_insights, INSIGHT_COLUMNS, format, since, gzip)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
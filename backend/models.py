@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -8,6 +8,15 @@ class AnalyzeRequest(BaseModel):
     target_url: str = Field(..., description="URL to scrape (e.g., Trustpilot or G2 page)")
     competitor_name: str = Field(..., description="Name of the competitor company")
     model: str | None = Field(None, description="Optional model id to use for analysis (e.g., gemini-2.5-flash-lite)")
+    force_refresh: bool = Field(False, description="Bypass the scrape cache and fetch the page again")
+    analysis_mode: Literal["single", "chunked"] = Field(
+        "single",
+        description="single: analyze the first 10,000 characters; chunked: map-reduce over the whole page",
+    )
+    incremental: bool = Field(
+        False,
+        description="Only analyze sections that changed since this page was last analyzed incrementally, merging with stored insights",
+    )
 
 
 class ProductWeakness(BaseModel):
@@ -45,12 +54,55 @@ class InsightRecord(BaseModel):
     severity: str
     category: str
     created_at: datetime
+    occurrences: int = Field(1, description="How many analyses reported this weakness")
+    last_seen_at: Optional[datetime] = None
+    fingerprint: Optional[str] = None
 
 
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for the /analyze/batch endpoint"""
+    items: List[AnalyzeRequest] = Field(..., min_length=1, max_length=200, description="Competitors to analyze")
 
 
+class BatchItemResult(BaseModel):
+    """Outcome of one item in a batch analysis"""
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    competitor_name: str
+    target_url: str
+    status: str = Field(..., description="ok or error")
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+
+class CrawlRequest(AnalyzeRequest):
+    """Request model for the /crawl endpoint; target_url is the seed page"""
+    max_depth: int = Field(1, ge=0, le=5, description="Link hops to follow from the seed (or sitemap) pages")
+    max_pages: int = Field(20, ge=1, le=500, description="Distinct pages to analyze at most")
+    sitemap_url: Optional[str] = Field(None, description="Sitemap (or sitemap index) whose pages seed the crawl")
+    same_domain: bool = Field(True, description="Only follow links to the seed's host and its subdomains")
 
 
+class CrawlPageResult(BaseModel):
+    """Outcome of one crawled page"""
+    url: str
+    depth: int = Field(..., description="Link hops from the seed page")
+    status: str = Field(..., description="ok or error")
+    content_length: int = 0
+    weaknesses: List[ProductWeakness] = []
+    error: Optional[str] = None
 
 
+class JobSubmitResponse(BaseModel):
+    """Returned immediately when an analysis is queued"""
+    job_id: str
+    status: str
 
+
+class JobStatusResponse(BaseModel):
+    """Current state of a queued analysis"""
+    job_id: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
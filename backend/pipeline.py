@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from fastapi import HTTPException
+from config import env_float, env_int
+from models import AnalysisResponse, AnalyzeRequest, BatchItemResult, ProductWeakness
+
+logger = logging.getLogger(__name__)
+
+ScrapeFn = Callable[[AnalyzeRequest], Awaitable[str]]
+AnalyzeFn = Callable[[AnalyzeRequest, str], Awaitable[List[ProductWeakness]]]
+PersistManyFn = Callable[[List[Tuple[AnalyzeRequest, List[ProductWeakness], str]]], Awaitable[None]]
+BuildResultFn = Callable[[AnalyzeRequest, List[ProductWeakness], str], AnalysisResponse]
+
+
+def error_message(error: BaseException) -> str:
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return str(error) or error.__class__.__name__
+
+
+class BatchPipeline:
+    """
+    Staged scrape → LLM → persist pipeline for batch analyses.
+
+    Each stage runs its own pool of workers connected by bounded queues, so
+    many scrapes can be in flight while fewer LLM calls run, and finished
+    analyses are written to the database in groups. Throughput is set by the
+    slowest stage rather than by the sum of per-item latencies. Items fail
+    individually: an error is reported for that item and the rest continue.
+    """
+
+    def __init__(
+        self,
+        scrape: ScrapeFn,
+        analyze: AnalyzeFn,
+        persist_many: PersistManyFn,
+        build_result: BuildResultFn,
+        scrape_concurrency: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        write_batch_size: Optional[int] = None,
+        write_interval: Optional[float] = None,
+    ):
+        self.scrape = scrape
+        self.analyze = analyze
+        self.persist_many = persist_many
+        self.build_result = build_result
+        self.scrape_concurrency = scrape_concurrency or env_int("BATCH_SCRAPE_CONCURRENCY", 8)
+        self.llm_concurrency = llm_concurrency or env_int("BATCH_LLM_CONCURRENCY", 3)
+        self.write_batch_size = write_batch_size or env_int("BATCH_WRITE_SIZE", 20)
+        self.write_interval = write_interval or env_float("BATCH_WRITE_INTERVAL", 0.5)
+
+    async def run(self, requests: List[AnalyzeRequest]) -> AsyncIterator[BatchItemResult]:
+        """Yield one result per request, in completion order"""
+        scrape_queue: asyncio.Queue = asyncio.Queue()
+        # Bounded hand-off queues keep scraped pages from piling up ahead of the LLM stage
+        llm_queue: asyncio.Queue = asyncio.Queue(maxsize=self.llm_concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.write_batch_size * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        for index, request in enumerate(requests):
+            scrape_queue.put_nowait((index, request))
+
+        def fail(index: int, request: AnalyzeRequest, error: BaseException) -> None:
+            logger.warning("Batch item failed: %s", error_message(error), extra={"index": index, "url": request.target_url})
+            results.put_nowait(BatchItemResult(
+                index=index,
+                competitor_name=request.competitor_name,
+                target_url=request.target_url,
+                status="error",
+                error=error_message(error),
+            ))
+
+        async def scrape_worker():
+            while True:
+                try:
+                    index, request = scrape_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    content = await self.scrape(request)
+                except Exception as e:
+                    fail(index, request, e)
+                    continue
+                await llm_queue.put((index, request, content))
+
+        async def llm_worker():
+            while True:
+                index, request, content = await llm_queue.get()
+                try:
+                    weaknesses = await self.analyze(request, content)
+                except Exception as e:
+                    fail(index, request, e)
+                    continue
+                await write_queue.put((index, request, content, weaknesses))
+
+        async def write_worker():
+            loop = asyncio.get_running_loop()
+            while True:
+                group = [await write_queue.get()]
+                deadline = loop.time() + self.write_interval
+                while len(group) < self.write_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        group.append(await asyncio.wait_for(write_queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await flush(group)
+
+        async def flush(group):
+            try:
+                await self.persist_many([(request, weaknesses, content) for _, request, content, weaknesses in group])
+            except Exception as group_error:
+                if len(group) == 1:
+                    index, request, _, _ = group[0]
+                    fail(index, request, group_error)
+                    return
+                # Retry one by one so a single bad row doesn't fail the whole group
+                for item in group:
+                    await flush([item])
+                return
+
+            for index, request, content, weaknesses in group:
+                results.put_nowait(BatchItemResult(
+                    index=index,
+                    competitor_name=request.competitor_name,
+                    target_url=request.target_url,
+                    status="ok",
+                    result=self.build_result(request, weaknesses, content),
+                ))
+
+        workers = [asyncio.create_task(scrape_worker()) for _ in range(self.scrape_concurrency)]
+        workers += [asyncio.create_task(llm_worker()) for _ in range(self.llm_concurrency)]
+        workers.append(asyncio.create_task(write_worker()))
+
+        try:
+            for _ in range(len(requests)):
+                yield await results.get()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,371 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import asyncpg
+from config import env_int
+from models import CompetitorRecord, InsightRecord, ProductWeakness
+from repository import KnownFingerprints, Repository, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+_INSIGHT_COLUMNS = (
+    "id, competitor_id, weakness_title, weakness_description, severity, category, "
+    "created_at, occurrences, last_seen_at, fingerprint"
+)
+
+
+def _competitor(record) -> CompetitorRecord:
+    return CompetitorRecord(
+        id=str(record["id"]),
+        name=record["name"],
+        target_url=record["target_url"],
+        created_at=record["created_at"],
+        updated_at=record["updated_at"],
+    )
+
+
+def _insight(record) -> InsightRecord:
+    return InsightRecord(
+        id=str(record["id"]),
+        competitor_id=str(record["competitor_id"]),
+        weakness_title=record["weakness_title"],
+        weakness_description=record["weakness_description"],
+        severity=record["severity"],
+        category=record["category"],
+        created_at=record["created_at"],
+        occurrences=record["occurrences"],
+        last_seen_at=record["last_seen_at"],
+        fingerprint=record["fingerprint"],
+    )
+
+
+async def _init_connection(conn) -> None:
+    # Exchange json/jsonb as Python objects instead of strings
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class PostgresRepository(Repository):
+    """
+    Repository talking to Postgres directly over a pooled asyncpg connection
+
+    Uses the same tables and functions as the Supabase backend
+    (database_schema.sql), without the HTTP/JSON hop per query. asyncpg
+    prepares and caches each statement per connection; set
+    DB_STATEMENT_CACHE_SIZE=0 when connecting through a transaction-mode
+    pooler such as Supabase's port 6543, which can't keep prepared statements.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: Optional[str]):
+        if not dsn:
+            raise ValueError("❌ DATABASE_URL must be set when DATABASE_BACKEND=postgres")
+        self.dsn = dsn
+        self.min_size = env_int("DB_POOL_MIN", 1)
+        self.max_size = env_int("DB_POOL_MAX", env_int("DB_CONCURRENCY", 10))
+        self.statement_cache_size = env_int("DB_STATEMENT_CACHE_SIZE", 100)
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        self._pool = await asyncpg.create_pool(
+                            dsn=self.dsn,
+                            min_size=self.min_size,
+                            max_size=self.max_size,
+                            statement_cache_size=self.statement_cache_size,
+                            init=_init_connection,
+                        )
+                    except Exception as e:
+                        raise ValueError(f"❌ Failed to connect to Postgres: {e}")
+                    logger.info("Postgres pool ready (%d-%d connections)", self.min_size, self.max_size)
+        return self._pool
+
+    async def ping(self) -> None:
+        # Opens the pool on first call, so the readiness probe also warms it
+        pool = await self._get_pool()
+        await pool.fetchval("SELECT 1 FROM competitors LIMIT 1")
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def create_competitor(self, name: str, target_url: str) -> CompetitorRecord:
+        pool = await self._get_pool()
+        try:
+            # The update trigger refreshes updated_at on conflict
+            record = await pool.fetchrow(
+                """
+                INSERT INTO competitors (name, target_url) VALUES ($1, $2)
+                ON CONFLICT (name) DO UPDATE SET target_url = EXCLUDED.target_url
+                RETURNING id, name, target_url, created_at, updated_at
+                """,
+                name, target_url,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to create competitor record: {e}")
+        return _competitor(record)
+
+    async def get_competitor_by_name(self, name: str) -> Optional[CompetitorRecord]:
+        pool = await self._get_pool()
+        try:
+            record = await pool.fetchrow(
+                "SELECT id, name, target_url, created_at, updated_at FROM competitors WHERE name = $1", name
+            )
+        except Exception as e:
+            raise Exception(f"Failed to query competitor: {e}")
+        return _competitor(record) if record else None
+
+    async def delete_competitor(self, competitor_id: str) -> None:
+        pool = await self._get_pool()
+        await pool.execute("DELETE FROM competitors WHERE id = $1", competitor_id)
+
+    async def list_competitors(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        cursor_created_at = cursor_id = None
+        if cursor:
+            created_at, cursor_id = decode_cursor(cursor)
+            cursor_created_at = datetime.fromisoformat(created_at)
+
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(
+                "SELECT * FROM list_competitors($1, $2, $3)", limit + 1, cursor_created_at, cursor_id
+            )
+        except Exception as e:
+            raise Exception(f"Failed to list competitors: {e}")
+
+        rows = [
+            {
+                "id": str(record["id"]),
+                "name": record["name"],
+                "target_url": record["target_url"],
+                "created_at": record["created_at"].isoformat(),
+                "analyses_count": record["analyses_count"],
+            }
+            for record in records
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def count_competitors(self) -> int:
+        pool = await self._get_pool()
+        return await pool.fetchval("SELECT COUNT(*) FROM competitors")
+
+    async def list_competitor_ids(self) -> List[str]:
+        pool = await self._get_pool()
+        records = await pool.fetch("SELECT id FROM competitors ORDER BY id")
+        return [str(record["id"]) for record in records]
+
+    async def list_due_competitors(self, updated_before: datetime, limit: int) -> List[CompetitorRecord]:
+        pool = await self._get_pool()
+        records = await pool.fetch(
+            """
+            SELECT id, name, target_url, created_at, updated_at FROM competitors
+            WHERE updated_at < $1 ORDER BY updated_at LIMIT $2
+            """,
+            updated_before, limit,
+        )
+        return [_competitor(record) for record in records]
+
+    async def touch_competitor(self, competitor_id: str) -> None:
+        pool = await self._get_pool()
+        # The update trigger sets updated_at to NOW()
+        await pool.execute("UPDATE competitors SET updated_at = NOW() WHERE id = $1", competitor_id)
+
+    async def get_insights(self, competitor_id: str) -> List[ProductWeakness]:
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(
+                """
+                SELECT weakness_title, weakness_description, severity, category
+                FROM insights WHERE competitor_id = $1 ORDER BY created_at
+                """,
+                competitor_id,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load insights: {e}")
+        return [
+            ProductWeakness(
+                title=record["weakness_title"],
+                description=record["weakness_description"],
+                severity=record["severity"],
+                category=record["category"],
+            )
+            for record in records
+        ]
+
+    async def get_insight_records(self, competitor_id: str) -> List[InsightRecord]:
+        pool = await self._get_pool()
+        records = await pool.fetch(
+            f"SELECT {_INSIGHT_COLUMNS} FROM insights WHERE competitor_id = $1 ORDER BY created_at", competitor_id
+        )
+        return [_insight(record) for record in records]
+
+    async def merge_insights(self, keeper_id: str, duplicate_ids: List[str], changes: Dict[str, Any]) -> None:
+        columns = list(changes)
+        assignments = ", ".join(f"{column} = ${position}" for position, column in enumerate(columns, start=2))
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Delete first so the keeper can take a fingerprint a duplicate already holds
+                if duplicate_ids:
+                    await conn.execute("DELETE FROM insights WHERE id = ANY($1::uuid[])", duplicate_ids)
+                await conn.execute(
+                    f"UPDATE insights SET {assignments} WHERE id = $1", keeper_id, *(changes[column] for column in columns)
+                )
+
+    async def get_fingerprints(self, competitor_ids: List[str]) -> KnownFingerprints:
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(
+                """
+                SELECT competitor_id, fingerprint, simhash FROM insights
+                WHERE competitor_id = ANY($1::uuid[]) AND fingerprint IS NOT NULL
+                """,
+                competitor_ids,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load insight fingerprints: {e}")
+        known: KnownFingerprints = {}
+        for record in records:
+            known.setdefault(str(record["competitor_id"]), []).append((record["fingerprint"], record["simhash"]))
+        return known
+
+    async def upsert_insight_rows(self, rows: List[Dict[str, Any]]) -> List[InsightRecord]:
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(f"SELECT {_INSIGHT_COLUMNS} FROM upsert_insights($1::jsonb)", rows)
+        except Exception as e:
+            raise Exception(f"Failed to save insights: {e}")
+        return [_insight(record) for record in records]
+
+    async def get_snapshot(self, competitor_id: str, target_url: str) -> Optional[List[str]]:
+        pool = await self._get_pool()
+        try:
+            return await pool.fetchval(
+                "SELECT section_hashes FROM content_snapshots WHERE competitor_id = $1 AND target_url = $2",
+                competitor_id, target_url,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to load content snapshot: {e}")
+
+    async def save_snapshot(self, competitor_id: str, target_url: str, section_hashes: List[str]) -> None:
+        pool = await self._get_pool()
+        try:
+            await pool.execute(
+                """
+                INSERT INTO content_snapshots (competitor_id, target_url, section_hashes, captured_at)
+                VALUES ($1, $2, $3::jsonb, NOW())
+                ON CONFLICT (competitor_id, target_url) DO UPDATE SET
+                    section_hashes = EXCLUDED.section_hashes,
+                    captured_at = EXCLUDED.captured_at
+                """,
+                competitor_id, target_url, section_hashes,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to save content snapshot: {e}")
+
+    async def get_insight_rollups(self, competitor_id: Optional[str] = None, per_competitor: bool = False) -> List[Dict[str, Any]]:
+        pool = await self._get_pool()
+        columns = "severity, category, insight_count, occurrence_count"
+        if competitor_id:
+            records = await pool.fetch(f"SELECT {columns} FROM insight_rollups WHERE competitor_id = $1", competitor_id)
+        elif per_competitor:
+            records = await pool.fetch(f"SELECT {columns}, competitor_id::text FROM insight_rollups ORDER BY competitor_id")
+        else:
+            records = await pool.fetch(f"SELECT {columns} FROM insight_rollup_totals")
+        return [dict(record) for record in records]
+
+    async def search_insights(
+        self,
+        query: str,
+        competitor_id: Optional[str] = None,
+        severity: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        cursor_rank = cursor_id = None
+        if cursor:
+            rank, cursor_id = decode_cursor(cursor)
+            cursor_rank = float(rank)
+
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(
+                "SELECT * FROM search_insights($1, $2, $3, $4, $5, $6, $7)",
+                query, competitor_id, severity, category, limit + 1, cursor_rank, cursor_id,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to search insights: {e}")
+
+        rows = [
+            {
+                **dict(record),
+                "id": str(record["id"]),
+                "competitor_id": str(record["competitor_id"]),
+                "last_seen_at": record["last_seen_at"].isoformat() if record["last_seen_at"] else None,
+            }
+            for record in records
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(repr(rows[-1]["rank"]), rows[-1]["id"])
+        return rows, next_cursor
+
+    async def _export_page(
+        self, function: str, changed_at: str, since: Optional[datetime], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page from an export function (database_schema.sql), keyed by (changed_at, id)"""
+        cursor_at = cursor_id = None
+        if cursor:
+            at, cursor_id = decode_cursor(cursor)
+            cursor_at = datetime.fromisoformat(at)
+
+        pool = await self._get_pool()
+        try:
+            records = await pool.fetch(f"SELECT * FROM {function}($1, $2, $3, $4)", since, limit + 1, cursor_at, cursor_id)
+        except Exception as e:
+            raise Exception(f"Failed to export rows: {e}")
+
+        rows = [
+            {
+                key: value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, UUID) else value
+                for key, value in record.items()
+            }
+            for record in records
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][changed_at], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def export_competitors(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._export_page("export_competitors", "updated_at", since, limit, cursor)
+
+    async def export_insights(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._export_page("export_insights", "last_seen_at", since, limit, cursor)
+
+    async def table_counts(self) -> Dict[str, int]:
+        pool = await self._get_pool()
+        record = await pool.fetchrow(
+            "SELECT (SELECT COUNT(*) FROM competitors) AS competitors, (SELECT COUNT(*) FROM insights) AS insights"
+        )
+        return {"competitors": record["competitors"], "insights": record["insights"]}
@@ -0,0 +1,260 @@
+import base64
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from config import data_path
+from fingerprints import FingerprintIndex, insight_fingerprint, insight_simhash
+from models import CompetitorRecord, InsightRecord, ProductWeakness
+
+# (fingerprint, simhash) pairs of stored insights, per competitor id
+KnownFingerprints = Dict[str, List[Tuple[str, Optional[int]]]]
+
+
+def encode_cursor(created_at: str, record_id: str) -> str:
+    """Opaque keyset cursor pointing just after the given row"""
+    raw = json.dumps([created_at, record_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(created_at), str(record_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def plan_insight_rows(batch: List[Tuple[str, List[ProductWeakness]]], known: KnownFingerprints) -> List[Dict[str, Any]]:
+    """
+    Turn weaknesses into rows for an insight upsert, one per (competitor, fingerprint)
+
+    Each weakness is stored under a fingerprint (see fingerprints.py); one that
+    matches a stored insight, exactly or as a SimHash near duplicate, takes
+    that insight's fingerprint so the upsert bumps it instead of adding a row.
+    A weakness reported by several analyses in the batch counts once per analysis.
+    """
+    indexes: Dict[str, FingerprintIndex] = {}
+    # A single upsert can't touch the same row twice
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for competitor_id, weaknesses in batch:
+        index = indexes.get(competitor_id)
+        if index is None:
+            index = indexes[competitor_id] = FingerprintIndex(known.get(competitor_id))
+        seen_in_analysis = set()
+        for weakness in weaknesses:
+            simhash = insight_simhash(weakness)
+            fingerprint = index.canonical(insight_fingerprint(weakness), simhash)
+            key = (competitor_id, fingerprint)
+            if key not in rows:
+                rows[key] = {
+                    "competitor_id": competitor_id,
+                    "weakness_title": weakness.title,
+                    "weakness_description": weakness.description,
+                    "severity": weakness.severity,
+                    "category": weakness.category,
+                    "fingerprint": fingerprint,
+                    "simhash": simhash,
+                    "occurrences": 1,
+                }
+            elif key not in seen_in_analysis:
+                rows[key]["occurrences"] += 1
+            seen_in_analysis.add(key)
+    return list(rows.values())
+
+
+class Repository(ABC):
+    """
+    Storage used by the API: competitors, their insights and page snapshots
+
+    Implementations: SupabaseRepository (PostgREST over HTTP, database.py),
+    PostgresRepository (pooled asyncpg, postgres_repository.py) and
+    SqliteRepository (local file, sqlite_repository.py). Pick one with
+    DATABASE_BACKEND; see create_repository.
+    """
+
+    name = "base"
+
+    async def connect(self) -> None:
+        """
+        Prepare clients or files; called from the API lifespan hook
+
+        Must not wait on the database server: an unreachable database shows up
+        in ping (GET /ready), not as a worker that fails to boot.
+        """
+
+    async def close(self) -> None:
+        """Release pools or files; called on shutdown"""
+
+    @abstractmethod
+    async def ping(self) -> None:
+        """Cheap round trip to the competitors table; raises when the database is unreachable"""
+
+    @abstractmethod
+    async def create_competitor(self, name: str, target_url: str) -> CompetitorRecord:
+        """Create the competitor, or return the existing one with target_url and updated_at refreshed"""
+
+    @abstractmethod
+    async def get_competitor_by_name(self, name: str) -> Optional[CompetitorRecord]:
+        """Get competitor by name"""
+
+    @abstractmethod
+    async def delete_competitor(self, competitor_id: str) -> None:
+        """Delete a competitor together with its insights and snapshots"""
+
+    @abstractmethod
+    async def list_competitors(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of competitors with their insight counts, newest first
+
+        Rows have id, name, target_url, created_at (ISO string) and
+        analyses_count. Returns the rows and the cursor for the next page.
+        """
+
+    @abstractmethod
+    async def count_competitors(self) -> int:
+        """Number of competitors"""
+
+    @abstractmethod
+    async def list_competitor_ids(self) -> List[str]:
+        """Every competitor id"""
+
+    @abstractmethod
+    async def list_due_competitors(self, updated_before: datetime, limit: int) -> List[CompetitorRecord]:
+        """Competitors last updated before the given time, least recently updated first"""
+
+    @abstractmethod
+    async def touch_competitor(self, competitor_id: str) -> None:
+        """Set a competitor's updated_at to now"""
+
+    @abstractmethod
+    async def get_insights(self, competitor_id: str) -> List[ProductWeakness]:
+        """Stored weaknesses for a competitor, oldest first"""
+
+    @abstractmethod
+    async def get_insight_records(self, competitor_id: str) -> List[InsightRecord]:
+        """Stored insight rows for a competitor, oldest first"""
+
+    @abstractmethod
+    async def merge_insights(self, keeper_id: str, duplicate_ids: List[str], changes: Dict[str, Any]) -> None:
+        """Delete duplicate insight rows, then apply changes to the row that absorbs them"""
+
+    @abstractmethod
+    async def get_fingerprints(self, competitor_ids: List[str]) -> KnownFingerprints:
+        """(fingerprint, simhash) of the stored insights of each competitor"""
+
+    @abstractmethod
+    async def upsert_insight_rows(self, rows: List[Dict[str, Any]]) -> List[InsightRecord]:
+        """
+        Insert rows from plan_insight_rows; a row whose (competitor_id, fingerprint)
+        exists adds its occurrences and refreshes last_seen_at and the description
+        """
+
+    @abstractmethod
+    async def get_snapshot(self, competitor_id: str, target_url: str) -> Optional[List[str]]:
+        """Section hashes of the last snapshot of a competitor page, or None if there is none"""
+
+    @abstractmethod
+    async def save_snapshot(self, competitor_id: str, target_url: str, section_hashes: List[str]) -> None:
+        """Replace the snapshot of a competitor page with the given section hashes"""
+
+    @abstractmethod
+    async def get_insight_rollups(self, competitor_id: Optional[str] = None, per_competitor: bool = False) -> List[Dict[str, Any]]:
+        """
+        Precomputed insight counts per severity and category (the insight_rollups tables)
+
+        Rows have severity, category, insight_count and occurrence_count:
+        across all competitors by default, for one competitor when
+        competitor_id is given, or one row set per competitor (with a
+        competitor_id key) when per_competitor is set.
+        """
+
+    @abstractmethod
+    async def search_insights(
+        self,
+        query: str,
+        competitor_id: Optional[str] = None,
+        severity: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of insights matching a full-text query, best match first
+
+        The query takes web-search syntax: words, "quoted phrases", or, and
+        -excluded words. Rows have the insight columns, competitor_name and
+        rank (higher is better; comparable within one backend only). Returns
+        the rows and the cursor for the next page; raises ValueError for a
+        malformed cursor.
+        """
+
+    @abstractmethod
+    async def export_competitors(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of competitors updated at or after since (every one when None)
+
+        Ordered by (updated_at, id), oldest change first. Rows have id, name,
+        target_url, created_at and updated_at (ISO strings). Returns the rows
+        and the cursor for the next page; raises ValueError for a malformed cursor.
+        """
+
+    @abstractmethod
+    async def export_insights(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of insights last seen at or after since (every one when None)
+
+        Ordered by (last_seen_at, id), oldest first. Rows have id,
+        competitor_id, competitor_name, weakness_title, weakness_description,
+        severity, category, occurrences, created_at and last_seen_at (ISO
+        strings). Returns the rows and the cursor for the next page; raises
+        ValueError for a malformed cursor.
+        """
+
+    @abstractmethod
+    async def table_counts(self) -> Dict[str, int]:
+        """Row counts of the competitors and insights tables"""
+
+    async def save_insights(self, competitor_id: str, weaknesses: List[ProductWeakness]) -> List[InsightRecord]:
+        """Save analysis insights to database"""
+        return await self.save_insights_batch([(competitor_id, weaknesses)])
+
+    async def save_insights_batch(self, batch: List[Tuple[str, List[ProductWeakness]]]) -> List[InsightRecord]:
+        """
+        Save insights for several competitors with a single bulk upsert
+
+        A weakness that matches a stored insight bumps that row's occurrences
+        and last_seen_at instead of adding a row (see plan_insight_rows).
+        """
+        competitor_ids = list(dict.fromkeys(competitor_id for competitor_id, weaknesses in batch if weaknesses))
+        if not competitor_ids:
+            return []
+        known = await self.get_fingerprints(competitor_ids)
+        return await self.upsert_insight_rows(plan_insight_rows(batch, known))
+
+
+def create_repository(backend: Optional[str] = None) -> Repository:
+    """
+    Build the storage backend named by DATABASE_BACKEND
+
+    supabase (default): PostgREST over HTTP with SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY.
+    postgres: pooled asyncpg connections to DATABASE_URL, same database_schema.sql.
+    sqlite: a local file at SQLITE_DATABASE_PATH (default backend/.data/competitor_analysis.sqlite3).
+    """
+    backend = (backend or os.getenv("DATABASE_BACKEND") or "supabase").lower()
+    if backend == "supabase":
+        from database import SupabaseRepository
+        return SupabaseRepository()
+    if backend == "postgres":
+        from postgres_repository import PostgresRepository
+        return PostgresRepository(os.getenv("DATABASE_URL"))
+    if backend == "sqlite":
+        from sqlite_repository import SqliteRepository
+        return SqliteRepository(os.getenv("SQLITE_DATABASE_PATH") or data_path("competitor_analysis.sqlite3"))
+    raise ValueError(f"❌ Unknown DATABASE_BACKEND '{backend}'. Use supabase, postgres or sqlite")
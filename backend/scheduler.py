@@ -0,0 +1,185 @@
+"""
+Refresh scheduler: re-analyzes every competitor once per interval.
+
+Runs inside the API when REFRESH_SCHEDULER=1 (enable it on one worker only),
+or standalone from backend/:
+
+    python scheduler.py
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from config import env_float, env_int
+from llm import DailyQuota
+from metrics import refresh_runs
+from models import CompetitorRecord
+from repository import Repository
+
+logger = logging.getLogger(__name__)
+
+# Returns the outcome of one refresh: analyzed, fallback (the AI step failed) or unchanged
+RefreshFn = Callable[[CompetitorRecord], Awaitable[str]]
+
+# Outcomes that didn't reach the model give their budget reservation back
+UNBILLED_OUTCOMES = ("unchanged", "error")
+
+
+class RefreshScheduler:
+    """
+    Re-analyzes each competitor once its updated_at is older than the interval.
+
+    Due competitors are started one at a time, spaced interval / competitor
+    count apart with random jitter, so a full pass is spread over the interval
+    instead of arriving as a burst; at most `concurrency` refreshes run at
+    once. Each refresh reserves one unit of a daily budget before it starts
+    (given back when the page is unchanged or the run fails), and nothing
+    starts while has_quota reports the model quota should be left to
+    interactive requests. Every run ends by setting updated_at, so a failing
+    competitor also waits a full interval before it is tried again.
+    """
+
+    def __init__(
+        self,
+        repository: Repository,
+        refresh: RefreshFn,
+        has_quota: Optional[Callable[[], bool]] = None,
+        interval: Optional[float] = None,
+        jitter: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        daily_budget: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.repository = repository
+        self.refresh = refresh
+        self.has_quota = has_quota
+        self.interval = interval or env_float("REFRESH_INTERVAL", 24 * 60 * 60)
+        self.jitter = env_float("REFRESH_JITTER", 0.2) if jitter is None else jitter
+        self.concurrency = concurrency or env_int("REFRESH_CONCURRENCY", 2)
+        self.budget = DailyQuota(env_int("REFRESH_DAILY_BUDGET", 100) if daily_budget is None else daily_budget)
+        self.poll_interval = poll_interval or env_float("REFRESH_POLL_INTERVAL", 60.0)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running: Set[str] = set()
+        self._runs: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._paused: Optional[str] = None
+        self._outcomes: Dict[str, int] = {}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                "Refresh scheduler started",
+                extra={"interval": self.interval, "concurrency": self.concurrency, "daily_budget": self.budget.limit},
+            )
+
+    async def stop(self) -> None:
+        """Stop scheduling and cancel refreshes in flight; their competitors stay due"""
+        tasks: List[asyncio.Task] = list(self._runs)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                started = await self._schedule_due()
+            except Exception as e:
+                logger.warning("Refresh scheduling failed: %s", e)
+                started = 0
+            if not started:
+                await asyncio.sleep(self.poll_interval)
+
+    def _blocked_reason(self) -> Optional[str]:
+        if not self.budget.available():
+            return "daily budget spent"
+        if self.has_quota is not None and not self.has_quota():
+            return "model quota reserved for interactive requests"
+        return None
+
+    async def _schedule_due(self) -> int:
+        """Start the competitors that are due, paced across the interval; returns how many were started"""
+        updated_before = datetime.now(timezone.utc) - timedelta(seconds=self.interval)
+        due = await self.repository.list_due_competitors(updated_before, limit=max(self.concurrency * 4, 20))
+        due = [competitor for competitor in due if competitor.id not in self._running]
+        if not due:
+            return 0
+
+        total = (await self.repository.table_counts()).get("competitors") or len(due)
+        spacing = self.interval / max(total, 1)
+        started = 0
+        for competitor in due:
+            await self._slots.acquire()
+            # Checked once a slot is free, since waiting for one can take a while
+            self._paused = self._blocked_reason()
+            if self._paused:
+                self._slots.release()
+                logger.info("Refreshes paused: %s", self._paused)
+                break
+            self.budget.consume()
+            self._running.add(competitor.id)
+            task = asyncio.create_task(self._run(competitor))
+            self._runs.add(task)
+            task.add_done_callback(self._runs.discard)
+            started += 1
+            await asyncio.sleep(spacing * random.uniform(1 - self.jitter, 1 + self.jitter))
+        return started
+
+    async def _run(self, competitor: CompetitorRecord) -> None:
+        outcome = "error"
+        try:
+            outcome = await self.refresh(competitor)
+            logger.info("Refreshed competitor", extra={"competitor": competitor.name, "outcome": outcome})
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            logger.warning("Refresh failed: %s", e, extra={"competitor": competitor.name})
+        finally:
+            if outcome in UNBILLED_OUTCOMES or outcome == "cancelled":
+                self.budget.release()
+            if outcome != "cancelled":
+                refresh_runs.inc(outcome=outcome)
+                self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+                try:
+                    await self.repository.touch_competitor(competitor.id)
+                except Exception as e:
+                    logger.warning("Failed to update competitor after refresh: %s", e, extra={"competitor": competitor.name})
+            self._running.discard(competitor.id)
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "running": len(self._running),
+            "paused": self._paused,
+            "budget_remaining_today": self.budget.remaining(),
+            "outcomes": dict(self._outcomes),
+        }
+
+
+async def _serve() -> None:
+    """Standalone mode: the database, insight writer and scheduler, without the API or its job queue"""
+    import main
+
+    await main.db_manager.connect()
+    await main.insight_writer.start()
+    await main.start_refresh_scheduler()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await main.refresh_scheduler.stop()
+        await main.insight_writer.stop()
+        await main.db_manager.close()
+        main.shutdown_stages()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
@@ -1,30 +1,69 @@
-from firecrawl import FirecrawlApp
+import logging
 import os
+import threading
 from typing import Optional
+from cache import PersistentCache, normalize_url
+from config import data_path, env_int
+from executor import scrape_stage
+
+logger = logging.getLogger(__name__)
 
 
 class ContentScraper:
     def __init__(self):
-        api_key = os.getenv("FIRECRAWL_API_KEY")
-        if not api_key:
-            print("⚠️  Warning: Firecrawl API key not found. Scraping operations will fail.")
-            self.firecrawl = None
-        else:
-            self.firecrawl = FirecrawlApp(api_key=api_key)
-
-    def scrape_url(self, url: str) -> Optional[str]:
+        self.api_key = os.getenv("FIRECRAWL_API_KEY")
+        if not self.api_key:
+            logger.warning("Firecrawl API key not found; scraping operations will fail")
+        self._firecrawl = None
+        self._firecrawl_lock = threading.Lock()
+
+        # Cache scraped markdown by normalized URL; SCRAPE_CACHE_TTL=0 disables it
+        self.cache = PersistentCache(
+            name="scrape",
+            path=os.getenv("SCRAPE_CACHE_PATH") or data_path("scrape_cache.sqlite3"),
+            ttl_seconds=env_int("SCRAPE_CACHE_TTL", 6 * 60 * 60),
+            max_memory_entries=env_int("SCRAPE_CACHE_MEMORY_ENTRIES", 128),
+            max_disk_entries=env_int("SCRAPE_CACHE_MAX_ENTRIES", 5000),
+        )
+
+    @property
+    def firecrawl(self):
+        """Firecrawl client, created on first use since the SDK is slow to import; None without an API key"""
+        if self._firecrawl is None and self.api_key:
+            with self._firecrawl_lock:
+                if self._firecrawl is None:
+                    from firecrawl import FirecrawlApp
+                    self._firecrawl = FirecrawlApp(api_key=self.api_key)
+        return self._firecrawl
+
+    def scrape_url(self, url: str, force_refresh: bool = False) -> Optional[str]:
         """
         Scrape the given URL and return clean Markdown content
 
         Args:
             url: The URL to scrape
+            force_refresh: Skip the cache lookup and always fetch from Firecrawl
 
         Returns:
             Clean Markdown content or None if scraping fails
         """
-        print(f"🔍 Starting scrape for URL: {url}")
+        cache_key = normalize_url(url)
+        if not force_refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Scrape cache hit", extra={"url": cache_key})
+                return cached.value
+
+        markdown = self._fetch(url)
+        if markdown:
+            self.cache.set(cache_key, markdown)
+        return markdown
+
+    def _fetch(self, url: str) -> Optional[str]:
+        """Fetch the URL from Firecrawl, bypassing the cache"""
+        logger.debug("Scraping with Firecrawl", extra={"url": url})
         if not self.firecrawl:
-            print("❌ Firecrawl not configured - please set FIRECRAWL_API_KEY")
+            logger.error("Firecrawl not configured - please set FIRECRAWL_API_KEY")
             return None
 
         try:
@@ -35,8 +74,6 @@ class ContentScraper:
                 only_main_content=True,  # Focus on main content
             )
 
-            print(f"🔍 Scrape result type: {type(scrape_result)}")
-
             # Try accessing markdown attribute directly (Firecrawl v2 returns Document objects)
             if hasattr(scrape_result, 'markdown') and scrape_result.markdown:
                 return scrape_result.markdown
@@ -48,12 +85,16 @@ class ContentScraper:
                 if 'content' in scrape_result:
                     return scrape_result['content']
 
-            print(f"❌ Unexpected scrape result structure: {scrape_result}")
+            logger.warning("Unexpected scrape result structure", extra={"url": url, "result_type": type(scrape_result).__name__})
             return None
 
         except Exception as e:
-            print(f"Error scraping URL {url}: {str(e)}")
+            logger.warning("Scrape failed: %s", e, extra={"url": url})
             return None
 
+    async def scrape_url_async(self, url: str, force_refresh: bool = False) -> Optional[str]:
+        """Scrape the given URL on the bounded scrape executor without blocking the event loop"""
+        return await scrape_stage.run(self.scrape_url, url, force_refresh)
+
 
 # Scraper instance will be created in main.py after environment variables are loaded
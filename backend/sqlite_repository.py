@@ -0,0 +1,558 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from executor import db_stage
+from models import CompetitorRecord, InsightRecord, ProductWeakness
+from repository import KnownFingerprints, Repository, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# SQLite version of database_schema.sql; ids are UUID strings and timestamps UTC ISO strings
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS competitors (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    target_url TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS insights (
+    id TEXT PRIMARY KEY,
+    competitor_id TEXT NOT NULL REFERENCES competitors(id) ON DELETE CASCADE,
+    weakness_title TEXT NOT NULL,
+    weakness_description TEXT NOT NULL,
+    severity TEXT NOT NULL CHECK (severity IN ('high', 'medium', 'low')),
+    category TEXT NOT NULL,
+    fingerprint TEXT,
+    simhash INTEGER,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    last_seen_at TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS content_snapshots (
+    id TEXT PRIMARY KEY,
+    competitor_id TEXT NOT NULL REFERENCES competitors(id) ON DELETE CASCADE,
+    target_url TEXT NOT NULL,
+    section_hashes TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    UNIQUE (competitor_id, target_url)
+);
+
+CREATE INDEX IF NOT EXISTS idx_insights_competitor_id ON insights(competitor_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_competitors_created_at_id ON competitors(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_competitors_updated_at ON competitors(updated_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_insights_competitor_fingerprint ON insights(competitor_id, fingerprint);
+CREATE INDEX IF NOT EXISTS idx_insights_last_seen_at_id ON insights(last_seen_at, id);
+
+-- Insight counts per cell, kept current by the triggers below (see database_schema.sql)
+CREATE TABLE IF NOT EXISTS insight_rollups (
+    competitor_id TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    insight_count INTEGER NOT NULL DEFAULT 0,
+    occurrence_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (competitor_id, severity, category)
+);
+
+CREATE TABLE IF NOT EXISTS insight_rollup_totals (
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    insight_count INTEGER NOT NULL DEFAULT 0,
+    occurrence_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (severity, category)
+);
+
+CREATE TRIGGER IF NOT EXISTS insight_rollups_insert AFTER INSERT ON insights BEGIN
+    INSERT INTO insight_rollups (competitor_id, severity, category, insight_count, occurrence_count)
+    VALUES (NEW.competitor_id, NEW.severity, NEW.category, 1, NEW.occurrences)
+    ON CONFLICT (competitor_id, severity, category) DO UPDATE SET
+        insight_count = insight_count + 1, occurrence_count = occurrence_count + excluded.occurrence_count;
+    INSERT INTO insight_rollup_totals (severity, category, insight_count, occurrence_count)
+    VALUES (NEW.severity, NEW.category, 1, NEW.occurrences)
+    ON CONFLICT (severity, category) DO UPDATE SET
+        insight_count = insight_count + 1, occurrence_count = occurrence_count + excluded.occurrence_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS insight_rollups_delete AFTER DELETE ON insights BEGIN
+    UPDATE insight_rollups SET insight_count = insight_count - 1, occurrence_count = occurrence_count - OLD.occurrences
+    WHERE competitor_id = OLD.competitor_id AND severity = OLD.severity AND category = OLD.category;
+    DELETE FROM insight_rollups
+    WHERE competitor_id = OLD.competitor_id AND severity = OLD.severity AND category = OLD.category AND insight_count <= 0;
+    UPDATE insight_rollup_totals SET insight_count = insight_count - 1, occurrence_count = occurrence_count - OLD.occurrences
+    WHERE severity = OLD.severity AND category = OLD.category;
+    DELETE FROM insight_rollup_totals WHERE severity = OLD.severity AND category = OLD.category AND insight_count <= 0;
+END;
+
+-- An update moves the row out of its old cell and into its new one (often the same cell)
+CREATE TRIGGER IF NOT EXISTS insight_rollups_update AFTER UPDATE OF competitor_id, severity, category, occurrences ON insights BEGIN
+    UPDATE insight_rollups SET insight_count = insight_count - 1, occurrence_count = occurrence_count - OLD.occurrences
+    WHERE competitor_id = OLD.competitor_id AND severity = OLD.severity AND category = OLD.category;
+    UPDATE insight_rollup_totals SET insight_count = insight_count - 1, occurrence_count = occurrence_count - OLD.occurrences
+    WHERE severity = OLD.severity AND category = OLD.category;
+    INSERT INTO insight_rollups (competitor_id, severity, category, insight_count, occurrence_count)
+    VALUES (NEW.competitor_id, NEW.severity, NEW.category, 1, NEW.occurrences)
+    ON CONFLICT (competitor_id, severity, category) DO UPDATE SET
+        insight_count = insight_count + 1, occurrence_count = occurrence_count + excluded.occurrence_count;
+    INSERT INTO insight_rollup_totals (severity, category, insight_count, occurrence_count)
+    VALUES (NEW.severity, NEW.category, 1, NEW.occurrences)
+    ON CONFLICT (severity, category) DO UPDATE SET
+        insight_count = insight_count + 1, occurrence_count = occurrence_count + excluded.occurrence_count;
+    DELETE FROM insight_rollups
+    WHERE competitor_id = OLD.competitor_id AND severity = OLD.severity AND category = OLD.category AND insight_count <= 0;
+    DELETE FROM insight_rollup_totals WHERE severity = OLD.severity AND category = OLD.category AND insight_count <= 0;
+END;
+
+-- Backfill files created before the rollups, in one grouped pass
+INSERT INTO insight_rollups (competitor_id, severity, category, insight_count, occurrence_count)
+SELECT competitor_id, severity, category, COUNT(*), SUM(occurrences) FROM insights
+WHERE NOT EXISTS (SELECT 1 FROM insight_rollups)
+GROUP BY competitor_id, severity, category;
+INSERT INTO insight_rollup_totals (severity, category, insight_count, occurrence_count)
+SELECT severity, category, SUM(insight_count), SUM(occurrence_count) FROM insight_rollups
+WHERE NOT EXISTS (SELECT 1 FROM insight_rollup_totals)
+GROUP BY severity, category;
+
+-- Full-text index over insight titles and descriptions, the FTS5 counterpart of
+-- search_vector. It stores no text of its own and follows insights by rowid, so
+-- run INSERT INTO insights_fts(insights_fts) VALUES ('rebuild') after a VACUUM.
+CREATE VIRTUAL TABLE IF NOT EXISTS insights_fts USING fts5(
+    weakness_title, weakness_description,
+    content='insights', content_rowid='rowid', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS insights_fts_insert AFTER INSERT ON insights BEGIN
+    INSERT INTO insights_fts (rowid, weakness_title, weakness_description)
+    VALUES (NEW.rowid, NEW.weakness_title, NEW.weakness_description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS insights_fts_delete AFTER DELETE ON insights BEGIN
+    INSERT INTO insights_fts (insights_fts, rowid, weakness_title, weakness_description)
+    VALUES ('delete', OLD.rowid, OLD.weakness_title, OLD.weakness_description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS insights_fts_update AFTER UPDATE OF weakness_title, weakness_description ON insights BEGIN
+    INSERT INTO insights_fts (insights_fts, rowid, weakness_title, weakness_description)
+    VALUES ('delete', OLD.rowid, OLD.weakness_title, OLD.weakness_description);
+    INSERT INTO insights_fts (rowid, weakness_title, weakness_description)
+    VALUES (NEW.rowid, NEW.weakness_title, NEW.weakness_description);
+END;
+
+-- Index files created before the search index
+INSERT INTO insights_fts (insights_fts) SELECT 'rebuild'
+WHERE NOT EXISTS (SELECT 1 FROM insights_fts_docsize) AND EXISTS (SELECT 1 FROM insights);
+"""
+
+_COMPETITOR_COLUMNS = "id, name, target_url, created_at, updated_at"
+_INSIGHT_COLUMNS = (
+    "id, competitor_id, weakness_title, weakness_description, severity, category, "
+    "created_at, occurrences, last_seen_at, fingerprint"
+)
+
+
+def _fts_query(query: str) -> str:
+    """
+    FTS5 MATCH expression for a web-search style query, as websearch_to_tsquery reads it
+
+    Words and "quoted phrases" are all required, `or` separates alternatives
+    and `-word` excludes a word. Every term is quoted so user input can't
+    inject FTS5 syntax. Raises ValueError when nothing searchable is left.
+    """
+    groups: List[str] = []
+    required: List[str] = []
+    excluded: List[str] = []
+
+    def close_group():
+        # FTS5 can't express a group made only of exclusions, so one is dropped
+        if required:
+            groups.append(" ".join(required + [f"NOT {term}" for term in excluded]))
+        required.clear()
+        excluded.clear()
+
+    for match in re.finditer(r'(-?)"([^"]*)"?|(\S+)', query):
+        negated, phrase, word = match.group(1), match.group(2), match.group(3)
+        if word is not None and word.lower() == "or":
+            close_group()
+            continue
+        if word is not None:
+            negated, word = ("-", word[1:]) if word.startswith("-") else ("", word)
+        text = (phrase if phrase is not None else word).strip()
+        if not text:
+            continue
+        term = '"' + text.replace('"', '""') + '"'
+        (excluded if negated else required).append(term)
+    close_group()
+
+    if not groups:
+        raise ValueError("Search query has no searchable terms")
+    return " OR ".join(f"({group})" for group in groups)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _competitor(row) -> CompetitorRecord:
+    return CompetitorRecord(
+        id=row[0],
+        name=row[1],
+        target_url=row[2],
+        created_at=datetime.fromisoformat(row[3]),
+        updated_at=datetime.fromisoformat(row[4]),
+    )
+
+
+def _insight(row) -> InsightRecord:
+    return InsightRecord(
+        id=row[0],
+        competitor_id=row[1],
+        weakness_title=row[2],
+        weakness_description=row[3],
+        severity=row[4],
+        category=row[5],
+        created_at=datetime.fromisoformat(row[6]),
+        occurrences=row[7],
+        last_seen_at=datetime.fromisoformat(row[8]) if row[8] else None,
+        fingerprint=row[9],
+    )
+
+
+class SqliteRepository(Repository):
+    """
+    Repository backed by a local SQLite file, for local runs and tests
+
+    One connection shared behind a lock, like the job store and caches; queries
+    run on the bounded database executor so they never block the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> None:
+        # Called with the lock held; the file and schema are created on first use
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+            logger.info("SQLite database ready at %s", self.path)
+
+    async def _run(self, func, *args):
+        def locked():
+            with self._lock:
+                self._open()
+                try:
+                    result = func(*args)
+                    self._conn.commit()
+                    return result
+                except Exception:
+                    self._conn.rollback()
+                    raise
+        return await db_stage.run(locked)
+
+    async def connect(self) -> None:
+        await self._run(lambda: None)
+
+    async def close(self) -> None:
+        def close():
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        await db_stage.run(close)
+
+    async def ping(self) -> None:
+        await self._run(lambda: self._conn.execute("SELECT 1 FROM competitors LIMIT 1").fetchone())
+
+    async def create_competitor(self, name: str, target_url: str) -> CompetitorRecord:
+        def upsert():
+            now = _now()
+            self._conn.execute(
+                """
+                INSERT INTO competitors (id, name, target_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET target_url = excluded.target_url, updated_at = excluded.updated_at
+                """,
+                (str(uuid.uuid4()), name, target_url, now, now),
+            )
+            return self._conn.execute(
+                f"SELECT {_COMPETITOR_COLUMNS} FROM competitors WHERE name = ?", (name,)
+            ).fetchone()
+        return _competitor(await self._run(upsert))
+
+    async def get_competitor_by_name(self, name: str) -> Optional[CompetitorRecord]:
+        row = await self._run(
+            lambda: self._conn.execute(f"SELECT {_COMPETITOR_COLUMNS} FROM competitors WHERE name = ?", (name,)).fetchone()
+        )
+        return _competitor(row) if row else None
+
+    async def delete_competitor(self, competitor_id: str) -> None:
+        await self._run(lambda: self._conn.execute("DELETE FROM competitors WHERE id = ?", (competitor_id,)))
+
+    async def list_competitors(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        params: Tuple = ()
+        where = ""
+        if cursor:
+            where = "WHERE (c.created_at, c.id) < (?, ?)"
+            params = decode_cursor(cursor)
+
+        rows = await self._run(lambda: self._conn.execute(
+            f"""
+            SELECT c.id, c.name, c.target_url, c.created_at,
+                   (SELECT COUNT(*) FROM insights i WHERE i.competitor_id = c.id) AS analyses_count
+            FROM competitors c
+            {where}
+            ORDER BY c.created_at DESC, c.id DESC
+            LIMIT ?
+            """,
+            (*params, limit + 1),
+        ).fetchall())
+
+        competitors = [
+            {"id": row[0], "name": row[1], "target_url": row[2], "created_at": row[3], "analyses_count": row[4]}
+            for row in rows
+        ]
+        next_cursor = None
+        if len(competitors) > limit:
+            competitors = competitors[:limit]
+            next_cursor = encode_cursor(competitors[-1]["created_at"], competitors[-1]["id"])
+        return competitors, next_cursor
+
+    async def count_competitors(self) -> int:
+        row = await self._run(lambda: self._conn.execute("SELECT COUNT(*) FROM competitors").fetchone())
+        return row[0]
+
+    async def list_competitor_ids(self) -> List[str]:
+        rows = await self._run(lambda: self._conn.execute("SELECT id FROM competitors ORDER BY id").fetchall())
+        return [row[0] for row in rows]
+
+    async def list_due_competitors(self, updated_before: datetime, limit: int) -> List[CompetitorRecord]:
+        rows = await self._run(lambda: self._conn.execute(
+            f"SELECT {_COMPETITOR_COLUMNS} FROM competitors WHERE updated_at < ? ORDER BY updated_at LIMIT ?",
+            (updated_before.astimezone(timezone.utc).isoformat(), limit),
+        ).fetchall())
+        return [_competitor(row) for row in rows]
+
+    async def touch_competitor(self, competitor_id: str) -> None:
+        await self._run(lambda: self._conn.execute(
+            "UPDATE competitors SET updated_at = ? WHERE id = ?", (_now(), competitor_id)
+        ))
+
+    async def get_insights(self, competitor_id: str) -> List[ProductWeakness]:
+        rows = await self._run(lambda: self._conn.execute(
+            """
+            SELECT weakness_title, weakness_description, severity, category
+            FROM insights WHERE competitor_id = ? ORDER BY created_at
+            """,
+            (competitor_id,),
+        ).fetchall())
+        return [ProductWeakness(title=row[0], description=row[1], severity=row[2], category=row[3]) for row in rows]
+
+    async def get_insight_records(self, competitor_id: str) -> List[InsightRecord]:
+        rows = await self._run(lambda: self._conn.execute(
+            f"SELECT {_INSIGHT_COLUMNS} FROM insights WHERE competitor_id = ? ORDER BY created_at",
+            (competitor_id,),
+        ).fetchall())
+        return [_insight(row) for row in rows]
+
+    async def merge_insights(self, keeper_id: str, duplicate_ids: List[str], changes: Dict[str, Any]) -> None:
+        changes = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in changes.items()}
+
+        def merge():
+            self._conn.executemany("DELETE FROM insights WHERE id = ?", [(insight_id,) for insight_id in duplicate_ids])
+            assignments = ", ".join(f"{column} = ?" for column in changes)
+            self._conn.execute(f"UPDATE insights SET {assignments} WHERE id = ?", (*changes.values(), keeper_id))
+        await self._run(merge)
+
+    async def get_fingerprints(self, competitor_ids: List[str]) -> KnownFingerprints:
+        placeholders = ", ".join("?" for _ in competitor_ids)
+        rows = await self._run(lambda: self._conn.execute(
+            f"""
+            SELECT competitor_id, fingerprint, simhash FROM insights
+            WHERE competitor_id IN ({placeholders}) AND fingerprint IS NOT NULL
+            """,
+            competitor_ids,
+        ).fetchall())
+        known: KnownFingerprints = {}
+        for competitor_id, fingerprint, simhash in rows:
+            known.setdefault(competitor_id, []).append((fingerprint, simhash))
+        return known
+
+    async def upsert_insight_rows(self, rows: List[Dict[str, Any]]) -> List[InsightRecord]:
+        def upsert():
+            now = _now()
+            self._conn.executemany(
+                """
+                INSERT INTO insights (
+                    id, competitor_id, weakness_title, weakness_description, severity, category,
+                    fingerprint, simhash, occurrences, last_seen_at, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (competitor_id, fingerprint) DO UPDATE SET
+                    weakness_description = excluded.weakness_description,
+                    severity = excluded.severity,
+                    category = excluded.category,
+                    simhash = excluded.simhash,
+                    occurrences = insights.occurrences + excluded.occurrences,
+                    last_seen_at = excluded.last_seen_at
+                """,
+                [
+                    (
+                        str(uuid.uuid4()), row["competitor_id"], row["weakness_title"], row["weakness_description"],
+                        row["severity"], row["category"], row["fingerprint"], row["simhash"], row["occurrences"], now, now,
+                    )
+                    for row in rows
+                ],
+            )
+            return [
+                self._conn.execute(
+                    f"SELECT {_INSIGHT_COLUMNS} FROM insights WHERE competitor_id = ? AND fingerprint = ?",
+                    (row["competitor_id"], row["fingerprint"]),
+                ).fetchone()
+                for row in rows
+            ]
+        try:
+            return [_insight(row) for row in await self._run(upsert)]
+        except Exception as e:
+            raise Exception(f"Failed to save insights: {e}")
+
+    async def get_snapshot(self, competitor_id: str, target_url: str) -> Optional[List[str]]:
+        row = await self._run(lambda: self._conn.execute(
+            "SELECT section_hashes FROM content_snapshots WHERE competitor_id = ? AND target_url = ?",
+            (competitor_id, target_url),
+        ).fetchone())
+        return json.loads(row[0]) if row else None
+
+    async def save_snapshot(self, competitor_id: str, target_url: str, section_hashes: List[str]) -> None:
+        await self._run(lambda: self._conn.execute(
+            """
+            INSERT INTO content_snapshots (id, competitor_id, target_url, section_hashes, captured_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (competitor_id, target_url) DO UPDATE SET
+                section_hashes = excluded.section_hashes,
+                captured_at = excluded.captured_at
+            """,
+            (str(uuid.uuid4()), competitor_id, target_url, json.dumps(section_hashes), _now()),
+        ))
+
+    async def get_insight_rollups(self, competitor_id: Optional[str] = None, per_competitor: bool = False) -> List[Dict[str, Any]]:
+        columns = "severity, category, insight_count, occurrence_count"
+        if competitor_id:
+            query, params = f"SELECT {columns} FROM insight_rollups WHERE competitor_id = ?", (competitor_id,)
+        elif per_competitor:
+            query, params = f"SELECT {columns}, competitor_id FROM insight_rollups ORDER BY competitor_id", ()
+        else:
+            query, params = f"SELECT {columns} FROM insight_rollup_totals", ()
+
+        def select():
+            cursor = self._conn.execute(query, params)
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        return await self._run(select)
+
+    async def search_insights(
+        self,
+        query: str,
+        competitor_id: Optional[str] = None,
+        severity: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # bm25 is lower-is-better; negated (titles weighted double) so rank sorts like ts_rank_cd
+        conditions: List[str] = []
+        params: List[Any] = [_fts_query(query)]
+        for column, value in (("i.competitor_id", competitor_id), ("i.severity", severity), ("i.category", category)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if cursor:
+            rank, cursor_id = decode_cursor(cursor)
+            conditions.append("(m.rank, i.id) < (?, ?)")
+            params.extend([float(rank), cursor_id])
+
+        def select():
+            cursor = self._conn.execute(
+                f"""
+                SELECT i.id, i.competitor_id, c.name AS competitor_name, i.weakness_title, i.weakness_description,
+                       i.severity, i.category, i.occurrences, i.last_seen_at, m.rank
+                FROM (
+                    SELECT rowid, -bm25(insights_fts, 2.0, 1.0) AS rank FROM insights_fts WHERE insights_fts MATCH ?
+                ) m
+                JOIN insights i ON i.rowid = m.rowid
+                JOIN competitors c ON c.id = i.competitor_id
+                {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY m.rank DESC, i.id DESC
+                LIMIT ?
+                """,
+                (*params, limit + 1),
+            )
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+        rows = await self._run(select)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(repr(rows[-1]["rank"]), rows[-1]["id"])
+        return rows, next_cursor
+
+    async def _export_page(
+        self, select: str, changed_at: str, since: Optional[datetime], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of an export query, keyed by (changed_at, id) ascending"""
+        conditions: List[str] = []
+        params: List[Any] = []
+        if since is not None:
+            conditions.append(f"{changed_at} >= ?")
+            params.append(since.astimezone(timezone.utc).isoformat())
+        if cursor:
+            conditions.append(f"({changed_at}, id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def fetch():
+            cursor = self._conn.execute(
+                f"SELECT * FROM ({select}) {where} ORDER BY {changed_at}, id LIMIT ?", (*params, limit + 1)
+            )
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+        rows = await self._run(fetch)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][changed_at], rows[-1]["id"])
+        return rows, next_cursor
+
+    async def export_competitors(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._export_page(f"SELECT {_COMPETITOR_COLUMNS} FROM competitors", "updated_at", since, limit, cursor)
+
+    async def export_insights(
+        self, since: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        select = """
+            SELECT i.id, i.competitor_id, c.name AS competitor_name, i.weakness_title, i.weakness_description,
+                   i.severity, i.category, i.occurrences, i.created_at, i.last_seen_at
+            FROM insights i JOIN competitors c ON c.id = i.competitor_id
+        """
+        return await self._export_page(select, "last_seen_at", since, limit, cursor)
+
+    async def table_counts(self) -> Dict[str, int]:
+        def count():
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("competitors", "insights")
+            }
+        return await self._run(count)
@@ -0,0 +1,86 @@
+"""
+Shared fixtures for the backend tests.
+
+Everything runs offline: storage is a SqliteRepository in a temporary file
+(or SupabaseRepository over the in-memory client), and Firecrawl and Gemini
+are the stand-ins from benchmarks/fakes.py with no latency. Run from backend/:
+
+    python -m pytest
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# Set before any backend module reads them: caches, the job store and the database
+# live in a scratch directory, and real credentials from .env are never picked up
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="competitor-analysis-tests-")
+os.environ["DATABASE_BACKEND"] = "sqlite"
+os.environ["SUPABASE_URL"] = ""
+os.environ["SUPABASE_SERVICE_ROLE_KEY"] = ""
+os.environ["FIRECRAWL_API_KEY"] = "offline-test"
+os.environ["GOOGLE_AI_API_KEY"] = "offline-test"
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """A SqliteRepository on a fresh file"""
+    from sqlite_repository import SqliteRepository
+
+    repo = SqliteRepository(str(tmp_path / "competitor_analysis.sqlite3"))
+    yield repo
+    asyncio.run(repo.close())
+
+
+@pytest.fixture
+def supabase():
+    """A SupabaseRepository over the in-memory PostgREST stand-in, capped at 3 rows per response"""
+    from database import SupabaseRepository
+    from fakes import FakeSupabaseClient
+
+    return SupabaseRepository(client=FakeSupabaseClient(max_rows=3))
+
+
+@pytest.fixture
+def api(repository, tmp_path, monkeypatch):
+    """
+    The main module wired to the repository fixture, fake Firecrawl and fake Gemini
+
+    Caches, the model registry, request coalescing and the insight writer are
+    fresh for every test. The lifespan hook doesn't run, so the insight writer
+    writes straight through.
+    """
+    monkeypatch.setenv("SCRAPE_CACHE_PATH", str(tmp_path / "scrape_cache.sqlite3"))
+    monkeypatch.setenv("ANALYSIS_CACHE_PATH", str(tmp_path / "analysis_cache.sqlite3"))
+
+    import main
+    from analysis import AnalysisCache
+    from fakes import FakeGenerativeModel, Latency, make_fake_scraper
+    from insight_writer import InsightWriter
+    from llm import DEFAULT_MODEL_ID, SUPPORTED_MODELS, ModelRegistry
+    from singleflight import SingleFlight
+
+    registry = ModelRegistry(DEFAULT_MODEL_ID, SUPPORTED_MODELS)
+    registry.model_factory = lambda model_id: FakeGenerativeModel(model_id, Latency())
+
+    monkeypatch.setattr(main, "db_manager", repository)
+    monkeypatch.setattr(main, "insight_writer", InsightWriter(repository.save_insights_batch))
+    monkeypatch.setattr(main, "scraper", make_fake_scraper(Latency(), page_chars=4000))
+    monkeypatch.setattr(main, "analysis_cache", AnalysisCache())
+    monkeypatch.setattr(main, "model_registry", registry)
+    monkeypatch.setattr(main, "analysis_flights", SingleFlight())
+    return main
+
+
+@pytest.fixture
+def client(api):
+    """HTTP client for the API fixture"""
+    from fastapi.testclient import TestClient
+
+    return TestClient(api.app)
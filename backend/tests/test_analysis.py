@@ -0,0 +1,93 @@
+import json
+
+import analysis
+from analysis import AnalysisCache, WeaknessClusters, WeaknessStreamParser, merge_weaknesses, split_markdown
+from models import ProductWeakness
+
+
+def weakness(title: str, description: str = "Details", severity: str = "medium", category: str = "feature") -> ProductWeakness:
+    return ProductWeakness(title=title, description=description, severity=severity, category=category)
+
+
+def test_analysis_cache_round_trips_weaknesses(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANALYSIS_CACHE_PATH", str(tmp_path / "analysis_cache.sqlite3"))
+    cache = AnalysisCache()
+    stored = [weakness("Slow support", severity="high"), weakness("Confusing pricing", category="pricing")]
+    cache.set("model-a", "prompt", stored)
+
+    assert cache.get("model-a", "prompt") == stored
+    assert cache.get("model-b", "prompt") is None
+    assert cache.get("model-a", "other prompt") is None
+
+
+def test_analysis_cache_key_covers_the_prompt_version(monkeypatch):
+    key = AnalysisCache.key("model-a", "prompt")
+    monkeypatch.setattr(analysis, "PROMPT_VERSION", "next")
+
+    assert AnalysisCache.key("model-a", "prompt") != key
+
+
+def test_stream_parser_yields_each_weakness_once_its_object_closes():
+    text = json.dumps({"weaknesses": [
+        {"title": "Braces {in} \"quotes\"", "description": "a", "severity": "high", "category": "pricing"},
+        {"title": "Second", "description": "b", "severity": "low", "category": "support"},
+    ]})
+    parser = WeaknessStreamParser()
+
+    streamed = [weakness for start in range(0, len(text), 7) for weakness in parser.feed(text[start:start + 7])]
+
+    assert [weakness.title for weakness in streamed] == ['Braces {in} "quotes"', "Second"]
+
+
+def test_stream_parser_skips_malformed_items_and_stops_at_the_end_of_the_array():
+    parser = WeaknessStreamParser()
+    text = '{"weaknesses": [{"title": "No description"}, {"title": "Ok", "description": "d", "severity": "low", "category": "other"}], "extra": [{}]}'
+
+    assert [weakness.title for weakness in parser.feed(text)] == ["Ok"]
+    assert parser.feed('{"title": "Late", "description": "d", "severity": "low", "category": "other"}') == []
+
+
+def test_split_markdown_keeps_sections_together_within_the_limit():
+    sections = [f"## Review {index}\n\n" + "Too slow. " * 10 for index in range(6)]
+
+    chunks = split_markdown("\n\n".join(sections), max_chars=250)
+
+    assert all(len(chunk) <= 250 for chunk in chunks)
+    assert len(chunks) == 3
+    assert all(chunk.startswith("## Review") for chunk in chunks)
+    assert "".join(chunks).count("## Review") == 6
+
+
+def test_split_markdown_splits_an_oversized_section_on_paragraphs():
+    section = "## Long review\n\n" + "\n\n".join("Paragraph %d. " % index * 5 for index in range(10))
+
+    chunks = split_markdown(section, max_chars=100)
+
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == section.split()
+
+
+def test_merge_weaknesses_combines_similar_titles_and_ranks_by_support():
+    groups = [
+        [weakness("Confusing pricing tiers", severity="low"), weakness("Slow support")],
+        [weakness("Pricing tiers are confusing", description="Longer details", severity="high")],
+        [weakness("Confusing pricing tiers", severity="medium"), weakness("Mobile app crashes", severity="high")],
+    ]
+
+    merged = merge_weaknesses(groups)
+
+    # Three chunks reported pricing; the most severe wording wins
+    assert [item.title for item in merged] == ["Pricing tiers are confusing", "Mobile app crashes", "Slow support"]
+    assert merged[0].severity == "high"
+    assert len(merge_weaknesses(groups, limit=1)) == 1
+
+
+def test_clusters_keep_counting_support_across_groups():
+    clusters = WeaknessClusters()
+    clusters.add([weakness("Slow support", severity="low")])
+    for title in ("Confusing pricing", "Mobile app crashes", "Export fails"):
+        clusters.add([weakness("Slow support", severity="low"), weakness(title, severity="high")])
+
+    # Four pages reported slow support; re-merging a truncated list would have capped it at two
+    assert clusters.ranked(limit=2)[0].title == "Slow support"
+    assert len(clusters.ranked()) == 4
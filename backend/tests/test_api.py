@@ -0,0 +1,295 @@
+import asyncio
+import json
+
+
+def analyze_body(**fields):
+    return {"target_url": "https://reviews.example/acme", "competitor_name": "Acme", **fields}
+
+
+def count_generations(api):
+    """Model ids of every generate_content call the fake models receive from now on"""
+    calls = []
+    factory = api.model_registry.model_factory
+
+    def counting_factory(model_id):
+        model = factory(model_id)
+        generate = model.generate_content
+
+        def generate_content(prompt, **kwargs):
+            calls.append(model_id)
+            return generate(prompt, **kwargs)
+
+        model.generate_content = generate_content
+        return model
+
+    api.model_registry.model_factory = counting_factory
+    return calls
+
+
+def test_analyze_scrapes_analyzes_and_saves(api, client):
+    response = client.post("/analyze", json=analyze_body())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["competitor_name"] == "Acme"
+    assert len(body["weaknesses"]) == 8
+    assert body["raw_content_length"] > 0
+
+    competitor = asyncio.run(api.db_manager.get_competitor_by_name("Acme"))
+    saved = asyncio.run(api.db_manager.get_insights(competitor.id))
+    # The fake's weaknesses are worded alike, so near duplicates share a row
+    assert saved
+    assert {weakness.title for weakness in saved} <= {weakness["title"] for weakness in body["weaknesses"]}
+
+
+def test_stage_stats_reports_every_stage(client):
+    stages = client.get("/stage-stats").json()["stages"]
+
+    assert set(stages) == {"scrape", "llm", "db"}
+    assert all(stage["max_concurrency"] >= 1 for stage in stages.values())
+
+
+def test_repeat_analysis_is_served_from_the_analysis_cache(api, client):
+    calls = count_generations(api)
+
+    first = client.post("/analyze", json=analyze_body()).json()
+    second = client.post("/analyze", json=analyze_body()).json()
+
+    assert calls == [api.model_registry.default_model_id]
+    assert second["weaknesses"] == first["weaknesses"]
+
+
+def test_result_of_a_fallback_model_is_not_cached_under_the_requested_model(api, client):
+    calls = count_generations(api)
+    api.model_registry.report_rate_limited("gemini-2.5-pro", daily=True)
+    assert client.post("/analyze", json=analyze_body(model="gemini-2.5-pro")).status_code == 200
+
+    # A new UTC day gives pro its quota back; the same content is then analyzed
+    # by pro instead of being answered with the fallback model's cached output
+    api.model_registry._daily["gemini-2.5-pro"].day = "2000-01-01"
+    assert client.post("/analyze", json=analyze_body(model="gemini-2.5-pro")).status_code == 200
+
+    assert calls == [api.model_registry.default_model_id, "gemini-2.5-pro"]
+
+
+def test_batch_streams_one_line_per_item_and_a_summary(client):
+    items = [analyze_body(target_url=f"https://reviews.example/{index}", competitor_name=f"Batch {index}") for index in range(3)]
+
+    response = client.post("/analyze/batch", json={"items": items})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2]
+    assert all(line["status"] == "ok" for line in lines[:-1])
+    assert lines[-1] == {"status": "done", "total": 3, "succeeded": 3, "failed": 0}
+
+
+def test_competitors_are_paged_with_a_cursor(api, client):
+    async def seed():
+        for index in range(3):
+            await api.db_manager.create_competitor(f"Competitor {index}", f"https://c{index}.example")
+
+    asyncio.run(seed())
+    first = client.get("/competitors", params={"limit": 2}).json()
+    second = client.get("/competitors", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+
+    assert [row["name"] for row in first["competitors"] + second["competitors"]] == ["Competitor 2", "Competitor 1", "Competitor 0"]
+    assert second["next_cursor"] is None
+    assert first["total_competitors"] == second["total_competitors"] == 3
+    assert client.get("/competitors", params={"cursor": "garbage"}).status_code == 400
+
+
+def stream_events(response):
+    """(event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_stream_sends_each_weakness_then_the_result(client):
+    events = stream_events(client.post("/analyze/stream", json=analyze_body()))
+
+    names = [event for event, _ in events]
+    assert names[-1] == "result"
+    assert "reset" not in names
+    streamed = [data["weakness"] for event, data in events if event == "weakness"]
+    assert streamed == events[-1][1]["weaknesses"]
+
+
+def test_stream_resets_the_weaknesses_of_a_failed_attempt(api, client):
+    factory = api.model_registry.model_factory
+    failing_model_id = api.model_registry.default_model_id
+
+    def flaky_factory(model_id):
+        model = factory(model_id)
+        if model_id != failing_model_id:
+            return model
+        generate = model.generate_content
+
+        def generate_content(prompt, stream=False, **kwargs):
+            text = "".join(chunk.text for chunk in generate(prompt, stream=True))
+
+            def chunks():
+                # Two complete weaknesses, then the API gives up on this model
+                yield type("Chunk", (), {"text": text[: text.index("}", text.index("}") + 1) + 1]})()
+                raise Exception("429 Too Many Requests")
+
+            return chunks()
+
+        model.generate_content = generate_content
+        return model
+
+    api.model_registry.model_factory = flaky_factory
+    events = stream_events(client.post("/analyze/stream", json=analyze_body()))
+
+    names = [event for event, _ in events]
+    assert names.count("reset") == 1
+    assert names[names.index("reset") - 2:names.index("reset")] == ["weakness", "weakness"]
+    after_reset = [data for event, data in events[names.index("reset"):] if event == "weakness"]
+    assert [data["index"] for data in after_reset] == list(range(len(after_reset)))
+    assert [data["weakness"] for data in after_reset] == events[-1][1]["weaknesses"]
+
+
+def test_chunked_mode_analyzes_each_chunk_and_merges_the_results(api, client, monkeypatch):
+    monkeypatch.setattr(api, "MAX_CONTENT_CHARS", 1000)
+    calls = count_generations(api)
+
+    response = client.post("/analyze", json=analyze_body(analysis_mode="chunked"))
+
+    assert response.status_code == 200
+    assert len(calls) > 1
+    # The fake's titles differ only by a number within a chunk, so each chunk merges into one
+    assert len(response.json()["weaknesses"]) == len(calls)
+
+
+def test_incremental_analysis_of_an_unchanged_page_skips_the_model(api, client):
+    calls = count_generations(api)
+
+    first = client.post("/analyze", json=analyze_body(incremental=True)).json()
+    # A different model so the analysis cache can't answer the second run either
+    second = client.post("/analyze", json=analyze_body(incremental=True, model="gemini-2.5-pro")).json()
+
+    assert len(calls) == 1
+    competitor = asyncio.run(api.db_manager.get_competitor_by_name("Acme"))
+    stored = asyncio.run(api.db_manager.get_insights(competitor.id))
+    # The stored insights come back (merged again, so the fake's look-alike titles collapse)
+    assert second["weaknesses"]
+    assert {item["title"] for item in second["weaknesses"]} <= {item.title for item in stored}
+    assert first["weaknesses"]
+
+
+def test_incremental_snapshot_holds_only_the_sections_that_fit_the_prompt(api, client, monkeypatch):
+    # About 7 of the fake page's 16 compacted sections fit in 400 tokens
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "400")
+    calls = count_generations(api)
+
+    def snapshot():
+        competitor = asyncio.run(api.db_manager.get_competitor_by_name("Acme"))
+        return asyncio.run(api.db_manager.get_snapshot(competitor.id, "https://reviews.example/acme"))
+
+    page = api.scraper.scrape_url("https://reviews.example/acme")
+    every_section = [digest for digest, _ in api.snapshot_sections(page)]
+
+    client.post("/analyze", json=analyze_body(incremental=True))
+    first = snapshot()
+    assert first == every_section[:len(first)] and len(first) < len(every_section)
+
+    # Each run sends the sections the last one left out, until the page is covered
+    for _ in range(len(every_section)):
+        before = len(calls)
+        client.post("/analyze", json=analyze_body(incremental=True))
+        if len(calls) == before:
+            break
+    assert snapshot() == every_section
+    assert len(calls) > 2
+
+
+def test_stream_reports_persist_done_only_once_the_insights_are_stored(api, client, monkeypatch):
+    waits = []
+
+    async def save(competitor_id, weaknesses, wait=None):
+        waits.append(wait)
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(api.insight_writer, "save", save)
+    events = stream_events(client.post("/analyze/stream", json=analyze_body()))
+
+    # Waited for even in write-behind mode, so the failure reaches the client
+    assert waits == [True]
+    assert {"stage": "persist", "status": "done"} not in [data for event, data in events if event == "stage"]
+    assert events[-1] == ("error", {"detail": "database is down"})
+
+
+def test_concurrent_identical_analyses_run_once(api):
+    calls = count_generations(api)
+    scrapes = []
+    fetch = api.scraper._fetch
+
+    def counting_fetch(url):
+        scrapes.append(url)
+        return fetch(url)
+
+    api.scraper._fetch = counting_fetch
+    request = api.AnalyzeRequest(**analyze_body())
+
+    async def scenario():
+        return await asyncio.gather(*(api.run_analysis_once(request) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert len(scrapes) == 1
+    assert len(calls) == 1
+    assert all(result.weaknesses == results[0].weaknesses for result in results)
+    assert api.analysis_flights.stats()["coalesced"] == 2
+
+
+def test_crawl_streams_each_page_then_a_summary(client, monkeypatch):
+    monkeypatch.setenv("CRAWL_DOMAIN_DELAY", "0")
+
+    response = client.post("/crawl", json=analyze_body(max_depth=1, max_pages=3))
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    pages, summary = lines[:-1], lines[-1]
+    assert len(pages) == 3
+    assert all(page["status"] == "ok" for page in pages)
+    assert summary["status"] == "done"
+    assert summary["pages_analyzed"] == 3
+    assert summary["weaknesses"]
+
+
+def test_crawl_reports_a_database_failure_as_an_http_error(api, client, monkeypatch):
+    async def down(name, target_url):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(api.db_manager, "create_competitor", down)
+
+    response = client.post("/crawl", json=analyze_body())
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Failed to save competitor: connection refused"
+
+
+def test_insight_stats_sum_the_rollup_cells(api, client):
+    from models import ProductWeakness
+
+    async def seed():
+        competitor = await api.db_manager.create_competitor("Acme", "https://acme.example")
+        await api.db_manager.save_insights(competitor.id, [
+            ProductWeakness(title="Slow support", description="Days to answer", severity="high", category="support"),
+            ProductWeakness(title="Confusing pricing", description="Hard to compare", severity="medium", category="pricing"),
+        ])
+        return competitor
+
+    competitor = asyncio.run(seed())
+    stats = client.get("/insights/stats", params={"per_competitor": True}).json()
+
+    assert stats["insights"] == stats["occurrences"] == 2
+    assert stats["by_severity"] == {"high": 1, "medium": 1}
+    assert stats["by_category"] == {"support": 1, "pricing": 1}
+    assert [(row["competitor_id"], row["insights"]) for row in stats["competitors"]] == [(competitor.id, 2)]
+
+
+def test_search_rejects_a_query_without_terms(client):
+    response = client.get("/insights/search", params={"q": "-only"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Search query has no searchable terms"
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import PersistentCache, content_hash, normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM/Reviews/", "https://example.com/Reviews"),
+    ("example.com", "https://example.com/"),
+    ("https://example.com:443/a#section", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&gclid=y&page=2&fbclid=z", "https://example.com/a?page=2"),
+    ("  https://example.com/a?empty=  ", "https://example.com/a?empty="),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_keeps_distinct_pages_apart():
+    assert normalize_url("https://example.com/a?page=1") != normalize_url("https://example.com/a?page=2")
+    assert normalize_url("https://example.com/a") != normalize_url("https://example.com/b")
+
+
+def make_cache(tmp_path, **kwargs) -> PersistentCache:
+    options = {"ttl_seconds": 60, "max_memory_entries": 2, "max_disk_entries": 3, **kwargs}
+    return PersistentCache(name="test", path=str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_get_returns_stored_entry_with_its_content_hash(tmp_path):
+    store = make_cache(tmp_path)
+    store.set("k", "value")
+
+    entry = store.get("k")
+    assert entry.value == "value"
+    assert entry.content_hash == content_hash("value")
+    assert store.get("missing") is None
+    assert store.stats()["memory_hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = make_cache(tmp_path)
+    store.set("k", "value")
+
+    now[0] += 59
+    assert store.get("k") is not None
+    now[0] += 2
+    assert store.get("k") is None
+    assert store.stats()["expired"] == 1
+    assert store.stats()["disk_entries"] == 0
+
+
+def test_memory_tier_falls_back_to_disk(tmp_path):
+    store = make_cache(tmp_path)
+    for key in ("a", "b", "c"):
+        store.set(key, key.upper())
+
+    # "a" was pushed out of the two-entry memory tier but is still on disk
+    assert store.get("a").value == "A"
+    stats = store.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_entries"] == 2
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = make_cache(tmp_path, max_memory_entries=1)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        store.set(key, key)
+    now[0] += 1
+    store.get("a")  # from disk: refreshes its access time
+    now[0] += 1
+    store.set("d", "d")
+
+    assert store.stats()["disk_entries"] == 3
+    assert store.stats()["evictions"] == 1
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    make_cache(tmp_path).set("k", "value")
+
+    assert make_cache(tmp_path).get("k").value == "value"
+
+
+def test_zero_ttl_disables_the_cache(tmp_path):
+    store = make_cache(tmp_path, ttl_seconds=0)
+    store.set("k", "value")
+
+    assert store.get("k") is None
+    assert store.stats()["disk_entries"] == 0
+
+
+def test_scraper_serves_repeats_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCRAPE_CACHE_PATH", str(tmp_path / "scrape_cache.sqlite3"))
+    from fakes import Latency, make_fake_scraper
+
+    scraper = make_fake_scraper(Latency(), page_chars=500)
+    fetched = []
+    fetch = scraper._fetch
+    scraper._fetch = lambda url: fetched.append(url) or fetch(url)
+
+    async def scenario():
+        first = await scraper.scrape_url_async("https://Example.com/reviews/?utm_source=ad")
+        again = await scraper.scrape_url_async("https://example.com/reviews")
+        refreshed = await scraper.scrape_url_async("https://example.com/reviews", force_refresh=True)
+        return first, again, refreshed
+
+    first, again, refreshed = asyncio.run(scenario())
+    assert again == first
+    assert refreshed
+    assert fetched == ["https://Example.com/reviews/?utm_source=ad", "https://example.com/reviews"]
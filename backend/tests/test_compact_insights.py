@@ -0,0 +1,55 @@
+import asyncio
+
+import compact_insights
+
+
+def legacy_insight(competitor_id: str, title: str, description: str = "Tiers are hard to compare") -> dict:
+    """An insights row saved before fingerprinting: no fingerprint or SimHash"""
+    return {
+        "competitor_id": competitor_id,
+        "weakness_title": title,
+        "weakness_description": description,
+        "severity": "medium",
+        "category": "pricing",
+    }
+
+
+def test_compaction_merges_duplicates_into_the_oldest_row(supabase, monkeypatch):
+    monkeypatch.setattr(compact_insights, "db_manager", supabase)
+    client = supabase.supabase
+
+    async def scenario():
+        competitor = await supabase.create_competitor("Acme", "https://acme.example")
+        with client.lock:
+            client.write("insights", [
+                legacy_insight(competitor.id, "Confusing pricing"),
+                legacy_insight(competitor.id, "Pricing is confusing", "Tiers are hard to compare across plans"),
+                legacy_insight(competitor.id, "Slow support", "Tickets wait for days"),
+            ], [])
+        counts = await compact_insights.compact_competitor(competitor.id, dry_run=False)
+        return counts, await supabase.get_insight_records(competitor.id), await supabase.get_insight_rollups(competitor.id)
+
+    counts, records, rollups = asyncio.run(scenario())
+    assert counts == {"scanned": 3, "removed": 1, "updated": 2}
+    by_title = {record.weakness_title: record for record in records}
+    assert set(by_title) == {"Confusing pricing", "Slow support"}
+    assert by_title["Confusing pricing"].occurrences == 2
+    assert by_title["Confusing pricing"].fingerprint
+    assert rollups == [{"severity": "medium", "category": "pricing", "insight_count": 2, "occurrence_count": 3}]
+
+
+def test_dry_run_changes_nothing(supabase, monkeypatch):
+    monkeypatch.setattr(compact_insights, "db_manager", supabase)
+    client = supabase.supabase
+
+    async def scenario():
+        competitor = await supabase.create_competitor("Acme", "https://acme.example")
+        with client.lock:
+            client.write("insights", [legacy_insight(competitor.id, "Confusing pricing")] * 2, [])
+        counts = await compact_insights.compact_competitor(competitor.id, dry_run=True)
+        return counts, await supabase.get_insight_records(competitor.id)
+
+    counts, records = asyncio.run(scenario())
+    assert counts["removed"] == 1
+    assert len(records) == 2
+    assert all(record.fingerprint is None for record in records)
@@ -0,0 +1,49 @@
+from compaction import CompactionStats, compact_markdown
+
+
+def test_compaction_strips_markup_and_boilerplate_but_keeps_review_text():
+    content = (
+        "- [Home](https://example.com)\n- [Pricing](https://example.com/pricing)\n\n"
+        "We use cookies to improve your experience. Accept all cookies\n\n"
+        "## Review by **Dana**\n\n"
+        "![avatar](https://cdn.example/a.png) The [export](https://example.com/export) feature fails on large files.\n"
+        "Was this review helpful?\n"
+        "Helpful (12)\n\n"
+        "Rated 2 out of 5 stars\n\n"
+        "© 2026 Example Inc."
+    )
+
+    result = compact_markdown(content)
+
+    assert result.text == "## Review by Dana\n\nThe export feature fails on large files."
+    assert result.chars_before == len(content)
+    assert result.chars_after == len(result.text)
+
+
+def test_compaction_keeps_the_longer_of_two_near_duplicate_paragraphs():
+    snippet = "Support took five days to answer and the mobile app crashes on login every time"
+    full = snippet + " after the latest update, which made us switch vendors"
+
+    result = compact_markdown(f"{snippet}\n\n{full}\n\n{full}")
+
+    assert result.text == full
+
+
+def test_compaction_cuts_at_a_paragraph_boundary_to_fit_the_budget():
+    paragraphs = [f"Review {index}: the dashboard is slow to load." for index in range(20)]
+
+    result = compact_markdown("\n\n".join(paragraphs), token_budget=30)
+
+    assert len(result.text) <= 30 * 4
+    assert result.text.split("\n\n") == paragraphs[:len(result.text.split("\n\n"))]
+    assert result.tokens_after <= 30 < result.tokens_before
+
+
+def test_compaction_stats_report_the_reduction():
+    stats = CompactionStats()
+    stats.record(compact_markdown("Useful review text.\n\nHelpful (3)"))
+
+    snapshot = stats.snapshot()
+    assert snapshot["analyses"] == 1
+    assert snapshot["chars_after"] == len("Useful review text.")
+    assert 0 < snapshot["reduction"] < 1
@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from crawler import sitemap_urls
+
+# A public address literal, so the host check needs no DNS lookup
+HOST = "http://93.184.216.34"
+
+
+def urlset(*urls: str) -> bytes:
+    entries = "".join(f"<url><loc>{url}</loc></url>" for url in urls)
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode()
+
+
+def serve(routes: dict, requested: list = None) -> httpx.MockTransport:
+    """Transport answering each path from routes: bytes for a 200, or a (status, location) redirect"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if requested is not None:
+            requested.append(str(request.url))
+        route = routes[request.url.path]
+        if isinstance(route, tuple):
+            return httpx.Response(route[0], headers={"location": route[1]})
+        # A stream, as from the network: content= would arrive already read
+        return httpx.Response(200, stream=httpx.ByteStream(route))
+
+    return httpx.MockTransport(handler)
+
+
+def test_sitemap_indexes_and_gzipped_sitemaps_are_followed():
+    index = f'<sitemapindex><sitemap><loc>{HOST}/pages.xml.gz</loc></sitemap></sitemapindex>'.encode()
+    transport = serve({
+        "/sitemap.xml": index,
+        "/pages.xml.gz": gzip.compress(urlset(f"{HOST}/a", f"{HOST}/b", f"{HOST}/c")),
+    })
+
+    assert asyncio.run(sitemap_urls(f"{HOST}/sitemap.xml", 2, transport=transport)) == [f"{HOST}/a", f"{HOST}/b"]
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/sitemap.xml",
+    "http://localhost/sitemap.xml",
+    "http://10.0.0.5/sitemap.xml",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/sitemap.xml",
+    "file:///etc/passwd",
+])
+def test_sitemaps_on_non_public_hosts_are_never_requested(url):
+    requested = []
+
+    with pytest.raises(ValueError):
+        asyncio.run(sitemap_urls(url, 10, transport=serve({}, requested)))
+    assert requested == []
+
+
+def test_a_redirect_to_a_private_address_is_rejected():
+    requested = []
+    transport = serve({"/sitemap.xml": (302, "http://169.254.169.254/latest/meta-data")}, requested)
+
+    with pytest.raises(ValueError, match="non-public"):
+        asyncio.run(sitemap_urls(f"{HOST}/sitemap.xml", 10, transport=transport))
+    assert requested == [f"{HOST}/sitemap.xml"]
+
+
+def test_a_nested_sitemap_on_a_private_address_is_rejected():
+    index = b'<sitemapindex><sitemap><loc>http://192.168.1.1/pages.xml</loc></sitemap></sitemapindex>'
+
+    with pytest.raises(ValueError, match="non-public"):
+        asyncio.run(sitemap_urls(f"{HOST}/sitemap.xml", 10, transport=serve({"/sitemap.xml": index})))
+
+
+def test_an_oversized_sitemap_is_rejected(monkeypatch):
+    monkeypatch.setenv("CRAWL_SITEMAP_MAX_BYTES", "1000")
+    body = urlset(*(f"{HOST}/page-{index}" for index in range(100)))
+
+    with pytest.raises(ValueError, match="larger than 1000 bytes"):
+        asyncio.run(sitemap_urls(f"{HOST}/sitemap.xml", 10, transport=serve({"/sitemap.xml": body})))
+
+
+def test_a_gzip_bomb_is_rejected_without_inflating_it(monkeypatch):
+    monkeypatch.setenv("CRAWL_SITEMAP_MAX_BYTES", str(1024 * 1024))
+    # Well under the limit compressed, 64 MB inflated
+    bomb = gzip.compress(b"\0" * (64 * 1024 * 1024))
+    assert len(bomb) < 1024 * 1024
+
+    with pytest.raises(ValueError, match="uncompressed"):
+        asyncio.run(sitemap_urls(f"{HOST}/sitemap.xml.gz", 10, transport=serve({"/sitemap.xml.gz": bomb})))
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from executor import StageExecutor
+
+
+def test_runs_blocking_calls_off_the_event_loop():
+    stage = StageExecutor("test", 2)
+    loop_thread = threading.get_ident()
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        thread = await stage.run(lambda: (time.sleep(0.2), threading.get_ident())[1])
+        ticker.cancel()
+        return thread, ticks
+
+    try:
+        thread, ticks = asyncio.run(scenario())
+    finally:
+        stage.shutdown()
+    assert thread != loop_thread
+    # The loop kept running while the call blocked its worker thread
+    assert ticks >= 5
+
+
+def test_limits_concurrency_per_stage():
+    stage = StageExecutor("test", 2)
+    running = peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    async def scenario():
+        await asyncio.gather(*(stage.run(work) for _ in range(6)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stage.shutdown()
+    assert peak == 2
+    assert stage.stats() == {"max_concurrency": 2, "pending": 0, "completed": 6}
+
+
+def test_passes_arguments_and_errors_through():
+    stage = StageExecutor("test", 1)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        assert await stage.run(lambda a, b=0: a + b, 2, b=3) == 5
+        with pytest.raises(RuntimeError, match="boom"):
+            await stage.run(fail)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stage.shutdown()
+
+
+def test_rejects_a_stage_without_workers():
+    with pytest.raises(ValueError):
+        StageExecutor("test", 0)
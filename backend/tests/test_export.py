@@ -0,0 +1,104 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from export import export_stream
+from models import ProductWeakness
+
+COLUMNS = ("id", "name")
+
+
+def pages(*pages):
+    """(first page, fetch) over the given row lists, with the cursor being the next page's index"""
+    def page(index):
+        cursor = str(index + 1) if index + 1 < len(pages) else None
+        return pages[index], cursor
+
+    async def fetch(cursor):
+        return page(int(cursor))
+
+    return page(0), fetch
+
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_ndjson_export_streams_every_page_in_order():
+    first, fetch = pages([{"id": 1, "name": "a", "extra": "dropped"}], [], [{"id": 2, "name": "b"}])
+
+    body = asyncio.run(collect(export_stream("test", first, fetch, COLUMNS, "ndjson")))
+
+    assert [json.loads(line) for line in body.decode().splitlines()] == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+
+def test_gzip_csv_export_decompresses_to_a_header_and_rows():
+    first, fetch = pages([{"id": 1, "name": "a, with comma"}], [{"id": 2, "name": None}])
+
+    body = asyncio.run(collect(export_stream("test", first, fetch, COLUMNS, "csv", gzip=True)))
+
+    assert list(csv.reader(io.StringIO(gzip.decompress(body).decode()))) == [["id", "name"], ["1", "a, with comma"], ["2", ""]]
+
+
+def test_a_failing_page_aborts_the_export():
+    async def scenario():
+        async def fetch(cursor):
+            raise RuntimeError("database went away")
+
+        received = []
+        with pytest.raises(RuntimeError, match="went away"):
+            async for chunk in export_stream("test", ([{"id": 1, "name": "a"}], "next"), fetch, COLUMNS, "ndjson"):
+                received.append(chunk)
+        return received
+
+    # The rows before the failure were sent; no end marker pretends the export is complete
+    assert asyncio.run(scenario()) == [b'{"id": 1, "name": "a"}\n']
+
+
+def seed_insights(repository, count: int):
+    async def seed():
+        competitor = await repository.create_competitor("Acme", "https://acme.example")
+        await repository.save_insights(competitor.id, [
+            ProductWeakness(title=title, description="Details", severity="low", category="other")
+            for title in ["Slow support", "Confusing pricing", "Export fails", "Missing SSO", "Weak API"][:count]
+        ])
+
+    asyncio.run(seed())
+
+
+def test_insight_export_pages_through_every_row(api, client, monkeypatch):
+    monkeypatch.setattr(api, "EXPORT_PAGE_SIZE", 2)
+    seed_insights(api.db_manager, 5)
+
+    response = client.get("/export/insights")
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len({row["id"] for row in rows}) == 5
+    assert {row["competitor_name"] for row in rows} == {"Acme"}
+    assert [row["last_seen_at"] for row in rows] == sorted(row["last_seen_at"] for row in rows)
+
+
+def test_export_since_skips_older_rows(api, client):
+    seed_insights(api.db_manager, 2)
+
+    response = client.get("/export/competitors", params={"format": "csv", "since": "2999-01-01T00:00:00"})
+
+    assert response.text.splitlines() == [",".join(("id", "name", "target_url", "created_at", "updated_at"))]
+
+
+def test_supabase_export_pages_past_the_response_cap(supabase):
+    seed_insights(supabase, 5)
+
+    async def export():
+        rows, cursor = await supabase.export_insights(None, 3)
+        while cursor:
+            page, cursor = await supabase.export_insights(None, 3, cursor)
+            rows += page
+        return rows
+
+    assert len({row["id"] for row in asyncio.run(export())}) == 5
@@ -0,0 +1,66 @@
+import asyncio
+
+from fakes import FakeGenerativeModel, FakeSupabaseClient, Latency, generate_page
+from load_test import percentile
+
+
+def test_generated_pages_are_deterministic_per_url():
+    page = generate_page("https://reviews.example/a", 2000)
+
+    assert page == generate_page("https://reviews.example/a", 2000)
+    assert page != generate_page("https://reviews.example/b", 2000)
+    assert "(https://reviews.example/a/1)" in page
+
+
+def test_streamed_answer_matches_the_plain_one():
+    model = FakeGenerativeModel("gemini-2.5-flash", Latency(), chunk_chars=16)
+
+    chunks = list(model.generate_content("prompt", stream=True))
+
+    assert "".join(chunk.text for chunk in chunks) == model.generate_content("prompt").text
+    assert chunks[-1].usage_metadata is not None
+    assert all(chunk.usage_metadata is None for chunk in chunks[:-1])
+
+
+def test_fake_query_filters_orders_pages_and_counts():
+    client = FakeSupabaseClient()
+    client.seed(competitors=5, insights_per_competitor=0)
+
+    result = (
+        client.table("competitors").select("name", count="exact")
+        .neq("name", "Seeded Competitor 0").order("name", desc=True).range(1, 2).execute()
+    )
+
+    assert result.data == [{"name": "Seeded Competitor 3"}, {"name": "Seeded Competitor 2"}]
+    assert result.count == 4
+
+
+def test_deleting_a_competitor_cascades_to_its_insights_and_rollups():
+    client = FakeSupabaseClient()
+    client.seed(competitors=2, insights_per_competitor=3)
+    doomed = client.tables["competitors"][0]["id"]
+
+    client.table("competitors").delete().eq("id", doomed).execute()
+
+    assert {row["competitor_id"] for row in client.tables["insights"]} == {client.tables["competitors"][0]["id"]}
+    assert client.tables["insight_rollup_totals"] == [{"severity": "medium", "category": "feature", "insight_count": 3, "occurrence_count": 3}]
+
+
+def test_api_runs_end_to_end_against_the_supabase_stand_in(api, client, supabase, monkeypatch):
+    from insight_writer import InsightWriter
+
+    monkeypatch.setattr(api, "db_manager", supabase)
+    monkeypatch.setattr(api, "insight_writer", InsightWriter(supabase.save_insights_batch))
+
+    assert client.post("/analyze", json={"target_url": "https://reviews.example/acme", "competitor_name": "Acme"}).status_code == 200
+    listed = client.get("/competitors").json()["competitors"]
+    assert [(row["name"], row["analyses_count"] > 0) for row in listed] == [("Acme", True)]
+    assert asyncio.run(supabase.table_counts())["competitors"] == 1
+
+
+def test_percentile_uses_the_nearest_rank():
+    ordered = [float(value) for value in range(1, 101)]
+
+    assert percentile(ordered, 0.5) == 50.0
+    assert percentile(ordered, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
@@ -0,0 +1,47 @@
+from fingerprints import FingerprintIndex, hamming_distance, insight_fingerprint, insight_simhash
+from models import ProductWeakness
+from repository import plan_insight_rows
+
+
+def weakness(title: str, description: str = "Details", severity: str = "medium", category: str = "feature") -> ProductWeakness:
+    return ProductWeakness(title=title, description=description, severity=severity, category=category)
+
+
+def test_fingerprint_ignores_word_order_case_and_stopwords():
+    assert insight_fingerprint(weakness("Confusing pricing")) == insight_fingerprint(weakness("Pricing is confusing!"))
+    assert insight_fingerprint(weakness("Confusing pricing")) != insight_fingerprint(weakness("Slow support"))
+
+
+def test_simhash_of_a_rewording_is_closer_than_an_unrelated_text():
+    original = weakness("Slow support", "Support tickets take days to get a first response from the team")
+    reworded = weakness("Support is slow", "Support tickets take several days to get a first response from the team")
+    unrelated = weakness("Mobile app crashes", "The iOS app crashes on login after the latest update")
+
+    assert hamming_distance(insight_simhash(original), insight_simhash(reworded)) <= 8
+    assert hamming_distance(insight_simhash(original), insight_simhash(unrelated)) > 8
+    # Stored as a signed 64-bit value
+    assert -(1 << 63) <= insight_simhash(unrelated) < 1 << 63
+
+
+def test_index_maps_near_duplicates_onto_the_known_fingerprint():
+    index = FingerprintIndex([("known", 0b1111)], max_distance=2)
+
+    assert index.canonical("known", 0) == "known"
+    assert index.canonical("new", 0b1101) == "known"
+    assert index.canonical("other", -1) == "other"
+    # Remembered, so a later near duplicate maps onto it
+    assert index.canonical("again", -2) == "other"
+
+
+def test_plan_counts_a_weakness_once_per_analysis():
+    batch = [
+        ("c1", [weakness("Confusing pricing"), weakness("Pricing is confusing")]),
+        ("c1", [weakness("Confusing pricing", description="Seen again")]),
+        ("c2", [weakness("Confusing pricing")]),
+    ]
+
+    rows = plan_insight_rows(batch, known={})
+
+    assert sorted((row["competitor_id"], row["occurrences"]) for row in rows) == [("c1", 2), ("c2", 1)]
+    # The first wording in the batch is the one stored
+    assert rows[0]["weakness_title"] == "Confusing pricing"
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from insight_writer import InsightWriter
+from models import ProductWeakness
+
+
+def weaknesses(*titles: str):
+    return [ProductWeakness(title=title, description="Details", severity="medium", category="feature") for title in titles]
+
+
+def test_concurrent_saves_share_one_write():
+    batches = []
+
+    async def save_batch(batch):
+        batches.append(batch)
+
+    async def scenario():
+        writer = InsightWriter(save_batch, interval=0.05, write_behind=False)
+        await writer.start()
+        try:
+            await asyncio.gather(*(writer.save(f"c{index}", weaknesses(f"Weakness {index}")) for index in range(5)))
+        finally:
+            await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert len(batches) == 1
+    assert sorted(competitor_id for competitor_id, _ in batches[0]) == ["c0", "c1", "c2", "c3", "c4"]
+    assert stats["rows_written"] == 5
+
+
+def test_write_behind_returns_before_the_write_and_stop_flushes():
+    batches = []
+
+    async def save_batch(batch):
+        batches.append(batch)
+
+    async def scenario():
+        writer = InsightWriter(save_batch, interval=60, write_behind=True)
+        await writer.start()
+        await writer.save("c1", weaknesses("Slow support"))
+        written_before_stop = len(batches)
+        await writer.stop()
+        return written_before_stop
+
+    assert asyncio.run(scenario()) == 0
+    assert len(batches) == 1
+
+
+def test_waiting_save_raises_when_its_write_fails_but_others_are_stored():
+    stored = []
+
+    async def save_batch(batch):
+        if any(competitor_id == "bad" for competitor_id, _ in batch):
+            raise RuntimeError("write failed")
+        stored.extend(competitor_id for competitor_id, _ in batch)
+
+    async def scenario():
+        writer = InsightWriter(save_batch, interval=0.05, write_behind=True)
+        await writer.start()
+        try:
+            good = asyncio.ensure_future(writer.save("good", weaknesses("Slow support"), wait=True))
+            with pytest.raises(RuntimeError, match="write failed"):
+                await writer.save("bad", weaknesses("Confusing pricing"), wait=True)
+            await good
+        finally:
+            await writer.stop()
+        return writer.stats()
+
+    assert asyncio.run(scenario())["failures"] == 1
+    assert stored == ["good"]
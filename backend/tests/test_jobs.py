@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from jobs import JobQueue, JobStore, QueueFullError
+from models import AnalysisResponse, AnalyzeRequest
+
+
+def request(name: str = "Acme") -> AnalyzeRequest:
+    return AnalyzeRequest(target_url="https://reviews.example/acme", competitor_name=name)
+
+
+async def succeed(request: AnalyzeRequest) -> AnalysisResponse:
+    return AnalysisResponse(
+        competitor_name=request.competitor_name,
+        target_url=request.target_url,
+        weaknesses=[],
+        analyzed_at="2026-01-01T00:00:00Z",
+        raw_content_length=10,
+    )
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, status: str):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}")
+
+
+def test_submitted_job_runs_and_stores_its_result(tmp_path):
+    queue = JobQueue(handler=succeed, store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+
+    async def scenario():
+        await queue.start()
+        try:
+            job_id = await queue.submit(request())
+            return await wait_for_status(queue, job_id, "succeeded")
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job.result.competitor_name == "Acme"
+    assert job.error is None
+    assert queue.stats()["pending"] == 0
+
+
+def test_failed_job_records_the_error(tmp_path):
+    async def fail(request: AnalyzeRequest):
+        raise RuntimeError("scrape failed")
+
+    queue = JobQueue(handler=fail, store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+
+    async def scenario():
+        await queue.start()
+        try:
+            return await wait_for_status(queue, await queue.submit(request()), "failed")
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job.error == "scrape failed"
+    assert job.result is None
+
+
+def test_submit_refuses_jobs_beyond_the_limit(tmp_path):
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def block(request: AnalyzeRequest):
+            await gate.wait()
+            return await succeed(request)
+
+        queue = JobQueue(handler=block, store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=1, max_pending=2)
+        await queue.start()
+        try:
+            await queue.submit(request("a"))
+            await queue.submit(request("b"))
+            with pytest.raises(QueueFullError):
+                await queue.submit(request("c"))
+        finally:
+            gate.set()
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_interrupted_by_a_restart_are_queued_again(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    running = store.create(request("running"))
+    store.update(running, "running")
+    queued = store.create(request("queued"))
+    finished = store.create(request("finished"))
+    store.update(finished, "failed", None, "scrape failed")
+
+    assert JobStore(path).recover() == [running, queued]
+    assert JobStore(path).get(running).status == "queued"
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm import (
+    DailyQuota,
+    ModelRegistry,
+    ModelUnavailableError,
+    QuotaExhaustedError,
+    TokenBucket,
+    is_daily_quota_error,
+    is_rate_limit_error,
+)
+
+MODELS = [
+    {"id": "primary", "rpm": 2, "rpd": 3},
+    {"id": "secondary", "rpm": 0, "rpd": 0},
+]
+
+
+def make_registry(factory=lambda model_id: object(), max_wait: float = 0.0) -> ModelRegistry:
+    registry = ModelRegistry("primary", MODELS)
+    registry.model_factory = factory
+    registry.max_wait = max_wait
+    return registry
+
+
+def test_token_bucket_refills_over_its_period(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(2, 60.0)
+
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.seconds_until_available() == pytest.approx(30.0)
+    now[0] += 30.0
+    assert bucket.try_acquire()
+
+
+def test_daily_quota_counts_and_releases():
+    quota = DailyQuota(2)
+    quota.consume()
+    quota.consume()
+
+    assert not quota.available()
+    quota.release()
+    assert quota.remaining() == 1
+    quota.mark_exhausted()
+    assert quota.remaining() == 0
+
+
+def test_acquire_prefers_the_requested_model_and_falls_back_when_it_is_spent():
+    registry = make_registry()
+
+    async def scenario():
+        used = [(await registry.acquire())[0] for _ in range(3)]
+        return used
+
+    # primary allows two requests a minute; the third goes to the next model with quota
+    assert asyncio.run(scenario()) == ["primary", "primary", "secondary"]
+    assert registry.stats()["fallbacks"] == 1
+    assert registry.remaining("primary") == {"remaining_this_minute": 0, "remaining_today": 1}
+
+
+def test_a_429_moves_requests_to_another_model():
+    registry = make_registry()
+    registry.report_rate_limited("primary")
+
+    assert asyncio.run(registry.acquire("primary"))[0] == "secondary"
+
+
+def test_acquire_raises_when_every_model_is_out_of_daily_quota():
+    registry = make_registry()
+    registry.report_rate_limited("primary", daily=True)
+    registry.report_rate_limited("secondary", daily=True)
+
+    with pytest.raises(QuotaExhaustedError, match="Daily request quota"):
+        asyncio.run(registry.acquire())
+
+
+def test_acquire_raises_when_no_model_can_be_created():
+    def broken(model_id):
+        raise RuntimeError("SDK missing")
+
+    with pytest.raises(ModelUnavailableError):
+        asyncio.run(make_registry(factory=broken).acquire())
+
+
+def test_creating_a_model_does_not_block_the_event_loop():
+    def slow_factory(model_id):
+        time.sleep(0.3)
+        return object()
+
+    registry = make_registry(factory=slow_factory)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        model_id, _ = await registry.acquire()
+        ticker.cancel()
+        return model_id, ticks
+
+    model_id, ticks = asyncio.run(scenario())
+    assert model_id == "primary"
+    assert ticks >= 10
+
+
+def test_quota_reports_do_not_wait_for_a_model_being_created():
+    created = threading.Event()
+    release = threading.Event()
+
+    def slow_factory(model_id):
+        created.set()
+        release.wait(5)
+        return object()
+
+    registry = make_registry(factory=slow_factory)
+    warm = threading.Thread(target=registry.warm)
+    warm.start()
+    try:
+        assert created.wait(5)
+        started = time.perf_counter()
+        registry.stats()
+        registry.remaining("primary")
+        assert time.perf_counter() - started < 0.1
+    finally:
+        release.set()
+        warm.join()
+    # The warmed instance is the one handed out afterwards
+    assert registry.get("primary") is registry.get("primary")
+
+
+def test_rate_limit_error_detection():
+    class ResourceExhausted(Exception):
+        pass
+
+    assert is_rate_limit_error(ResourceExhausted("quota"))
+    assert is_rate_limit_error(Exception("429 Too Many Requests"))
+    assert not is_rate_limit_error(Exception("500 Internal"))
+    assert is_daily_quota_error(Exception("429 GenerateRequestsPerDayPerProjectPerModel"))
+    assert not is_daily_quota_error(Exception("429 GenerateRequestsPerMinutePerProjectPerModel"))
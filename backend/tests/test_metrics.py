@@ -0,0 +1,53 @@
+import pytest
+
+from metrics import Registry
+
+
+def test_counter_and_histogram_render_in_the_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ["outcome"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(outcome="ok")
+    requests.inc(2, outcome='say "hi"')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{outcome="ok"} 1',
+        'requests_total{outcome="say \\"hi\\""} 2',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_labels_must_match_the_declared_names():
+    counter = Registry().counter("requests_total", "Requests", ["outcome"])
+
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc(status="ok")
+
+
+def test_metric_names_are_unique():
+    registry = Registry()
+    registry.counter("requests_total", "Requests")
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.gauge("requests_total", "Requests")
+
+
+def test_metrics_endpoint_reports_stage_latency_after_an_analysis(client):
+    client.post("/analyze", json={"target_url": "https://reviews.example/acme", "competitor_name": "Acme"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'competitor_analysis_stage_seconds_count{stage="llm"}' in response.text
+    assert 'competitor_analysis_analysis_seconds_count{outcome="ok"}' in response.text
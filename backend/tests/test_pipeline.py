@@ -0,0 +1,74 @@
+import asyncio
+from typing import List
+
+from fastapi import HTTPException
+
+from models import AnalysisResponse, AnalyzeRequest, ProductWeakness
+from pipeline import BatchPipeline
+
+
+def request(index: int) -> AnalyzeRequest:
+    return AnalyzeRequest(target_url=f"https://reviews.example/{index}", competitor_name=f"Competitor {index}")
+
+
+def build_result(request: AnalyzeRequest, weaknesses: List[ProductWeakness], content: str) -> AnalysisResponse:
+    return AnalysisResponse(
+        competitor_name=request.competitor_name,
+        target_url=request.target_url,
+        weaknesses=weaknesses,
+        analyzed_at="2026-01-01T00:00:00Z",
+        raw_content_length=len(content),
+    )
+
+
+def make_pipeline(persisted: list, failing_scrapes=(), failing_writes=(), **kwargs) -> BatchPipeline:
+    async def scrape(request: AnalyzeRequest) -> str:
+        if request.target_url in failing_scrapes:
+            raise HTTPException(status_code=400, detail="Failed to scrape content from the provided URL")
+        await asyncio.sleep(0.01)
+        return f"content of {request.target_url}"
+
+    async def analyze(request: AnalyzeRequest, content: str) -> List[ProductWeakness]:
+        return [ProductWeakness(title=f"Weakness of {request.competitor_name}", description=content, severity="low", category="other")]
+
+    async def persist_many(items) -> None:
+        if any(request.target_url in failing_writes for request, _, _ in items):
+            raise RuntimeError("write failed")
+        persisted.append([request.competitor_name for request, _, _ in items])
+
+    options = {"scrape_concurrency": 4, "llm_concurrency": 2, "write_batch_size": 10, "write_interval": 0.05, **kwargs}
+    return BatchPipeline(scrape=scrape, analyze=analyze, persist_many=persist_many, build_result=build_result, **options)
+
+
+async def collect(pipeline: BatchPipeline, requests: List[AnalyzeRequest]):
+    return [item async for item in pipeline.run(requests)]
+
+
+def test_every_item_gets_one_result_and_writes_are_grouped():
+    persisted: list = []
+    requests = [request(index) for index in range(6)]
+
+    results = asyncio.run(collect(make_pipeline(persisted), requests))
+
+    assert sorted(item.index for item in results) == list(range(6))
+    assert all(item.status == "ok" for item in results)
+    assert results[0].result.weaknesses[0].title.startswith("Weakness of Competitor")
+    # Six items arrive within one write interval, so they share far fewer than six writes
+    assert sum(len(group) for group in persisted) == 6
+    assert len(persisted) < 6
+
+
+def test_a_failing_item_does_not_abort_the_batch():
+    persisted: list = []
+    requests = [request(index) for index in range(4)]
+    pipeline = make_pipeline(persisted, failing_scrapes={requests[1].target_url}, failing_writes={requests[2].target_url})
+
+    results = {item.index: item for item in asyncio.run(collect(pipeline, requests))}
+
+    assert results[1].status == "error"
+    assert results[1].error == "Failed to scrape content from the provided URL"
+    assert results[2].status == "error"
+    assert results[2].error == "write failed"
+    assert results[0].status == results[3].status == "ok"
+    # The group holding the bad write was retried item by item
+    assert sorted(name for group in persisted for name in group) == ["Competitor 0", "Competitor 3"]
@@ -0,0 +1,17 @@
+import pytest
+
+from repository import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor("2026-01-01T00:00:00+00:00", "3f1c")
+
+    assert decode_cursor(cursor) == ("2026-01-01T00:00:00+00:00", "3f1c")
+    # Safe to pass in a query string as is
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30=", encode_cursor("a", "b")[:-4], "W10="])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
@@ -0,0 +1,102 @@
+import asyncio
+
+from scheduler import RefreshScheduler
+
+
+async def seed(repository, count: int, age: float = 0.05):
+    competitors = [await repository.create_competitor(f"Competitor {index}", f"https://c{index}.example") for index in range(count)]
+    # Older than the interval by the time the scheduler looks
+    await asyncio.sleep(age)
+    return competitors
+
+
+async def run_until(scheduler: RefreshScheduler, done, timeout: float = 5.0) -> None:
+    await scheduler.start()
+    try:
+        for _ in range(int(timeout / 0.01)):
+            if done():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"scheduler never got there: {scheduler.stats()}")
+    finally:
+        await scheduler.stop()
+
+
+def test_each_due_competitor_is_refreshed_once_per_interval(repository):
+    refreshed = []
+
+    async def refresh(competitor):
+        refreshed.append(competitor.name)
+        return "analyzed" if competitor.name != "Competitor 2" else "unchanged"
+
+    async def scenario():
+        await seed(repository, 3, age=0.35)
+        # Starts are spaced 0.1s apart, so the last one begins well before the first is due again
+        scheduler = RefreshScheduler(repository, refresh, interval=0.3, jitter=0, concurrency=2, daily_budget=10, poll_interval=0.01)
+        await run_until(scheduler, lambda: len(refreshed) >= 3)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert sorted(refreshed) == ["Competitor 0", "Competitor 1", "Competitor 2"]
+    assert stats["outcomes"] == {"analyzed": 2, "unchanged": 1}
+    # The unchanged page gave its budget reservation back
+    assert stats["budget_remaining_today"] == 8
+
+
+def test_refreshes_pause_when_the_daily_budget_is_spent(repository):
+    refreshed = []
+
+    async def refresh(competitor):
+        refreshed.append(competitor.name)
+        return "analyzed"
+
+    async def scenario():
+        await seed(repository, 3)
+        scheduler = RefreshScheduler(repository, refresh, interval=0.01, jitter=0, daily_budget=1, poll_interval=0.01)
+        await run_until(scheduler, lambda: scheduler.stats()["paused"] is not None)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert len(refreshed) == 1
+    assert stats["paused"] == "daily budget spent"
+
+
+def test_nothing_starts_while_the_model_quota_is_reserved(repository):
+    async def refresh(competitor):
+        raise AssertionError("should not run")
+
+    async def scenario():
+        await seed(repository, 1)
+        scheduler = RefreshScheduler(repository, refresh, has_quota=lambda: False, interval=0.01, jitter=0, poll_interval=0.01)
+        await run_until(scheduler, lambda: scheduler.stats()["paused"] is not None)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["paused"] == "model quota reserved for interactive requests"
+    assert stats["outcomes"] == {}
+
+
+def test_the_interactive_reserve_stops_refreshes_against_the_model_quota(api, monkeypatch):
+    from fakes import FakeGenerativeModel, Latency
+    from llm import DEFAULT_MODEL_ID, SUPPORTED_MODELS, ModelRegistry
+
+    # One default-model request above the reserve: the first refresh spends it
+    monkeypatch.setenv("DEFAULT_MODEL_RPD", "21")
+    monkeypatch.setenv("REFRESH_MODEL_RESERVE", "20")
+    registry = ModelRegistry(DEFAULT_MODEL_ID, SUPPORTED_MODELS)
+    registry.model_factory = lambda model_id: FakeGenerativeModel(model_id, Latency())
+    monkeypatch.setattr(api, "model_registry", registry)
+
+    async def scenario():
+        await seed(api.db_manager, 3)
+        scheduler = RefreshScheduler(
+            api.db_manager, api.refresh_competitor, has_quota=api.refresh_quota_left,
+            interval=0.01, jitter=0, concurrency=1, daily_budget=10, poll_interval=0.01,
+        )
+        await run_until(scheduler, lambda: scheduler.stats()["paused"] is not None)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["paused"] == "model quota reserved for interactive requests"
+    assert stats["outcomes"] == {"analyzed": 1}
+    assert registry.remaining(DEFAULT_MODEL_ID)["remaining_today"] == 20
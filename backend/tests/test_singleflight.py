@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("key", work) for _ in range(5)), flights.run("other", work))
+        # Finished work is forgotten, so the next call runs again
+        await flights.run("key", work)
+        return results
+
+    assert asyncio.run(scenario()) == ["result"] * 6
+    assert len(runs) == 3
+    assert flights.stats() == {"in_flight": 0, "leaders": 3, "coalesced": 4}
+
+
+def test_every_waiter_gets_the_exception():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("scrape failed")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [str(error) for error in asyncio.run(scenario())] == ["scrape failed"] * 3
+
+
+def test_work_is_cancelled_only_when_its_last_waiter_goes_away():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.run("key", work))
+        second = asyncio.ensure_future(flights.run("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        still_running = not cancelled
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        await asyncio.sleep(0.01)
+        return still_running
+
+    assert asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flights.stats()["in_flight"] == 0
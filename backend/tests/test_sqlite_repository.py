@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from models import ProductWeakness
+from sqlite_repository import _fts_query
+
+
+def weakness(title: str, description: str = "Details", severity: str = "medium", category: str = "feature") -> ProductWeakness:
+    return ProductWeakness(title=title, description=description, severity=severity, category=category)
+
+
+def test_list_competitors_pages_newest_first_with_insight_counts(repository):
+    async def scenario():
+        competitors = [await repository.create_competitor(f"Competitor {index}", f"https://c{index}.example") for index in range(5)]
+        await repository.save_insights(competitors[0].id, [weakness("Slow support"), weakness("Confusing pricing")])
+
+        pages, cursor = [], None
+        while True:
+            rows, cursor = await repository.list_competitors(limit=2, cursor=cursor)
+            pages.append(rows)
+            if cursor is None:
+                return competitors, pages
+
+    competitors, pages = asyncio.run(scenario())
+    assert [len(rows) for rows in pages] == [2, 2, 1]
+    listed = [row for rows in pages for row in rows]
+    assert [row["name"] for row in listed] == [f"Competitor {index}" for index in reversed(range(5))]
+    counts = {row["name"]: row["analyses_count"] for row in listed}
+    assert counts["Competitor 0"] == 2
+    assert counts["Competitor 1"] == 0
+
+
+def test_create_competitor_upserts_on_the_name(repository):
+    async def scenario():
+        first = await repository.create_competitor("Acme", "https://old.example")
+        second = await repository.create_competitor("Acme", "https://new.example")
+        return first, second, await repository.table_counts()
+
+    first, second, counts = asyncio.run(scenario())
+    assert second.id == first.id
+    assert second.target_url == "https://new.example"
+    assert counts["competitors"] == 1
+
+
+def test_saving_a_rewording_bumps_the_stored_insight(repository):
+    async def scenario():
+        competitor = await repository.create_competitor("Acme", "https://acme.example")
+        await repository.save_insights(competitor.id, [weakness("Confusing pricing", "Tiers are hard to compare")])
+        await repository.save_insights(competitor.id, [weakness("Pricing is confusing", "Tiers are hard to compare across plans"), weakness("Slow support")])
+        return await repository.get_insight_records(competitor.id)
+
+    records = {record.weakness_title: record for record in asyncio.run(scenario())}
+    assert set(records) == {"Confusing pricing", "Slow support"}
+    assert records["Confusing pricing"].occurrences == 2
+    assert records["Confusing pricing"].weakness_description == "Tiers are hard to compare across plans"
+
+
+def test_merge_insights_deletes_duplicates_and_updates_the_keeper(repository):
+    async def scenario():
+        competitor = await repository.create_competitor("Acme", "https://acme.example")
+        keeper, duplicate = await repository.save_insights(competitor.id, [weakness("Slow support"), weakness("Mobile app crashes")])
+        await repository.merge_insights(keeper.id, [duplicate.id], {"fingerprint": duplicate.fingerprint, "occurrences": 5})
+        return duplicate, await repository.get_insight_records(competitor.id), await repository.get_insight_rollups()
+
+    duplicate, records, rollups = asyncio.run(scenario())
+    assert [(record.weakness_title, record.occurrences, record.fingerprint) for record in records] == [("Slow support", 5, duplicate.fingerprint)]
+    assert rollups == [{"severity": "medium", "category": "feature", "insight_count": 1, "occurrence_count": 5}]
+
+
+def test_rollup_triggers_follow_inserts_bumps_moves_and_deletes(repository):
+    async def scenario():
+        acme = await repository.create_competitor("Acme", "https://acme.example")
+        globex = await repository.create_competitor("Globex", "https://globex.example")
+        await repository.save_insights(acme.id, [weakness("Slow support"), weakness("Confusing pricing", category="pricing")])
+        await repository.save_insights(globex.id, [weakness("Slow support")])
+        # Reported again, now as high severity: the cell count moves and the occurrences follow
+        await repository.save_insights(acme.id, [weakness("Slow support", severity="high")])
+        before_delete = await repository.get_insight_rollups()
+        per_competitor = await repository.get_insight_rollups(per_competitor=True)
+        await repository.delete_competitor(globex.id)
+        return acme, before_delete, per_competitor, await repository.get_insight_rollups()
+
+    acme, before_delete, per_competitor, after_delete = asyncio.run(scenario())
+
+    def cells(rows):
+        return sorted((row["severity"], row["category"], row["insight_count"], row["occurrence_count"]) for row in rows)
+
+    assert cells(before_delete) == [("high", "feature", 1, 2), ("medium", "feature", 1, 1), ("medium", "pricing", 1, 1)]
+    assert cells(row for row in per_competitor if row["competitor_id"] == acme.id) == [("high", "feature", 1, 2), ("medium", "pricing", 1, 1)]
+    assert cells(after_delete) == [("high", "feature", 1, 2), ("medium", "pricing", 1, 1)]
+
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("pricing transparency", '("pricing" "transparency")'),
+    ('"slow support" -email', '("slow support" NOT "email")'),
+    ("export or import", '("export") OR ("import")'),
+    ('sso" OR NEAR(', '("sso""") OR ("NEAR(")'),
+    ("-only or pricing", '("pricing")'),
+])
+def test_fts_query_quotes_every_term(query, expected):
+    assert _fts_query(query) == expected
+
+
+@pytest.mark.parametrize("query", ["", "or", '""', "-excluded"])
+def test_fts_query_without_searchable_terms_raises(query):
+    with pytest.raises(ValueError, match="no searchable terms"):
+        _fts_query(query)
+
+
+def test_search_ranks_title_matches_first_and_pages_with_a_cursor(repository):
+    async def scenario():
+        acme = await repository.create_competitor("Acme", "https://acme.example")
+        await repository.save_insights(acme.id, [
+            weakness("Export fails", "Large files time out"),
+            weakness("Slow dashboard", "The export page is slow too"),
+            weakness("Confusing pricing", "Tiers are hard to compare"),
+        ])
+        first, cursor = await repository.search_insights("export", limit=1)
+        second, last_cursor = await repository.search_insights("export", limit=1, cursor=cursor)
+        excluded, _ = await repository.search_insights("export -slow")
+        return first, second, last_cursor, excluded
+
+    first, second, last_cursor, excluded = asyncio.run(scenario())
+    assert [row["weakness_title"] for row in first + second] == ["Export fails", "Slow dashboard"]
+    assert first[0]["competitor_name"] == "Acme"
+    assert last_cursor is None
+    assert [row["weakness_title"] for row in excluded] == ["Export fails"]
+
+
+def test_search_index_follows_updates_and_deletes(repository):
+    async def scenario():
+        acme = await repository.create_competitor("Acme", "https://acme.example")
+        await repository.save_insights(acme.id, [weakness("Slow support", "Tickets wait for days")])
+        await repository.save_insights(acme.id, [weakness("Slow support", "Nobody answers the phone")])
+        old, _ = await repository.search_insights("tickets")
+        new, _ = await repository.search_insights("phone")
+        await repository.delete_competitor(acme.id)
+        gone, _ = await repository.search_insights("support")
+        return old, new, gone
+
+    old, new, gone = asyncio.run(scenario())
+    assert old == []
+    assert [row["weakness_title"] for row in new] == ["Slow support"]
+    assert gone == []
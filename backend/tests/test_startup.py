@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def test_importing_the_api_loads_no_sdk():
+    # A fresh interpreter, since this test session has imported main already
+    code = (
+        "import sys, main; "
+        "print(sorted(name for name in ('google.generativeai', 'firecrawl', 'supabase', 'asyncpg') if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_ready_checks_the_database_and_keys(api, client, monkeypatch):
+    assert client.get("/ready").json() == {
+        "ready": True,
+        "backend": "sqlite",
+        "checks": {"scraper": "ok", "llm": "ok", "database": "ok"},
+    }
+
+    async def down():
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(api.db_manager, "ping", down)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"] == "error: connection refused"
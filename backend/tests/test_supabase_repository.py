@@ -0,0 +1,55 @@
+import asyncio
+
+from models import ProductWeakness
+
+
+def weakness(title: str, description: str = "Details", severity: str = "medium", category: str = "feature") -> ProductWeakness:
+    return ProductWeakness(title=title, description=description, severity=severity, category=category)
+
+
+TITLES = ["Slow support", "Confusing pricing", "Mobile app crashes", "Export fails", "Missing SSO", "No audit log", "Weak API"]
+
+
+def test_get_insights_reads_past_the_response_cap(supabase):
+    supabase.page_size = 3
+
+    async def scenario():
+        competitor = await supabase.create_competitor("Acme", "https://acme.example")
+        await supabase.save_insights(competitor.id, [weakness(title) for title in TITLES])
+        return await supabase.get_insights(competitor.id)
+
+    assert sorted(item.title for item in asyncio.run(scenario())) == sorted(TITLES)
+
+
+def test_snapshot_is_replaced_per_page(supabase):
+    async def scenario():
+        competitor = await supabase.create_competitor("Acme", "https://acme.example")
+        missing = await supabase.get_snapshot(competitor.id, "https://acme.example/reviews")
+        await supabase.save_snapshot(competitor.id, "https://acme.example/reviews", ["a", "b"])
+        await supabase.save_snapshot(competitor.id, "https://acme.example/reviews", ["c"])
+        return missing, await supabase.get_snapshot(competitor.id, "https://acme.example/reviews")
+
+    assert asyncio.run(scenario()) == (None, ["c"])
+
+
+def test_saving_again_bumps_insights_past_the_response_cap(supabase):
+    supabase.page_size = 3
+
+    async def scenario():
+        competitor = await supabase.create_competitor("Acme", "https://acme.example")
+        await supabase.save_insights(competitor.id, [weakness(title) for title in TITLES])
+        await supabase.save_insights(competitor.id, [weakness(title) for title in reversed(TITLES)])
+        return await supabase.get_insight_records(competitor.id)
+
+    records = asyncio.run(scenario())
+    assert len(records) == len(TITLES)
+    assert all(record.occurrences == 2 for record in records)
+
+
+def test_competitor_count_is_not_limited_by_the_response_cap(supabase):
+    async def scenario():
+        for index in range(5):
+            await supabase.create_competitor(f"Competitor {index}", f"https://c{index}.example")
+        return await supabase.count_competitors()
+
+    assert asyncio.run(scenario()) == 5
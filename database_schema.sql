@@ -18,18 +18,44 @@ CREATE TABLE IF NOT EXISTS insights (
     weakness_description TEXT NOT NULL,
     severity TEXT NOT NULL CHECK (severity IN ('high', 'medium', 'low')),
     category TEXT NOT NULL,
+    fingerprint TEXT,
+    simhash BIGINT,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Databases created before insight fingerprinting: add the columns, then run
+-- `python compact_insights.py` from backend/ to fingerprint and dedupe existing rows
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS simhash BIGINT;
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS occurrences INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Section-level snapshot of the last incrementally analyzed scrape of each competitor page.
+-- Incremental analyses diff a new scrape against it and only send changed sections to the model.
+CREATE TABLE IF NOT EXISTS content_snapshots (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    competitor_id UUID NOT NULL REFERENCES competitors(id) ON DELETE CASCADE,
+    target_url TEXT NOT NULL,
+    section_hashes JSONB NOT NULL,
+    captured_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (competitor_id, target_url)
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_competitors_name ON competitors(name);
 CREATE INDEX IF NOT EXISTS idx_insights_competitor_id ON insights(competitor_id);
 CREATE INDEX IF NOT EXISTS idx_insights_severity ON insights(severity);
 CREATE INDEX IF NOT EXISTS idx_insights_category ON insights(category);
+CREATE INDEX IF NOT EXISTS idx_competitors_created_at_id ON competitors(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_competitors_updated_at ON competitors(updated_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_insights_competitor_fingerprint ON insights(competitor_id, fingerprint);
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE competitors ENABLE ROW LEVEL SECURITY;
 ALTER TABLE insights ENABLE ROW LEVEL SECURITY;
+ALTER TABLE content_snapshots ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for authenticated access
 -- Note: Adjust these based on your authentication setup
@@ -39,6 +65,10 @@ CREATE POLICY "Allow all operations for authenticated users" ON competitors
 CREATE POLICY "Allow all operations for authenticated users" ON insights
     FOR ALL USING (auth.role() = 'authenticated');
 
+DROP POLICY IF EXISTS "Allow all operations for authenticated users" ON content_snapshots;
+CREATE POLICY "Allow all operations for authenticated users" ON content_snapshots
+    FOR ALL USING (auth.role() = 'authenticated');
+
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -53,7 +83,307 @@ CREATE TRIGGER update_competitors_updated_at
     BEFORE UPDATE ON competitors
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- List competitors with their insight counts in one round trip, newest first.
+-- Keyset pagination: pass the created_at/id of the last row of the previous page.
+CREATE OR REPLACE FUNCTION list_competitors(
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    name TEXT,
+    target_url TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    analyses_count BIGINT
+) AS $$
+    SELECT
+        c.id,
+        c.name,
+        c.target_url,
+        c.created_at,
+        (SELECT COUNT(*) FROM insights i WHERE i.competitor_id = c.id) AS analyses_count
+    FROM competitors c
+    WHERE p_cursor_created_at IS NULL
+       OR (c.created_at, c.id) < (p_cursor_created_at, p_cursor_id)
+    ORDER BY c.created_at DESC, c.id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+
+-- Save a batch of insights in one round trip. Rows are deduplicated by
+-- (competitor_id, fingerprint): a known insight gets its occurrences bumped,
+-- last_seen_at refreshed and the latest description, instead of a new row.
+-- Each (competitor_id, fingerprint) may appear at most once per call.
+CREATE OR REPLACE FUNCTION upsert_insights(p_rows JSONB)
+RETURNS SETOF insights AS $$
+    INSERT INTO insights AS i (
+        competitor_id, weakness_title, weakness_description, severity, category,
+        fingerprint, simhash, occurrences, last_seen_at
+    )
+    SELECT
+        r.competitor_id, r.weakness_title, r.weakness_description, r.severity, r.category,
+        r.fingerprint, r.simhash, r.occurrences, NOW()
+    FROM jsonb_to_recordset(p_rows) AS r(
+        competitor_id UUID,
+        weakness_title TEXT,
+        weakness_description TEXT,
+        severity TEXT,
+        category TEXT,
+        fingerprint TEXT,
+        simhash BIGINT,
+        occurrences INTEGER
+    )
+    ON CONFLICT (competitor_id, fingerprint) DO UPDATE SET
+        weakness_description = EXCLUDED.weakness_description,
+        severity = EXCLUDED.severity,
+        category = EXCLUDED.category,
+        simhash = EXCLUDED.simhash,
+        occurrences = i.occurrences + EXCLUDED.occurrences,
+        last_seen_at = EXCLUDED.last_seen_at
+    RETURNING i.*;
+$$ LANGUAGE sql VOLATILE;
+
+-- Fold duplicate insights into the row that absorbs them (compact_insights.py), in
+-- one transaction so a failure can't leave the duplicates gone but the keeper stale.
+-- Only the columns present in p_changes are updated.
+CREATE OR REPLACE FUNCTION merge_insights(p_keeper_id UUID, p_duplicate_ids UUID[], p_changes JSONB)
+RETURNS VOID AS $$
+    -- Delete first so the keeper can take a fingerprint a duplicate already holds
+    DELETE FROM insights WHERE id = ANY(p_duplicate_ids);
+    UPDATE insights SET
+        fingerprint = CASE WHEN p_changes ? 'fingerprint' THEN p_changes->>'fingerprint' ELSE fingerprint END,
+        simhash = CASE WHEN p_changes ? 'simhash' THEN (p_changes->>'simhash')::BIGINT ELSE simhash END,
+        weakness_description = CASE WHEN p_changes ? 'weakness_description' THEN p_changes->>'weakness_description' ELSE weakness_description END,
+        severity = CASE WHEN p_changes ? 'severity' THEN p_changes->>'severity' ELSE severity END,
+        category = CASE WHEN p_changes ? 'category' THEN p_changes->>'category' ELSE category END,
+        occurrences = CASE WHEN p_changes ? 'occurrences' THEN (p_changes->>'occurrences')::INTEGER ELSE occurrences END,
+        last_seen_at = CASE WHEN p_changes ? 'last_seen_at' THEN (p_changes->>'last_seen_at')::TIMESTAMPTZ ELSE last_seen_at END
+    WHERE id = p_keeper_id;
+$$ LANGUAGE sql VOLATILE;
+
+
+-- Insight counts per (competitor, severity, category) and across all competitors,
+-- kept current by a trigger on insights so GET /insights/stats never scans insights.
+-- insight_count counts rows; occurrence_count sums how often they were reported.
+CREATE TABLE IF NOT EXISTS insight_rollups (
+    competitor_id UUID NOT NULL,
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    insight_count BIGINT NOT NULL DEFAULT 0,
+    occurrence_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (competitor_id, severity, category)
+);
+
+CREATE TABLE IF NOT EXISTS insight_rollup_totals (
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    insight_count BIGINT NOT NULL DEFAULT 0,
+    occurrence_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (severity, category)
+);
+
+ALTER TABLE insight_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE insight_rollup_totals ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow all operations for authenticated users" ON insight_rollups;
+CREATE POLICY "Allow all operations for authenticated users" ON insight_rollups
+    FOR ALL USING (auth.role() = 'authenticated');
+
+DROP POLICY IF EXISTS "Allow all operations for authenticated users" ON insight_rollup_totals;
+CREATE POLICY "Allow all operations for authenticated users" ON insight_rollup_totals
+    FOR ALL USING (auth.role() = 'authenticated');
+
+-- Add a delta to one cell of both rollups; cells that drop to zero are removed.
+-- No foreign key to competitors: deleting a competitor cascades to its insights,
+-- whose delete triggers then empty (and remove) its rollup rows.
+CREATE OR REPLACE FUNCTION apply_insight_rollup_delta(
+    p_competitor_id UUID,
+    p_severity TEXT,
+    p_category TEXT,
+    p_insights INTEGER,
+    p_occurrences INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO insight_rollups AS r (competitor_id, severity, category, insight_count, occurrence_count)
+    VALUES (p_competitor_id, p_severity, p_category, p_insights, p_occurrences)
+    ON CONFLICT (competitor_id, severity, category) DO UPDATE SET
+        insight_count = r.insight_count + EXCLUDED.insight_count,
+        occurrence_count = r.occurrence_count + EXCLUDED.occurrence_count;
+
+    INSERT INTO insight_rollup_totals AS t (severity, category, insight_count, occurrence_count)
+    VALUES (p_severity, p_category, p_insights, p_occurrences)
+    ON CONFLICT (severity, category) DO UPDATE SET
+        insight_count = t.insight_count + EXCLUDED.insight_count,
+        occurrence_count = t.occurrence_count + EXCLUDED.occurrence_count;
+
+    IF p_insights < 0 THEN
+        DELETE FROM insight_rollups
+        WHERE competitor_id = p_competitor_id AND severity = p_severity AND category = p_category AND insight_count <= 0;
+        DELETE FROM insight_rollup_totals
+        WHERE severity = p_severity AND category = p_category AND insight_count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_insight_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.competitor_id = OLD.competitor_id AND NEW.severity = OLD.severity AND NEW.category = OLD.category THEN
+        -- The common upsert path: same cell, only occurrences changed
+        IF NEW.occurrences <> OLD.occurrences THEN
+            PERFORM apply_insight_rollup_delta(NEW.competitor_id, NEW.severity, NEW.category, 0, NEW.occurrences - OLD.occurrences);
+        END IF;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_insight_rollup_delta(OLD.competitor_id, OLD.severity, OLD.category, -1, -OLD.occurrences);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_insight_rollup_delta(NEW.competitor_id, NEW.severity, NEW.category, 1, NEW.occurrences);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS track_insight_rollups ON insights;
+CREATE TRIGGER track_insight_rollups
+    AFTER INSERT OR DELETE OR UPDATE OF competitor_id, severity, category, occurrences ON insights
+    FOR EACH ROW EXECUTE FUNCTION track_insight_rollups();
+
+-- Recount both rollups from insights in one grouped pass, with writes to insights
+-- held off meanwhile. Runs below for databases created before the rollups; call it
+-- again (SELECT rebuild_insight_rollups();) if they are ever suspected to drift.
+CREATE OR REPLACE FUNCTION rebuild_insight_rollups()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE insights IN SHARE MODE;
+    DELETE FROM insight_rollups;
+    DELETE FROM insight_rollup_totals;
+    INSERT INTO insight_rollups (competitor_id, severity, category, insight_count, occurrence_count)
+    SELECT competitor_id, severity, category, COUNT(*), SUM(occurrences)
+    FROM insights
+    GROUP BY competitor_id, severity, category;
+    INSERT INTO insight_rollup_totals (severity, category, insight_count, occurrence_count)
+    SELECT severity, category, SUM(insight_count), SUM(occurrence_count)
+    FROM insight_rollups
+    GROUP BY severity, category;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_insight_rollups() WHERE NOT EXISTS (SELECT 1 FROM insight_rollup_totals);
+
+
+-- Full-text search over insights (GET /insights/search). Titles weigh more than
+-- descriptions; the column is generated, so every write path keeps it current.
+-- Adding it to an existing database rewrites insights once.
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(weakness_title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(weakness_description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_insights_search_vector ON insights USING GIN (search_vector);
+
+-- Insights matching a web-search style query ("pricing transparency", sso -saml,
+-- export or import), best match first. The GIN index finds the matches; only
+-- those are ranked. Keyset pagination: pass the rank/id of the last row of the
+-- previous page.
+CREATE OR REPLACE FUNCTION search_insights(
+    p_query TEXT,
+    p_competitor_id UUID DEFAULT NULL,
+    p_severity TEXT DEFAULT NULL,
+    p_category TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_cursor_rank REAL DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    competitor_id UUID,
+    competitor_name TEXT,
+    weakness_title TEXT,
+    weakness_description TEXT,
+    severity TEXT,
+    category TEXT,
+    occurrences INTEGER,
+    last_seen_at TIMESTAMP WITH TIME ZONE,
+    rank REAL
+) AS $$
+    WITH matches AS (
+        SELECT i.*, ts_rank_cd(i.search_vector, q) AS rank
+        FROM insights i, websearch_to_tsquery('english', p_query) AS q
+        WHERE i.search_vector @@ q
+          AND (p_competitor_id IS NULL OR i.competitor_id = p_competitor_id)
+          AND (p_severity IS NULL OR i.severity = p_severity)
+          AND (p_category IS NULL OR i.category = p_category)
+    )
+    SELECT
+        m.id, m.competitor_id, c.name, m.weakness_title, m.weakness_description,
+        m.severity, m.category, m.occurrences, m.last_seen_at, m.rank
+    FROM matches m
+    JOIN competitors c ON c.id = m.competitor_id
+    WHERE p_cursor_rank IS NULL
+       OR (m.rank, m.id) < (p_cursor_rank, p_cursor_id)
+    ORDER BY m.rank DESC, m.id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
 
 
+-- Bulk exports (GET /export/competitors, GET /export/insights). Both walk a
+-- table in change order with keyset pagination: pass the timestamp/id of the
+-- last row of the previous page. p_since keeps only rows changed since then,
+-- for incremental pulls.
+CREATE INDEX IF NOT EXISTS idx_insights_last_seen_at_id ON insights(last_seen_at, id);
 
+CREATE OR REPLACE FUNCTION export_competitors(
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_limit INTEGER DEFAULT 500,
+    p_cursor_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    name TEXT,
+    target_url TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT c.id, c.name, c.target_url, c.created_at, c.updated_at
+    FROM competitors c
+    WHERE (p_since IS NULL OR c.updated_at >= p_since)
+      AND (p_cursor_at IS NULL OR (c.updated_at, c.id) > (p_cursor_at, p_cursor_id))
+    ORDER BY c.updated_at, c.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
 
+CREATE OR REPLACE FUNCTION export_insights(
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_limit INTEGER DEFAULT 500,
+    p_cursor_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    competitor_id UUID,
+    competitor_name TEXT,
+    weakness_title TEXT,
+    weakness_description TEXT,
+    severity TEXT,
+    category TEXT,
+    occurrences INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    last_seen_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        i.id, i.competitor_id, c.name, i.weakness_title, i.weakness_description,
+        i.severity, i.category, i.occurrences, i.created_at, i.last_seen_at
+    FROM insights i
+    JOIN competitors c ON c.id = i.competitor_id
+    WHERE (p_since IS NULL OR i.last_seen_at >= p_since)
+      AND (p_cursor_at IS NULL OR (i.last_seen_at, i.id) > (p_cursor_at, p_cursor_id))
+    ORDER BY i.last_seen_at, i.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
@@ -30,7 +30,7 @@ function App() {
       return 'gemini-2.5-flash-lite'
     }
   })
-  const [modelOptions, setModelOptions] = useState<Array<{id:string,name:string,daily:string,note?:string}>>([
+  const [modelOptions, setModelOptions] = useState<Array<{id:string,name:string,daily:string,note?:string,remaining_today?:number|null}>>([
     { id: 'gemini-2.5-flash', name: 'Gemini 2.5 Flash', daily: '20', note: 'Severely limited' },
     { id: 'gemini-2.5-flash-lite', name: 'Gemini 2.5 Flash-Lite', daily: '1,500', note: 'Recommended for Free Tier' },
     { id: 'gemini-2.5-pro', name: 'Gemini 2.5 Pro', daily: '0 - 5', note: 'Often removed or restricted' },
@@ -289,6 +289,7 @@ function App() {
                   {modelOptions.map((opt) => (
                     <option key={opt.id} value={opt.id}>
                       {opt.name} · {opt.daily}/day — {opt.note}
+                      {typeof opt.remaining_today === 'number' ? ` (${opt.remaining_today} left today)` : ''}
                     </option>
                   ))}
                 </select>